@@ -1,12 +1,100 @@
 """
 Module: aml.aml_cache
-Description: 
+Description: Persistent AML results keyed by network and address.
 """
 
 import json
+import struct
+import threading
 import time
-from typing import Optional
+from collections import OrderedDict
+from typing import Iterable, Optional
 import mdbx
+from loguru import logger
+
+DEFAULT_TTL = 86400
+# In-memory tier defaults
+MEMORY_ENTRIES = 100_000
+ERROR_TTL = 60
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH = 1000
+
+# Compact record: version, checked_at, score * 1000, status, source, flag
+# count, then each flag as a length-prefixed UTF-8 string. Records with
+# other fields or values stay JSON, which is also how old records read.
+_RECORD_V1 = 1
+_HEADER = struct.Struct("<BqHBBH")
+_FLAG_LEN = struct.Struct("<H")
+_STATUSES = ("safe", "warning", "blocked", "error")
+_SOURCES = (None, "auto", "manual", "error")
+_FIELDS = {"status", "score", "flags", "source", "checked_at"}
+
+
+def _encode(data: dict) -> bytes:
+    score = data.get("score", 0.0)
+    flags = data.get("flags", [])
+    if (
+        set(data) <= _FIELDS
+        and data.get("status") in _STATUSES
+        and data.get("source") in _SOURCES
+        and isinstance(score, (int, float)) and 0 <= score <= 1 and round(score, 3) == score
+        and isinstance(flags, list) and all(isinstance(f, str) for f in flags)
+        and len(flags) < 1 << 16
+    ):
+        parts = [_HEADER.pack(
+            _RECORD_V1,
+            int(data.get("checked_at", 0)),
+            round(score * 1000),
+            _STATUSES.index(data["status"]),
+            _SOURCES.index(data.get("source")),
+            len(flags),
+        )]
+        for flag in flags:
+            raw = flag.encode()
+            if len(raw) >= 1 << 16:
+                break
+            parts.append(_FLAG_LEN.pack(len(raw)))
+            parts.append(raw)
+        else:
+            return b"".join(parts)
+    return json.dumps(data).encode()
+
+
+def _decode(raw: bytes) -> dict:
+    if raw[0] != _RECORD_V1:
+        return json.loads(raw)
+    _, checked_at, score, status, source, count = _HEADER.unpack_from(raw)
+    offset = _HEADER.size
+    flags = []
+    for _ in range(count):
+        (size,) = _FLAG_LEN.unpack_from(raw, offset)
+        offset += _FLAG_LEN.size
+        flags.append(bytes(raw[offset:offset + size]).decode())
+        offset += size
+    data = {"status": _STATUSES[status], "score": score / 1000, "flags": flags}
+    if _SOURCES[source] is not None:
+        data["source"] = _SOURCES[source]
+    data["checked_at"] = checked_at
+    return data
+
+
+def _fresh(data: Optional[dict], ttl_seconds: int, now: float) -> Optional[dict]:
+    if data and (now - data.get("checked_at", 0)) <= ttl_seconds:
+        return data
+    return None
+
+
+def _read(raw: Optional[bytes], ttl_seconds: Optional[int], now: float) -> Optional[dict]:
+    """Decode a stored record; None if missing or older than ``ttl_seconds``."""
+    if not raw:
+        return None
+    if raw[0] != _RECORD_V1:
+        data = json.loads(raw)
+        return data if ttl_seconds is None else _fresh(data, ttl_seconds, now)
+    # Устаревшая бинарная запись отбрасывается по заголовку
+    if ttl_seconds is not None and now - _HEADER.unpack_from(raw)[1] > ttl_seconds:
+        return None
+    return _decode(raw)
 
 
 class AmlCache:
@@ -19,12 +107,31 @@ class AmlCache:
     def delete(self, network: str, address: str) -> None:
         raise NotImplementedError
 
-    def is_expired(self, network: str, address: str, ttl_seconds: int = 86400) -> bool:
+    def is_expired(self, network: str, address: str, ttl_seconds: int = DEFAULT_TTL) -> bool:
         raise NotImplementedError
 
     def mark_manual_block(self, network: str, address: str) -> None:
         raise NotImplementedError
 
+    def get_fresh(self, network: str, address: str, ttl_seconds: int = DEFAULT_TTL) -> Optional[dict]:
+        """Record if it is younger than ``ttl_seconds``, else None."""
+        return _fresh(self.get(network, address), ttl_seconds, time.time())
+
+    def get_many(
+        self, network: str, addresses: Iterable[str], ttl_seconds: Optional[int] = None
+    ) -> dict[str, dict]:
+        """Found records by address; only fresh ones if ``ttl_seconds`` is set."""
+        found = {}
+        for address in addresses:
+            data = self.get(network, address) if ttl_seconds is None else self.get_fresh(network, address, ttl_seconds)
+            if data:
+                found[address] = data
+        return found
+
+    def set_many(self, network: str, records: Iterable[tuple[str, dict]]) -> None:
+        for address, data in records:
+            self.set(network, address, data)
+
 
 class MdbxAmlCache(AmlCache):
     def __init__(self, db_path: str = "data/aml_cache.mdbx"):
@@ -43,24 +150,46 @@ class MdbxAmlCache(AmlCache):
         key = self._make_key(network, address)
         with self.env.begin(db=self.db) as txn:
             raw = txn.get(key)
-            return json.loads(raw) if raw else None
+            return _decode(raw) if raw else None
 
     def set(self, network: str, address: str, data: dict) -> None:
         key = self._make_key(network, address)
         data.setdefault("checked_at", int(time.time()))
         with self.env.begin(write=True, db=self.db) as txn:
-            txn.put(key, json.dumps(data).encode())
+            txn.put(key, _encode(data))
 
     def delete(self, network: str, address: str) -> None:
         key = self._make_key(network, address)
         with self.env.begin(write=True, db=self.db) as txn:
             txn.delete(key)
 
-    def is_expired(self, network: str, address: str, ttl_seconds: int = 86400) -> bool:
-        record = self.get(network, address)
-        if not record:
-            return True
-        return (time.time() - record.get("checked_at", 0)) > ttl_seconds
+    def is_expired(self, network: str, address: str, ttl_seconds: int = DEFAULT_TTL) -> bool:
+        return self.get_fresh(network, address, ttl_seconds) is None
+
+    def get_fresh(self, network: str, address: str, ttl_seconds: int = DEFAULT_TTL) -> Optional[dict]:
+        # Одна транзакция и одно декодирование
+        key = self._make_key(network, address)
+        with self.env.begin(db=self.db) as txn:
+            return _read(txn.get(key), ttl_seconds, time.time())
+
+    def get_many(
+        self, network: str, addresses: Iterable[str], ttl_seconds: Optional[int] = None
+    ) -> dict[str, dict]:
+        now = time.time()
+        found = {}
+        with self.env.begin(db=self.db) as txn:
+            for address in addresses:
+                data = _read(txn.get(self._make_key(network, address)), ttl_seconds, now)
+                if data:
+                    found[address] = data
+        return found
+
+    def set_many(self, network: str, records: Iterable[tuple[str, dict]]) -> None:
+        now = int(time.time())
+        with self.env.begin(write=True, db=self.db) as txn:
+            for address, data in records:
+                data.setdefault("checked_at", now)
+                txn.put(self._make_key(network, address), _encode(data))
 
     def mark_manual_block(self, network: str, address: str) -> None:
         record = self.get(network, address) or {}
@@ -71,4 +200,239 @@ class MdbxAmlCache(AmlCache):
             "source": "manual",
             "checked_at": int(time.time()),
         })
-        self.set(network, address, record)
\ No newline at end of file
+        self.set(network, address, record)
+
+
+class TieredAmlCache(AmlCache):
+    """
+    In-process LRU tier with write-behind in front of a persistent cache.
+
+    Hits are served from memory without a transaction or decode. The LRU is
+    bounded by ``max_entries`` and, if set, by ``max_bytes`` of encoded
+    records (approximate). Results with ``status: "error"`` are kept in
+    memory only, for ``error_ttl`` seconds, so a failing upstream is not
+    retried on every check. Other writes are queued and reach the backend
+    in ``set_many`` batches from a background thread, every
+    ``flush_interval`` seconds or as soon as ``flush_batch`` are pending;
+    callers never wait for the write. Queued records stay readable and
+    deletable until their batch commits. Call :meth:`flush` or
+    :meth:`close` before exit. Returned records are shared: do not mutate
+    them.
+    """
+
+    def __init__(
+        self,
+        backend: AmlCache,
+        max_entries: int = MEMORY_ENTRIES,
+        max_bytes: Optional[int] = None,
+        error_ttl: float = ERROR_TTL,
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_batch: int = FLUSH_BATCH,
+    ):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.error_ttl = error_ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        # (network, address) -> (record, size, expiry of an error record)
+        self._lru: "OrderedDict[tuple[str, str], tuple[dict, int, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        # network -> {address: record}, not yet written to the backend
+        self._pending: dict[str, dict[str, dict]] = {}
+        self._pending_count = 0
+        # network -> {address: record}, handed to backend.set_many but not committed
+        self._writing: dict[str, dict[str, dict]] = {}
+        # (network, address) deleted while its write was in flight
+        self._undo: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+
+    # === Память ===
+
+    def _remember(self, key: tuple[str, str], data: dict) -> None:
+        size = len(_encode(data)) + len(key[0]) + len(key[1]) if self.max_bytes else 0
+        expires = time.monotonic() + self.error_ttl if data.get("status") == "error" else None
+        with self._lock:
+            old = self._lru.pop(key, None)
+            if old:
+                self._bytes -= old[1]
+            self._lru[key] = (data, size, expires)
+            self._bytes += size
+            while len(self._lru) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, dropped, _) = self._lru.popitem(last=False)
+                self._bytes -= dropped
+
+    def _recall(self, key: tuple[str, str]) -> tuple[Optional[dict], bool]:
+        """Record in memory and whether memory answers for the key at all."""
+        with self._lock:
+            item = self._lru.get(key)
+            if item is not None:
+                data, size, expires = item
+                if expires is not None and expires < time.monotonic():
+                    # Негативная запись истекла: спросить бэкенд
+                    del self._lru[key]
+                    self._bytes -= size
+                    return None, False
+                self._lru.move_to_end(key)
+                return data, True
+            # Вытеснено из LRU, но ещё не записано
+            data = self._pending.get(key[0], {}).get(key[1])
+            if data is None:
+                data = self._writing.get(key[0], {}).get(key[1])
+            return data, data is not None
+
+    def _forget(self, key: tuple[str, str]) -> None:
+        with self._lock:
+            old = self._lru.pop(key, None)
+            if old:
+                self._bytes -= old[1]
+
+    @staticmethod
+    def _usable(data: Optional[dict], ttl_seconds: Optional[int], now: float) -> Optional[dict]:
+        if data is None or ttl_seconds is None:
+            return data
+        return _fresh(data, ttl_seconds, now)
+
+    # === Чтение ===
+
+    def get(self, network: str, address: str) -> Optional[dict]:
+        return self._get(network, address, None)
+
+    def get_fresh(self, network: str, address: str, ttl_seconds: int = DEFAULT_TTL) -> Optional[dict]:
+        return self._get(network, address, ttl_seconds)
+
+    def _get(self, network: str, address: str, ttl_seconds: Optional[int]) -> Optional[dict]:
+        key = (network, address)
+        now = time.time()
+        data, known = self._recall(key)
+        if known:
+            return self._usable(data, ttl_seconds, now)
+        data = self.backend.get(network, address)
+        if data is not None:
+            self._remember(key, data)
+        return self._usable(data, ttl_seconds, now)
+
+    def get_many(
+        self, network: str, addresses: Iterable[str], ttl_seconds: Optional[int] = None
+    ) -> dict[str, dict]:
+        now = time.time()
+        found = {}
+        missing = []
+        for address in addresses:
+            data, known = self._recall((network, address))
+            if not known:
+                missing.append(address)
+            elif self._usable(data, ttl_seconds, now):
+                found[address] = data
+        if missing:
+            # Без TTL: устаревшие записи тоже попадают в LRU
+            for address, data in self.backend.get_many(network, missing).items():
+                self._remember((network, address), data)
+                if self._usable(data, ttl_seconds, now):
+                    found[address] = data
+        return found
+
+    def is_expired(self, network: str, address: str, ttl_seconds: int = DEFAULT_TTL) -> bool:
+        return self.get_fresh(network, address, ttl_seconds) is None
+
+    # === Запись ===
+
+    def set(self, network: str, address: str, data: dict) -> None:
+        data.setdefault("checked_at", int(time.time()))
+        self._remember((network, address), data)
+        if data.get("status") == "error":
+            # Негативный кэш только в памяти
+            return
+        with self._lock:
+            queue = self._pending.setdefault(network, {})
+            if address not in queue:
+                self._pending_count += 1
+            queue[address] = data
+            full = self._pending_count >= self.flush_batch
+        if self._closed:
+            # Нет фонового потока после close()
+            self.flush()
+            return
+        self._start_flusher()
+        if full:
+            self._wake.set()
+
+    def set_many(self, network: str, records: Iterable[tuple[str, dict]]) -> None:
+        for address, data in records:
+            self.set(network, address, data)
+
+    def delete(self, network: str, address: str) -> None:
+        self._forget((network, address))
+        with self._lock:
+            if self._pending.get(network, {}).pop(address, None) is not None:
+                self._pending_count -= 1
+            if self._writing.get(network, {}).pop(address, None) is not None:
+                # Запись уже в пути: удалить ещё раз после коммита
+                self._undo.add((network, address))
+        self.backend.delete(network, address)
+
+    def mark_manual_block(self, network: str, address: str) -> None:
+        self.flush()
+        self._forget((network, address))
+        self.backend.mark_manual_block(network, address)
+
+    # === Отложенная запись ===
+
+    def flush(self) -> None:
+        """Write every queued record to the backend."""
+        with self._flush_lock:
+            with self._lock:
+                self._writing, self._pending, self._pending_count = self._pending, {}, 0
+            try:
+                for network in list(self._writing):
+                    with self._lock:
+                        records = list(self._writing[network].items())
+                    self.backend.set_many(network, records)
+                    with self._lock:
+                        del self._writing[network]
+                        undo = [key for key in self._undo if key[0] == network]
+                        self._undo.difference_update(undo)
+                    for _, address in undo:
+                        self.backend.delete(network, address)
+            except Exception:
+                with self._lock:
+                    # Вернуть в очередь, не затирая более новые записи
+                    for network, records in self._writing.items():
+                        queue = self._pending.setdefault(network, {})
+                        for address, data in records.items():
+                            if address not in queue:
+                                queue[address] = data
+                                self._pending_count += 1
+                    self._writing = {}
+                    self._undo.clear()
+                raise
+
+    def _start_flusher(self) -> None:
+        if self._flusher is not None or self._closed:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="aml-cache-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"AML cache flush failed: {e}")
+
+    def close(self) -> None:
+        """Stop the flusher and write what is queued."""
+        self._closed = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
@@ -43,5 +43,7 @@ tron_config = {
 		"min_suspicious_senders": 2,
 		"max_depth": 2,
 		"weight": 0.25,
+		"concurrency": 8,            # одновременных предзагрузок на процесс
+		"max_upstream_calls": 200,   # бюджет запросов на одну проверку
 	},
 }
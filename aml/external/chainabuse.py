@@ -1,30 +1,31 @@
 """
 Module: aml.external.chainabuse
-Description: 
+Description: Chainabuse scam reports for an address.
 """
 
-import httpx
-from core.config import config
+from paychain.core.config import config
 from loguru import logger
 
+from aml.http_client import USER_AGENT, get_client
+
 CHAINABUSE_API_URL = "https://api.chainabuse.com/api/v1/reports/address/"
 
-async def fetch_chainabuse_reports(address: str, network: str = "tron") -> list:
+async def fetch_chainabuse_reports(address: str, network: str = "tron", client=None) -> list:
     if not config.enable_chainabuse:
         return []
 
+    url = f"{CHAINABUSE_API_URL}{network}/{address}"
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(
-                f"{CHAINABUSE_API_URL}{network}/{address}",
-                headers={
-                    "X-API-Key": config.chainabuse_api_key,
-                    "User-Agent": "paychain-aml-checker"
-                }
-            )
-            r.raise_for_status()
-            data = r.json()
-            return data.get("reports", [])
+        r = await (client or get_client(url)).get(
+            url,
+            headers={
+                "X-API-Key": config.chainabuse_api_key,
+                "User-Agent": USER_AGENT
+            }
+        )
+        r.raise_for_status()
+        data = r.json()
+        return data.get("reports", [])
     except Exception as e:
         logger.warning(f"Chainabuse fetch failed: {e}")
-        return []
\ No newline at end of file
+        return []
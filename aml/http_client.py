@@ -0,0 +1,28 @@
+"""
+Module: aml.http_client
+Description: Long-lived pooled httpx clients shared by AML upstream fetches.
+"""
+
+from paychain.core.aio import AsyncClientPool
+
+HTTP_TIMEOUT = 10.0
+USER_AGENT = "paychain-aml-checker"
+
+# One keep-alive client per upstream host and event loop, HTTP/2 when ``h2``
+# is installed.
+_pool = AsyncClientPool(timeout=HTTP_TIMEOUT, http2=True)
+
+
+def get_client(url: str):
+    """Pooled ``httpx.AsyncClient`` for the host of ``url``."""
+    return _pool.client_for(url)
+
+
+def set_pool(pool: AsyncClientPool) -> None:
+    global _pool
+    _pool = pool
+
+
+async def aclose() -> None:
+    """Close the clients of the running loop (call on shutdown)."""
+    await _pool.aclose()
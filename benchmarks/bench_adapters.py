@@ -0,0 +1,143 @@
+"""Offline adapter benchmark suite.
+
+For every chain a synthetic history is recorded once into a cassette, then:
+
+* parse throughput: the full history is walked with ``iter_transactions``
+  against an in-process ``ReplayTransport`` (JSON decode + parsing + record
+  construction, no I/O), reported in records/s;
+* allocations: peak traced memory of one walk (``tracemalloc``);
+* end-to-end latency: first-page ``list_transactions`` calls over real HTTP
+  against a localhost ``StubServer`` replaying the same cassette.
+
+Usage::
+
+    python -m benchmarks.bench_adapters --records 2000
+    python -m benchmarks.bench_adapters --json bench.json
+    python -m benchmarks.bench_adapters --compare bench.json --tolerance 0.25
+
+``--compare`` exits with status 1 when throughput drops or latency grows by
+more than the tolerance relative to the baseline file.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+from paychain.core import transport
+from paychain.core.transport import HttpTransport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import iter_transactions, list_transactions
+from paychain.testing.cassette import RecordingTransport, ReplayTransport
+from paychain.testing.stub_server import StubServer
+from paychain.testing.synthetic import SyntheticProviders, default_queries
+
+CHAINS = ("BTC", "ETH", "SOL", "TON", "TRON")
+# Provider path prefix appended to the base URL, mirroring the real APIs.
+PATHS = {"BTC": "/api", "ETH": "/api", "SOL": "/", "TON": "/v2", "TRON": ""}
+PAGE_SIZE = 50
+
+
+def _query(chain: str, base: str) -> TxQuery:
+    return TxQuery(limit=PAGE_SIZE, rpc_url=base + PATHS[chain], **default_queries()[chain])
+
+
+def _walk(chain: str, q: TxQuery) -> int:
+    return sum(1 for _ in iter_transactions(chain, q))
+
+
+def bench_chain(chain: str, records: int, repeat: int, latency_calls: int) -> Dict[str, float]:
+    base = f"http://synthetic.{chain.lower()}"
+    q = _query(chain, base)
+    recorder = RecordingTransport(SyntheticProviders(history=records))
+    prev = transport.set_transport(recorder)
+    try:
+        count = _walk(chain, q)
+
+        transport.set_transport(ReplayTransport(recorder.cassette))
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _walk(chain, q)
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        _walk(chain, q)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        http = HttpTransport()
+        transport.set_transport(http)
+        latencies: List[float] = []
+        with StubServer(ReplayTransport(recorder.cassette, ignore_host=True)) as stub:
+            stub_q = _query(chain, stub.url)
+            for _ in range(latency_calls):
+                start = time.perf_counter()
+                list_transactions(chain, stub_q)
+                latencies.append(time.perf_counter() - start)
+        http.close()
+    finally:
+        transport.set_transport(prev)
+    latencies.sort()
+    return {
+        "records": count,
+        "records_per_s": count / best if best else 0.0,
+        "peak_kib": peak / 1024,
+        "latency_p50_ms": statistics.median(latencies) * 1000,
+        "latency_p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Return human-readable regressions of ``results`` against ``baseline``."""
+    problems = []
+    for chain, cur in results.items():
+        base = baseline.get(chain)
+        if not base:
+            continue
+        if cur["records_per_s"] < base["records_per_s"] * (1 - tolerance):
+            problems.append(f"{chain}: throughput {cur['records_per_s']:.0f} < {base['records_per_s']:.0f} rec/s")
+        if cur["peak_kib"] > base["peak_kib"] * (1 + tolerance):
+            problems.append(f"{chain}: peak memory {cur['peak_kib']:.0f} > {base['peak_kib']:.0f} KiB")
+        if cur["latency_p50_ms"] > base["latency_p50_ms"] * (1 + tolerance):
+            problems.append(f"{chain}: p50 latency {cur['latency_p50_ms']:.2f} > {base['latency_p50_ms']:.2f} ms")
+    return problems
+
+
+def run(chains=CHAINS, records: int = 2000, repeat: int = 3, latency_calls: int = 30) -> Dict[str, Dict[str, float]]:
+    return {chain: bench_chain(chain, records, repeat, latency_calls) for chain in chains}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline adapter benchmarks")
+    parser.add_argument("--chains", default=",".join(CHAINS))
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-calls", type=int, default=30)
+    parser.add_argument("--json", default=None, help="write results to this file")
+    parser.add_argument("--compare", default=None, help="baseline results file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    chains = [c.strip().upper() for c in args.chains.split(",") if c.strip()]
+    results = run(chains, args.records, args.repeat, args.latency_calls)
+    print(f"{'chain':<6}{'records':>9}{'rec/s':>12}{'peak KiB':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    for chain, r in results.items():
+        print(f"{chain:<6}{r['records']:>9}{r['records_per_s']:>12.0f}{r['peak_kib']:>11.0f}"
+              f"{r['latency_p50_ms']:>9.2f}{r['latency_p95_ms']:>9.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for p in problems:
+            print("REGRESSION", p)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
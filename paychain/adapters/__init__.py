@@ -1,8 +1,13 @@
-"""Portable chain adapters."""
+"""Portable chain adapters.
+
+Modules are imported lazily through :mod:`paychain.adapters.registry`.
+"""
+from .registry import get_adapter, register  # noqa: F401
 
 __all__ = [
     "btc",
     "eth",
+    "eth_rpc",
     "sol",
     "ton",
     "tron",
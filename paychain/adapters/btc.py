@@ -1,91 +1,146 @@
 """Bitcoin adapter using Blockstream REST API.
-This implementation has no internal dependencies and relies only on requests.
+HTTP goes through the shared pooled transport in ``paychain.core.transport``.
+Esplora has no time filters; paging stops at the first confirmed tx well
+before ``since_ts``.
 """
 from typing import Optional
 
-import requests
-
+from paychain.core import transport
+from paychain.core.timerange import newer, older
 from paychain.core.types import TxQuery, TxRecord, TxPage
 
 # Base URL for Blockstream API. MAY CHANGE.
 API_URL = "https://blockstream.info/api"
+# Blockstream returns at most this many confirmed txs per page.
+PAGE_SIZE = 25
+# Block times are not monotonic (a block may predate its parent by up to
+# ~2 hours), so paging stops only this far past ``since_ts``.
+TIME_SLACK = 2 * 3600
 
 
-def _fetch_txs(address: str, last_txid: Optional[str] = None):
-    """Fetch a page of transactions for the address."""
+def _txs_url(base: str, address: str, last_txid: Optional[str] = None) -> str:
     path = f"/address/{address}/txs"
     if last_txid:
         path += f"/chain/{last_txid}"
-    resp = requests.get(API_URL + path, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
+    return base + path
+
+
+def _fetch_txs(base: str, address: str, last_txid: Optional[str] = None):
+    """Fetch a page of transactions for the address."""
+    return transport.get_json(_txs_url(base, address, last_txid))
+
+
+def _parse_tx(q: TxQuery, tx: dict) -> Optional[TxRecord]:
+    """Convert one Blockstream tx into a record, or None if filtered out."""
+    addr = q.address
+    ts = tx.get("status", {}).get("block_time")
+    if older(q, ts) or newer(q, ts):
+        return None
+    vin = tx.get("vin", [])
+    vout = tx.get("vout", [])
+    incoming = any(
+        o.get("scriptpubkey_address") == addr for o in vout
+    )
+    outgoing = any(
+        i.get("prevout", {}).get("scriptpubkey_address") == addr for i in vin
+    )
+    if q.direction == "incoming" and not incoming:
+        return None
+    if q.direction == "outgoing" and not outgoing:
+        return None
+    amount = 0
+    if incoming:
+        for o in vout:
+            if o.get("scriptpubkey_address") == addr:
+                amount += int(o.get("value", 0))
+    elif outgoing:
+        for i in vin:
+            prev = i.get("prevout", {})
+            if prev.get("scriptpubkey_address") == addr:
+                amount += int(prev.get("value", 0))
+    from_addr = vin[0].get("prevout", {}).get("scriptpubkey_address") if vin else None
+    to_addr = None
+    for o in vout:
+        if o.get("scriptpubkey_address") != addr:
+            to_addr = o.get("scriptpubkey_address")
+            break
+    status = "confirmed" if tx.get("status", {}).get("confirmed") else "pending"
+    return TxRecord(
+        chain="BTC",
+        tx_id=tx.get("txid"),
+        ts=ts,
+        block_height=tx.get("status", {}).get("block_height"),
+        from_addr=from_addr,
+        to_addr=to_addr if incoming or outgoing else None,
+        amount_raw=amount if amount else None,
+        amount_decimals=8,
+        asset="BTC",
+        status=status,
+    )
+
+
+def _confirmed(tx: dict) -> bool:
+    return bool(tx.get("status", {}).get("confirmed"))
+
+
+def _collect(q: TxQuery, data: list, items: list) -> tuple[Optional[int], bool]:
+    """Append matching records; return the index where ``q.limit`` was hit
+    and whether the history went past ``since_ts``.
+
+    Blockstream can only resume after a confirmed tx, so pending mempool
+    entries at the head of the first page are never split across pages.
+    """
+    for i, tx in enumerate(data):
+        ts = tx.get("status", {}).get("block_time")
+        if _confirmed(tx) and ts and older(q, ts + TIME_SLACK):
+            return None, True
+        rec = _parse_tx(q, tx)
+        if rec is not None:
+            items.append(rec)
+        if len(items) >= q.limit and _confirmed(tx):
+            return i, False
+    return None, False
+
+
+def _has_more(data: list) -> bool:
+    return sum(1 for tx in data if _confirmed(tx)) >= PAGE_SIZE
+
+
+def _next_step(data: list, collected: tuple[Optional[int], bool]) -> tuple[bool, Optional[str]]:
+    """Return (done, txid to continue after)."""
+    stop, past_window = collected
+    if past_window:
+        return True, None
+    if stop is not None:
+        if stop < len(data) - 1 or _has_more(data):
+            return True, data[stop]["txid"]
+        return True, None
+    if not _has_more(data):
+        return True, None
+    return False, data[-1]["txid"]
 
 
 def list_transactions(q: TxQuery) -> TxPage:
     """Return last transactions for the given address on Bitcoin."""
-    addr = q.address
     items: list[TxRecord] = []
-    cursor: Optional[str] = None
-    remaining = q.limit
     last_txid: Optional[str] = q.extra.get("cursor") if q.extra else None
-    while remaining > 0:
-        data = _fetch_txs(addr, last_txid)
+    while True:
+        data = _fetch_txs(q.rpc_url or API_URL, q.address, last_txid)
         if not data:
-            break
-        for tx in data:
-            ts = tx.get("status", {}).get("block_time")
-            if q.since_ts and ts and ts < q.since_ts:
-                continue
-            if q.until_ts and ts and ts > q.until_ts:
-                continue
-            vin = tx.get("vin", [])
-            vout = tx.get("vout", [])
-            incoming = any(
-                o.get("scriptpubkey_address") == addr for o in vout
-            )
-            outgoing = any(
-                i.get("prevout", {}).get("scriptpubkey_address") == addr for i in vin
-            )
-            if q.direction == "incoming" and not incoming:
-                continue
-            if q.direction == "outgoing" and not outgoing:
-                continue
-            amount = 0
-            if incoming:
-                for o in vout:
-                    if o.get("scriptpubkey_address") == addr:
-                        amount += int(o.get("value", 0))
-            elif outgoing:
-                for i in vin:
-                    prev = i.get("prevout", {})
-                    if prev.get("scriptpubkey_address") == addr:
-                        amount += int(prev.get("value", 0))
-            from_addr = vin[0].get("prevout", {}).get("scriptpubkey_address") if vin else None
-            to_addr = None
-            for o in vout:
-                if o.get("scriptpubkey_address") != addr:
-                    to_addr = o.get("scriptpubkey_address")
-                    break
-            status = "confirmed" if tx.get("status", {}).get("confirmed") else "pending"
-            items.append(
-                TxRecord(
-                    chain="BTC",
-                    tx_id=tx.get("txid"),
-                    ts=ts,
-                    block_height=tx.get("status", {}).get("block_height"),
-                    from_addr=from_addr,
-                    to_addr=to_addr if incoming or outgoing else None,
-                    amount_raw=amount if amount else None,
-                    amount_decimals=8,
-                    asset="BTC",
-                    status=status,
-                )
-            )
-            remaining -= 1
-            if remaining == 0:
-                break
-        if len(data) < 25 or remaining == 0:
-            break
-        last_txid = data[-1]["txid"]
-        cursor = last_txid
-    return TxPage(items=items, next_cursor=cursor)
+            return TxPage(items=items)
+        done, last_txid = _next_step(data, _collect(q, data, items))
+        if done:
+            return TxPage(items=items, next_cursor=last_txid)
+
+
+async def alist_transactions(q: TxQuery) -> TxPage:
+    """Async variant of :func:`list_transactions` over the pooled transport."""
+    items: list[TxRecord] = []
+    last_txid: Optional[str] = q.extra.get("cursor") if q.extra else None
+    while True:
+        data = await transport.aget_json(_txs_url(q.rpc_url or API_URL, q.address, last_txid))
+        if not data:
+            return TxPage(items=items)
+        done, last_txid = _next_step(data, _collect(q, data, items))
+        if done:
+            return TxPage(items=items, next_cursor=last_txid)
@@ -1,82 +1,415 @@
-"""Ethereum adapter using Etherscan-compatible REST API."""
-import os
+"""Ethereum adapter using Etherscan-compatible REST API.
 
-import requests
+``since_ts``/``until_ts`` are pushed down as ``startblock``/``endblock``,
+resolved with Etherscan's ``getblocknobytime``. Bounds are widened to
+``BOUND_BUCKET`` seconds so rolling windows ("last 7 days") reuse one
+lookup; the exact window is still applied to every row.
+"""
+import heapq
+import os
+import threading
+import time
+from typing import Optional
 
+from paychain.core import transport
+from paychain.core.timerange import newer, older
 from paychain.core.types import TxQuery, TxRecord, TxPage
 
 # Default Etherscan API URL. MAY CHANGE.
 API_URL = "https://api.etherscan.io/api"
 
 
-def list_transactions(q: TxQuery) -> TxPage:
-    """Return last transactions for the given address on Ethereum."""
-    api_url = q.rpc_url or API_URL
-    api_key = q.api_key or os.getenv("ETHERSCAN_API_KEY")
+# Etherscan actions per transfer kind used by the timeline mode.
+STREAMS = {
+    "native": "txlist",
+    "internal": "txlistinternal",
+    "erc20": "tokentx",
+    "erc721": "tokennfttx",
+    "erc1155": "token1155tx",
+}
+# Kinds merged when ``q.extra["timeline"]`` is True; NFT kinds are opt-in.
+TIMELINE = ("native", "internal", "erc20")
+# Timeline cursor marker of a stream with no older rows.
+EXHAUSTED = "-"
+BLOCK_CACHE_SIZE = 4096
+# Block bounds are looked up for timestamps rounded outwards to this grid.
+BOUND_BUCKET = 600
+
+# (api url, timestamp, "after"/"before") -> block number.
+_blocks_by_time: dict[tuple[str, int, str], int] = {}
+_blocks_lock = threading.Lock()
+
+
+def _decode_cursor(raw: Optional[str]) -> tuple[Optional[int], int]:
+    if not raw:
+        return None, 0
+    end_block, _, skip = str(raw).partition(":")
+    return int(end_block), int(skip or 0)
+
+
+def _cursor(q: TxQuery) -> tuple[Optional[int], int]:
+    """Decode ``"<endblock>:<skip>"``: resume at ``endblock``, dropping the
+    first ``skip`` rows of that block that the previous page already returned.
+    """
+    return _decode_cursor((q.extra or {}).get("cursor"))
+
+
+def _resume_at(txs: list, consumed: int) -> str:
+    """Cursor resuming after the first ``consumed`` raw rows of ``txs``."""
+    last_block = int(txs[consumed - 1]["blockNumber"])
+    same = sum(1 for tx in txs[:consumed] if int(tx.get("blockNumber", -1)) == last_block)
+    return f"{last_block}:{same}"
+
+
+def _next_cursor(q: TxQuery, txs: list) -> Optional[str]:
+    _, skip = _cursor(q)
+    if len(txs) < q.limit + skip:
+        return None
+    # Block-based cursors are not bound by Etherscan's page * offset window.
+    return _resume_at(txs, len(txs))
+
+
+# === Time bounds ===
+
+
+def _api_key(q: TxQuery) -> Optional[str]:
+    return q.api_key or os.getenv("ETHERSCAN_API_KEY")
+
+
+def _bound_lookups(q: TxQuery) -> list[tuple[int, str]]:
+    """``(timestamp, closest)`` pairs covering the query window.
+
+    ``since_ts`` is rounded down and ``until_ts`` up to ``BOUND_BUCKET``; an
+    upper bound that is not in the past yet needs no ``endblock``.
+    """
+    lookups = []
+    if q.since_ts:
+        lookups.append((int(q.since_ts) // BOUND_BUCKET * BOUND_BUCKET, "after"))
+    if q.until_ts:
+        until = -(-int(q.until_ts) // BOUND_BUCKET) * BOUND_BUCKET
+        if until < time.time():
+            lookups.append((until, "before"))
+    return lookups
+
+
+def _bound_params(q: TxQuery, ts: int, closest: str) -> dict:
+    params = {"module": "block", "action": "getblocknobytime", "timestamp": ts, "closest": closest}
+    if _api_key(q):
+        params["apikey"] = _api_key(q)
+    return params
+
+
+def _missing_bounds(q: TxQuery, api_url: str) -> list[tuple[int, str]]:
+    with _blocks_lock:
+        return [(ts, c) for ts, c in _bound_lookups(q) if (api_url, ts, c) not in _blocks_by_time]
+
+
+def _remember_bound(api_url: str, ts: int, closest: str, data: dict) -> None:
+    result = data.get("result") if isinstance(data, dict) else None
+    if not (isinstance(result, str) and result.isdigit()):
+        # Not supported by this Etherscan-compatible API: filter client-side.
+        return
+    with _blocks_lock:
+        if len(_blocks_by_time) >= BLOCK_CACHE_SIZE:
+            _blocks_by_time.pop(next(iter(_blocks_by_time)))
+        _blocks_by_time[(api_url, ts, closest)] = int(result)
+
+
+def _bounds(q: TxQuery, api_url: str) -> tuple[Optional[int], Optional[int]]:
+    found = {}
+    with _blocks_lock:
+        for ts, closest in _bound_lookups(q):
+            found[closest] = _blocks_by_time.get((api_url, ts, closest))
+    return found.get("after"), found.get("before")
+
+
+def _resolve_bounds(q: TxQuery, api_url: str) -> tuple[Optional[int], Optional[int]]:
+    for ts, closest in _missing_bounds(q, api_url):
+        _remember_bound(api_url, ts, closest, transport.get_json(api_url, params=_bound_params(q, ts, closest)))
+    return _bounds(q, api_url)
+
+
+async def _aresolve_bounds(q: TxQuery, api_url: str) -> tuple[Optional[int], Optional[int]]:
+    for ts, closest in _missing_bounds(q, api_url):
+        data = await transport.aget_json(api_url, params=_bound_params(q, ts, closest))
+        _remember_bound(api_url, ts, closest, data)
+    return _bounds(q, api_url)
+
+
+def _params(
+    q: TxQuery,
+    kind: Optional[str] = None,
+    cursor: Optional[str] = None,
+    bounds: tuple[Optional[int], Optional[int]] = (None, None),
+) -> dict:
+    """Query parameters; ``kind`` selects a timeline stream with its own cursor."""
+    api_key = _api_key(q)
+    end_block, skip = _cursor(q) if kind is None else _decode_cursor(cursor)
+    start, end = bounds
+    if end is not None:
+        end_block = end if end_block is None else min(end_block, end)
     params = {
         "module": "account",
         "address": q.address,
         "sort": "desc",
         "page": 1,
-        "offset": q.limit,
+        "offset": q.limit + skip,
     }
-    if q.token:
+    if start is not None:
+        params["startblock"] = start
+    if end_block is not None:
+        params["endblock"] = end_block
+    if kind is not None:
+        params["action"] = STREAMS[kind]
+        if q.token and kind not in ("native", "internal"):
+            params["contractaddress"] = q.token
+    elif q.token:
         params["action"] = "tokentx"
         params["contractaddress"] = q.token
     else:
         params["action"] = "txlist"
-    if q.since_ts:
-        params["starttimestamp"] = q.since_ts
-    if q.until_ts:
-        params["endtimestamp"] = q.until_ts
     if api_key:
         params["apikey"] = api_key
-    resp = requests.get(api_url, params=params, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
+    return params
+
+
+def _rows(data: dict) -> list:
     txs = data.get("result", [])
-    if isinstance(txs, str):
-        txs = []
+    # Etherscan returns a message string instead of a list on "No transactions found".
+    return [] if isinstance(txs, str) else txs
+
+
+def _record(q: TxQuery, tx: dict, kind: Optional[str] = None) -> Optional[TxRecord]:
+    """Parse one row; ``None`` if filtered out by the query.
+
+    ``kind`` is None for the classic single-stream mode, where ``q.token``
+    decides between native and ERC-20 parsing and no meta is attached.
+    """
+    ts = int(tx.get("timeStamp")) if tx.get("timeStamp") else None
+    if older(q, ts) or newer(q, ts):
+        return None
+    from_addr = tx.get("from")
+    to_addr = tx.get("to")
+    addr_l = q.address.lower()
+    direction = "unknown"
+    if from_addr and from_addr.lower() == addr_l:
+        direction = "outgoing"
+    if to_addr and to_addr.lower() == addr_l:
+        direction = "incoming"
+    if q.direction == "incoming" and direction != "incoming":
+        return None
+    if q.direction == "outgoing" and direction != "outgoing":
+        return None
+    asset = "ETH"
+    decimals = 18
+    amount = int(tx.get("value") or 0)
+    meta = None
+    if kind in ("erc20", "erc721", "erc1155") or (kind is None and q.token):
+        asset = tx.get("tokenSymbol") or "TOKEN"
+        decimals = int(tx.get("tokenDecimal")) if tx.get("tokenDecimal") else 0
+    if kind == "erc721":
+        amount = 1
+    elif kind == "erc1155":
+        amount = int(tx.get("tokenValue") or 0)
+    if kind is not None:
+        meta = {"kind": kind}
+        if tx.get("logIndex") not in (None, ""):
+            meta["log_index"] = int(tx["logIndex"])
+        if tx.get("contractAddress"):
+            meta["contract"] = tx["contractAddress"]
+        if tx.get("tokenID") not in (None, ""):
+            meta["token_id"] = tx["tokenID"]
+        if tx.get("traceId"):
+            meta["trace_id"] = tx["traceId"]
+    status = "failed" if tx.get("isError") == "1" else "confirmed"
+    return TxRecord(
+        chain="ETH",
+        tx_id=tx.get("hash"),
+        ts=ts,
+        block_height=int(tx.get("blockNumber")) if tx.get("blockNumber") else None,
+        from_addr=from_addr,
+        to_addr=to_addr,
+        amount_raw=amount,
+        amount_decimals=decimals,
+        asset=asset,
+        status=status,
+        meta=meta,
+    )
+
+
+def _parse(q: TxQuery, data: dict) -> TxPage:
+    txs = _rows(data)
+    _, skip = _cursor(q)
     items: list[TxRecord] = []
-    for tx in txs:
-        ts = int(tx.get("timeStamp")) if tx.get("timeStamp") else None
-        if q.since_ts and ts and ts < q.since_ts:
+    for tx in txs[skip:]:
+        if older(q, int(tx.get("timeStamp") or 0)):
+            # Rows are newest first: the window is over.
+            return TxPage(items=items)
+        rec = _record(q, tx)
+        if rec is None:
             continue
-        if q.until_ts and ts and ts > q.until_ts:
+        items.append(rec)
+        if len(items) >= q.limit:
+            break
+    return TxPage(items=items, next_cursor=_next_cursor(q, txs))
+
+
+# === Timeline mode: several streams merged newest first ===
+
+
+def _timeline_kinds(q: TxQuery) -> tuple[str, ...]:
+    kinds = (q.extra or {}).get("timeline")
+    if kinds is True:
+        return TIMELINE
+    unknown = [k for k in kinds if k not in STREAMS]
+    if unknown:
+        raise ValueError(f"Unknown ETH timeline streams: {unknown}")
+    return tuple(kinds)
+
+
+def _decode_timeline_cursor(q: TxQuery, kinds: tuple[str, ...]) -> dict[str, Optional[str]]:
+    """``"native=123:2;internal=-;erc20=120:0"`` -> per-stream cursors."""
+    raw = (q.extra or {}).get("cursor")
+    cursors: dict[str, Optional[str]] = {k: None for k in kinds}
+    if raw:
+        for part in str(raw).split(";"):
+            kind, _, value = part.partition("=")
+            if kind in cursors:
+                cursors[kind] = value or None
+    return cursors
+
+
+def _event_key(tx: dict, kind: str) -> tuple:
+    # Token transfers are unique per (hash, logIndex); calls and internal
+    # traces have no log index and are told apart by kind and trace id.
+    index = tx.get("logIndex")
+    if index in (None, ""):
+        index = f"{kind}:{tx.get('traceId') or ''}"
+    return tx.get("hash"), index
+
+
+def _stream(kind: str, txs: list, skip: int, more: bool):
+    """Merge entries ``(sort key, kind, raw index, row)`` of one stream page.
+
+    A stream whose page was full ends with a ``row=None`` barrier: nothing
+    older than its last row may be emitted before its next page is fetched.
+    """
+    key = None
+    for i in range(skip, len(txs)):
+        tx = txs[i]
+        key = (-int(tx.get("blockNumber") or 0), -int(tx.get("timeStamp") or 0))
+        yield key, kind, i, tx
+    if more and key is not None:
+        yield key, kind, len(txs), None
+
+
+def _merge(q: TxQuery, kinds: tuple[str, ...], cursors: dict, pages: dict) -> TxPage:
+    streams = []
+    consumed: dict[str, int] = {}
+    for kind in kinds:
+        if kind not in pages:
             continue
-        from_addr = tx.get("from")
-        to_addr = tx.get("to")
-        direction = "unknown"
-        addr_l = q.address.lower()
-        if from_addr and from_addr.lower() == addr_l:
-            direction = "outgoing"
-        if to_addr and to_addr.lower() == addr_l:
-            direction = "incoming"
-        if q.direction == "incoming" and direction != "incoming":
+        txs = pages[kind]
+        _, skip = _decode_cursor(cursors[kind])
+        consumed[kind] = skip
+        streams.append(_stream(kind, txs, skip, more=len(txs) >= q.limit + skip))
+    items: list[TxRecord] = []
+    seen: set = set()
+    # k-way merge of the newest-first streams; ties keep stream order.
+    for _, kind, i, tx in heapq.merge(*streams, key=lambda e: e[0]):
+        if tx is None or len(items) >= q.limit:
+            break
+        consumed[kind] = i + 1
+        event = _event_key(tx, kind)
+        if event in seen:
             continue
-        if q.direction == "outgoing" and direction != "outgoing":
+        seen.add(event)
+        rec = _record(q, tx, kind)
+        if rec is not None:
+            items.append(rec)
+    # Swallow repeats of already emitted events sitting right at a page edge.
+    for kind, i in consumed.items():
+        txs = pages[kind]
+        while i < len(txs) and _event_key(txs[i], kind) in seen:
+            i += 1
+        consumed[kind] = i
+    parts = []
+    for kind in kinds:
+        if kind not in pages:
+            parts.append(f"{kind}={EXHAUSTED}")
             continue
-        asset = "ETH"
-        decimals = 18
-        amount = int(tx.get("value", 0))
-        if q.token:
-            asset = tx.get("tokenSymbol") or "TOKEN"
-            decimals = int(tx.get("tokenDecimal")) if tx.get("tokenDecimal") else 0
-        status = "failed" if tx.get("isError") == "1" else "confirmed"
-        items.append(
-            TxRecord(
-                chain="ETH",
-                tx_id=tx.get("hash"),
-                ts=ts,
-                block_height=int(tx.get("blockNumber")) if tx.get("blockNumber") else None,
-                from_addr=from_addr,
-                to_addr=to_addr,
-                amount_raw=amount,
-                amount_decimals=decimals,
-                asset=asset,
-                status=status,
-            )
-        )
-        if len(items) >= q.limit:
-            break
-    return TxPage(items=items)
+        txs = pages[kind]
+        _, skip = _decode_cursor(cursors[kind])
+        if consumed[kind] >= len(txs) and len(txs) < q.limit + skip:
+            parts.append(f"{kind}={EXHAUSTED}")
+        elif consumed[kind] > skip:
+            parts.append(f"{kind}={_resume_at(txs, consumed[kind])}")
+        else:
+            parts.append(f"{kind}={cursors[kind] or ''}")
+    done = all(p.endswith("=" + EXHAUSTED) for p in parts)
+    return TxPage(items=items, next_cursor=None if done else ";".join(parts))
+
+
+def _timeline_requests(q: TxQuery) -> tuple[tuple[str, ...], dict, list]:
+    kinds = _timeline_kinds(q)
+    cursors = _decode_timeline_cursor(q, kinds)
+    active = [k for k in kinds if cursors[k] != EXHAUSTED]
+    return kinds, cursors, active
+
+
+def _list_timeline(q: TxQuery) -> TxPage:
+    from concurrent.futures import ThreadPoolExecutor
+
+    api_url = q.rpc_url or API_URL
+    kinds, cursors, active = _timeline_requests(q)
+    bounds = _resolve_bounds(q, api_url)
+    with ThreadPoolExecutor(max_workers=max(1, len(active))) as pool:
+        futures = {k: pool.submit(transport.get_json, api_url, _params(q, k, cursors[k], bounds)) for k in active}
+        pages = {k: _rows(f.result()) for k, f in futures.items()}
+    return _merge(q, kinds, cursors, pages)
+
+
+async def _alist_timeline(q: TxQuery) -> TxPage:
+    import asyncio
+
+    api_url = q.rpc_url or API_URL
+    kinds, cursors, active = _timeline_requests(q)
+    bounds = await _aresolve_bounds(q, api_url)
+    results = await asyncio.gather(
+        *(transport.aget_json(api_url, params=_params(q, k, cursors[k], bounds)) for k in active)
+    )
+    return _merge(q, kinds, cursors, {k: _rows(r) for k, r in zip(active, results)})
+
+
+def list_transactions(q: TxQuery) -> TxPage:
+    """Return last transactions for the given address on Ethereum.
+
+    With ``q.extra["timeline"]`` (True or a list of ``STREAMS`` kinds) native,
+    internal and token transfers are fetched concurrently and merged into one
+    newest-first page; each stream pages independently inside the cursor.
+    ``q.extra["backend"] = "rpc"`` reads ERC-20 transfers from a JSON-RPC
+    node instead (:mod:`paychain.adapters.eth_rpc`).
+    """
+    if (q.extra or {}).get("backend") == "rpc":
+        from paychain.adapters import eth_rpc
+
+        return eth_rpc.list_transactions(q)
+    if (q.extra or {}).get("timeline"):
+        return _list_timeline(q)
+    api_url = q.rpc_url or API_URL
+    bounds = _resolve_bounds(q, api_url)
+    return _parse(q, transport.get_json(api_url, params=_params(q, bounds=bounds)))
+
+
+async def alist_transactions(q: TxQuery) -> TxPage:
+    """Async variant of :func:`list_transactions` over the pooled transport."""
+    if (q.extra or {}).get("backend") == "rpc":
+        from paychain.adapters import eth_rpc
+
+        return await eth_rpc.alist_transactions(q)
+    if (q.extra or {}).get("timeline"):
+        return await _alist_timeline(q)
+    api_url = q.rpc_url or API_URL
+    bounds = await _aresolve_bounds(q, api_url)
+    data = await transport.aget_json(api_url, params=_params(q, bounds=bounds))
+    return _parse(q, data)
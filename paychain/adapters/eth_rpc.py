@@ -0,0 +1,422 @@
+"""Ethereum ERC-20 transfers from plain JSON-RPC ``eth_getLogs``.
+
+An alternative to the Etherscan backend for self-hosted nodes (no third-party
+quota). Selected with ``TxQuery(rpc_url=node, extra={"backend": "rpc"})``.
+
+The scan walks block ranges from the head (or the cursor) towards
+``extra["start_block"]``, newest first. ``since_ts``/``until_ts`` are turned
+into block bounds first (:class:`~paychain.core.timerange.BlockIndex`), so a
+historical window only scans its own blocks. Ranges grow while they return few
+logs and are split when the node refuses them ("more than 10000 results",
+"block range too large", timeouts). Hints such as ``[0x.., 0x..]`` in
+the error are followed. Block timestamps and token decimals/symbols are
+fetched in JSON-RPC batches and cached per process.
+
+The scan is written once as a generator yielding batches of calls, driven
+by a sync and an async runner.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Generator, List, Optional, Tuple
+
+import requests
+
+from paychain.core import transport
+from paychain.core.timerange import block_index, newer, older
+from paychain.core.types import TxQuery, TxRecord, TxPage
+
+# Default public node. MAY CHANGE; point rpc_url at your own node for backfills.
+RPC_URL = "https://ethereum-rpc.publicnode.com"
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+# Block range sizing (q.extra["block_range"] sets the initial span).
+INITIAL_RANGE = 2_000
+MAX_RANGE = 100_000
+# Grow the span after a range returning fewer logs than this.
+GROW_BELOW = 1_000
+BATCH_SIZE = 100
+BLOCK_CACHE_SIZE = 100_000
+# Selectors of ``decimals()`` and ``symbol()``.
+DECIMALS_CALL = "0x313ce567"
+SYMBOL_CALL = "0x95d89b41"
+
+_RANGE_ERRORS = ("more than", "too many", "range", "limit exceeded", "response size", "too large", "exceed")
+_RANGE_HINT = re.compile(r"\[(0x[0-9a-fA-F]+),\s*(0x[0-9a-fA-F]+)\]")
+
+# RPC URLs known to reject batch payloads.
+_no_batch: set[str] = set()
+# Last working span per RPC URL, reused by later pages.
+_spans: Dict[str, int] = {}
+
+_Call = Tuple[str, list]
+
+
+class RpcError(Exception):
+    """JSON-RPC error object returned by the node."""
+
+    def __init__(self, error: dict):
+        super().__init__(error.get("message", str(error)))
+        self.code = error.get("code")
+
+
+class _LRU:
+    """Small thread-safe LRU for immutable lookups (block times, tokens)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._data: "OrderedDict[tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+        return None
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# (rpc_url, block number) -> UNIX timestamp.
+_time_cache = _LRU(BLOCK_CACHE_SIZE)
+# (rpc_url, contract) -> (symbol, decimals).
+_token_cache = _LRU(10_000)
+
+
+# === JSON-RPC plumbing ===
+
+
+def _payload(method: str, params: list, req_id: int = 1) -> dict:
+    return {"jsonrpc": "2.0", "id": req_id, "method": method, "params": params}
+
+
+def _unwrap(reply) -> object:
+    if not isinstance(reply, dict):
+        return RpcError({"message": "missing reply"})
+    if reply.get("error"):
+        return RpcError(reply["error"])
+    return reply.get("result")
+
+
+def _is_batch_rejection(err: requests.HTTPError) -> bool:
+    status = getattr(err.response, "status_code", None)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def _call_one(url: str, call: _Call) -> object:
+    try:
+        return _unwrap(transport.post_json(url, _payload(*call)))
+    except requests.Timeout as e:
+        return e
+
+
+async def _acall_one(url: str, call: _Call) -> object:
+    try:
+        return _unwrap(await transport.apost_json(url, _payload(*call)))
+    except requests.Timeout as e:
+        return e
+
+
+def _rpc_batch(url: str, calls: List[_Call]) -> list:
+    """Results (or ``RpcError``/``Timeout`` instances) in call order."""
+    results: list = []
+    for i in range(0, len(calls), BATCH_SIZE):
+        chunk = calls[i:i + BATCH_SIZE]
+        if len(chunk) > 1 and url not in _no_batch:
+            try:
+                reply = transport.post_json(url, [_payload(m, p, j) for j, (m, p) in enumerate(chunk)])
+            except requests.HTTPError as e:
+                if not _is_batch_rejection(e):
+                    raise
+                reply = None
+            except requests.Timeout as e:
+                results.extend([e] * len(chunk))
+                continue
+            if isinstance(reply, list):
+                by_id = {r.get("id"): r for r in reply if isinstance(r, dict)}
+                results.extend(_unwrap(by_id.get(j)) for j in range(len(chunk)))
+                continue
+            _no_batch.add(url)
+        results.extend(_call_one(url, c) for c in chunk)
+    return results
+
+
+async def _arpc_batch(url: str, calls: List[_Call]) -> list:
+    """Async variant of :func:`_rpc_batch`."""
+    results: list = []
+    for i in range(0, len(calls), BATCH_SIZE):
+        chunk = calls[i:i + BATCH_SIZE]
+        if len(chunk) > 1 and url not in _no_batch:
+            try:
+                reply = await transport.apost_json(url, [_payload(m, p, j) for j, (m, p) in enumerate(chunk)])
+            except requests.HTTPError as e:
+                if not _is_batch_rejection(e):
+                    raise
+                reply = None
+            except requests.Timeout as e:
+                results.extend([e] * len(chunk))
+                continue
+            if isinstance(reply, list):
+                by_id = {r.get("id"): r for r in reply if isinstance(r, dict)}
+                results.extend(_unwrap(by_id.get(j)) for j in range(len(chunk)))
+                continue
+            _no_batch.add(url)
+        for c in chunk:
+            results.append(await _acall_one(url, c))
+    return results
+
+
+def _raise_first(results: list) -> None:
+    for r in results:
+        if isinstance(r, Exception):
+            raise r
+
+
+# === Decoding ===
+
+
+def _topic(address: str) -> str:
+    return "0x" + address.lower().removeprefix("0x").rjust(64, "0")
+
+
+def _address(topic: str) -> str:
+    return "0x" + topic[-40:]
+
+
+def _decode_string(data: Optional[str]) -> Optional[str]:
+    """ABI ``string`` or legacy ``bytes32`` return value."""
+    if not data or data == "0x":
+        return None
+    raw = bytes.fromhex(data[2:])
+    try:
+        if len(raw) >= 64:
+            offset = int.from_bytes(raw[:32], "big")
+            length = int.from_bytes(raw[offset:offset + 32], "big")
+            text = raw[offset + 32:offset + 32 + length]
+        else:
+            text = raw.rstrip(b"\0")
+        return text.decode("utf-8", "replace").strip("\0") or None
+    except (ValueError, IndexError):
+        return None
+
+
+def _range_hint(err: object) -> Optional[int]:
+    match = _RANGE_HINT.search(str(err))
+    if not match:
+        return None
+    lo, hi = int(match.group(1), 16), int(match.group(2), 16)
+    return hi - lo + 1 if hi >= lo else None
+
+
+def _too_large(err: object) -> bool:
+    if isinstance(err, requests.Timeout):
+        return True
+    if isinstance(err, RpcError):
+        return err.code == -32005 or any(s in str(err).lower() for s in _RANGE_ERRORS)
+    return False
+
+
+def _cursor(q: TxQuery) -> Optional[Tuple[int, int]]:
+    """``"<block>:<log index>"``: continue with logs strictly older than that."""
+    raw = (q.extra or {}).get("cursor")
+    if not raw:
+        return None
+    block, _, index = str(raw).partition(":")
+    return int(block), int(index or 0)
+
+
+def _filters(q: TxQuery, lo: int, hi: int) -> List[_Call]:
+    me = _topic(q.address)
+    topic_sets = []
+    if q.direction in ("all", "outgoing"):
+        topic_sets.append([TRANSFER_TOPIC, me])
+    if q.direction in ("all", "incoming"):
+        topic_sets.append([TRANSFER_TOPIC, None, me])
+    calls = []
+    for topics in topic_sets:
+        flt = {"fromBlock": hex(lo), "toBlock": hex(hi), "topics": topics}
+        if q.token:
+            flt["address"] = q.token
+        calls.append(("eth_getLogs", [flt]))
+    return calls
+
+
+def _log_key(log: dict) -> Tuple[int, int]:
+    return int(log["blockNumber"], 16), int(log["logIndex"], 16)
+
+
+def _record(log: dict, ts: Optional[int], token: Tuple[Optional[str], Optional[int]]) -> TxRecord:
+    block, index = _log_key(log)
+    topics = log["topics"]
+    symbol, decimals = token
+    return TxRecord(
+        chain="ETH",
+        tx_id=log.get("transactionHash"),
+        ts=ts,
+        block_height=block,
+        from_addr=_address(topics[1]),
+        to_addr=_address(topics[2]),
+        amount_raw=int(log.get("data") or "0x0", 16),
+        amount_decimals=decimals,
+        asset=symbol or "TOKEN",
+        status="confirmed",
+        meta={"kind": "erc20", "log_index": index, "contract": log.get("address")},
+    )
+
+
+# === Scan ===
+
+_Scan = Generator[List[_Call], list, TxPage]
+
+
+def _block_times(url: str, blocks: List[int]) -> Generator[List[_Call], list, Dict[int, Optional[int]]]:
+    times: Dict[int, Optional[int]] = {}
+    missing = []
+    for b in blocks:
+        ts = _time_cache.get((url, b))
+        if ts is None:
+            missing.append(b)
+        else:
+            times[b] = ts
+    if missing:
+        results = yield [("eth_getBlockByNumber", [hex(b), False]) for b in missing]
+        for b, block in zip(missing, results):
+            ts = int(block["timestamp"], 16) if isinstance(block, dict) and block.get("timestamp") else None
+            if ts is not None:
+                _time_cache.set((url, b), ts)
+            times[b] = ts
+    return times
+
+
+def _token_info(url: str, contracts: List[str]) -> Generator[List[_Call], list, Dict[str, tuple]]:
+    info: Dict[str, tuple] = {}
+    missing = []
+    for c in contracts:
+        cached = _token_cache.get((url, c.lower()))
+        if cached is None:
+            missing.append(c)
+        else:
+            info[c] = cached
+    if missing:
+        calls = []
+        for c in missing:
+            calls.append(("eth_call", [{"to": c, "data": DECIMALS_CALL}, "latest"]))
+            calls.append(("eth_call", [{"to": c, "data": SYMBOL_CALL}, "latest"]))
+        results = yield calls
+        for i, c in enumerate(missing):
+            decimals, symbol = results[2 * i], results[2 * i + 1]
+            dec = int(decimals, 16) if isinstance(decimals, str) and decimals not in ("0x", "") else None
+            sym = _decode_string(symbol) if isinstance(symbol, str) else None
+            info[c] = (sym, dec)
+            _token_cache.set((url, c.lower()), info[c])
+    return info
+
+
+def _first_block_at(url: str, ts: int, lo: int, hi: int) -> Generator[List[_Call], list, int]:
+    """First block in ``[lo, hi]`` produced at or after ``ts``."""
+    search = block_index(url).first_at(ts, lo, hi)
+    try:
+        block = next(search)
+        while True:
+            times = yield from _block_times(url, [block])
+            block = search.send(times.get(block))
+    except StopIteration as stop:
+        return stop.value
+
+
+def _scan(q: TxQuery, url: str) -> _Scan:
+    """Collect up to ``q.limit`` transfers, newest first."""
+    extra = q.extra or {}
+    floor = int(extra.get("start_block", 0))
+    cursor = _cursor(q)
+    if cursor is not None:
+        hi, before = cursor
+    else:
+        (head,) = yield [("eth_blockNumber", [])]
+        _raise_first([head])
+        hi, before = int(head, 16), None
+        if q.until_ts:
+            hi = (yield from _first_block_at(url, int(q.until_ts) + 1, floor, hi)) - 1
+    if q.since_ts and hi >= floor:
+        floor = yield from _first_block_at(url, int(q.since_ts), floor, hi)
+    span = int(extra.get("block_range") or _spans.get(url, INITIAL_RANGE))
+    items: List[TxRecord] = []
+    last_key: Optional[Tuple[int, int]] = None
+    while hi >= floor and len(items) < q.limit:
+        lo = max(floor, hi - span + 1)
+        results = yield _filters(q, lo, hi)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            if not _too_large(failed[0]) or hi == lo:
+                raise failed[0]
+            hint = _range_hint(failed[0])
+            span = max(1, hint if hint and hint < span else span // 2)
+            continue
+        logs: Dict[Tuple[int, int], dict] = {}
+        for batch in results:
+            for log in batch or ():
+                # ERC-721 Transfer indexes the token id as a fourth topic.
+                if log.get("removed") or len(log.get("topics") or ()) != 3:
+                    continue
+                key = _log_key(log)
+                if before is not None and key[0] == cursor[0] and key[1] >= before:
+                    continue
+                logs[key] = log  # self-transfers match both filters
+        pending = [logs[k] for k in sorted(logs, reverse=True)]
+        while pending and len(items) < q.limit:
+            # Only look up blocks and tokens of logs that can still fit.
+            chunk, pending = pending[:q.limit - len(items)], pending[q.limit - len(items):]
+            times = yield from _block_times(url, sorted({_log_key(log)[0] for log in chunk}))
+            tokens = yield from _token_info(url, sorted({log["address"] for log in chunk}))
+            for log in chunk:
+                ts = times.get(_log_key(log)[0])
+                if newer(q, ts):
+                    continue
+                if older(q, ts):
+                    # Older than the window: nothing further back matters.
+                    _spans[url] = span
+                    return TxPage(items=items)
+                items.append(_record(log, ts, tokens[log["address"]]))
+                last_key = _log_key(log)
+        if len(logs) < GROW_BELOW:
+            span = min(MAX_RANGE, span * 2)
+        if len(items) < q.limit:
+            hi = lo - 1
+    _spans[url] = span
+    if len(items) >= q.limit and last_key is not None:
+        return TxPage(items=items, next_cursor=f"{last_key[0]}:{last_key[1]}")
+    return TxPage(items=items)
+
+
+def list_transactions(q: TxQuery) -> TxPage:
+    """Return ERC-20 transfers of ``q.address`` (optionally one ``q.token``)."""
+    url = q.rpc_url or RPC_URL
+    scan = _scan(q, url)
+    try:
+        calls = next(scan)
+        while True:
+            calls = scan.send(_rpc_batch(url, calls))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def alist_transactions(q: TxQuery) -> TxPage:
+    """Async variant of :func:`list_transactions` over the pooled transport."""
+    url = q.rpc_url or RPC_URL
+    scan = _scan(q, url)
+    try:
+        calls = next(scan)
+        while True:
+            calls = scan.send(await _arpc_batch(url, calls))
+    except StopIteration as stop:
+        return stop.value
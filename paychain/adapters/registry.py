@@ -0,0 +1,87 @@
+"""Lazy registry mapping chain codes to adapter modules.
+
+Adapters are imported on first use, so importing the dispatcher costs
+nothing for chains that are never queried. Third-party packages add chains
+through the ``paychain.adapters`` entry point group; the entry point name is
+the chain code and its value a module (or object) exposing
+``list_transactions(q)`` and ``alist_transactions(q)``::
+
+    [project.entry-points."paychain.adapters"]
+    POLYGON = "paychain_polygon.adapter"
+
+Installed entry points are only scanned when an unknown chain is requested.
+"""
+import importlib
+import threading
+from typing import Any, Dict, List, Union
+
+ENTRY_POINT_GROUP = "paychain.adapters"
+
+# Built-in chains: code -> module path.
+BUILTIN: Dict[str, str] = {
+    "BTC": "paychain.adapters.btc",
+    "ETH": "paychain.adapters.eth",
+    "SOL": "paychain.adapters.sol",
+    "TON": "paychain.adapters.ton",
+    "TRON": "paychain.adapters.tron",
+}
+ALIASES: Dict[str, str] = {"TRX": "TRON"}
+
+_targets: Dict[str, Union[str, Any]] = dict(BUILTIN)
+_loaded: Dict[str, Any] = {}
+_entry_points_scanned = False
+_lock = threading.Lock()
+
+
+def canonical(chain: str) -> str:
+    chain = chain.upper()
+    return ALIASES.get(chain, chain)
+
+
+def register(chain: str, adapter: Union[str, Any]) -> None:
+    """Register ``adapter`` (module path or object) for ``chain``."""
+    chain = canonical(chain)
+    with _lock:
+        _targets[chain] = adapter
+        _loaded.pop(chain, None)
+
+
+def _scan_entry_points() -> None:
+    global _entry_points_scanned
+    if _entry_points_scanned:
+        return
+    from importlib.metadata import entry_points
+
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        # Explicit registrations and built-ins win over plugins.
+        _targets.setdefault(canonical(ep.name), ep)
+    _entry_points_scanned = True
+
+
+def get_adapter(chain: str) -> Any:
+    """Return the adapter for ``chain``, importing it on first use."""
+    code = canonical(chain)
+    adapter = _loaded.get(code)
+    if adapter is not None:
+        return adapter
+    with _lock:
+        if code not in _targets:
+            _scan_entry_points()
+        target = _targets.get(code)
+        if target is None:
+            raise ValueError(f"Unsupported chain: {chain.upper()}")
+        if isinstance(target, str):
+            adapter = importlib.import_module(target)
+        elif hasattr(target, "load") and hasattr(target, "group"):
+            adapter = target.load()
+        else:
+            adapter = target
+        _loaded[code] = adapter
+        return adapter
+
+
+def available() -> List[str]:
+    """Known chain codes, including installed plugins."""
+    with _lock:
+        _scan_entry_points()
+        return sorted(_targets)
@@ -1,115 +1,405 @@
-"""Solana adapter using JSON-RPC requests."""
+"""Solana adapter using JSON-RPC requests.
+
+Token queries scan the owner's token accounts for ``q.token`` (see
+:mod:`paychain.adapters.sol_accounts`) instead of the owner itself, so only
+transactions touching the mint are fetched. Each account pages by its own
+``before`` signature inside the cursor (``"<account>=<signature>;..."``).
+``q.extra["token_accounts"]`` overrides discovery with a list of accounts;
+``False`` scans the owner like native queries. Owners without any known
+token account fall back to the owner scan as well.
+
+Signature listings take no time or slot bounds; paging stops at the first
+signature older than ``since_ts``, and signatures outside the window are
+never fetched as transactions.
+"""
+import heapq
+from typing import List, Optional
+
 import requests
-from typing import List
 
+from paychain.adapters import sol_accounts
+from paychain.core import transport
+from paychain.core.timerange import newer, older
 from paychain.core.types import TxQuery, TxRecord, TxPage
 
 # Default Solana RPC URL. MAY CHANGE.
 RPC_URL = "https://api.mainnet-beta.solana.com"
+TX_CONFIG = {"encoding": "json", "maxSupportedTransactionVersion": 0}
+# Calls per JSON-RPC batch (q.extra["batch_size"]).
+BATCH_SIZE = 50
+# Parallel single calls when a provider rejects batches (q.extra["concurrency"]).
+MAX_CONCURRENCY = 8
+
+# Account cursor marker of a token account with no older signatures.
+EXHAUSTED = "-"
+# Only account keys are needed from getTokenAccountsByOwner.
+ACCOUNTS_CONFIG = {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}
+
+# RPC URLs known to reject batch payloads.
+_no_batch: set[str] = set()
+
+
+def _payload(method: str, params: List, req_id: int = 1) -> dict:
+    return {"jsonrpc": "2.0", "id": req_id, "method": method, "params": params}
 
 
 def _rpc_call(url: str, method: str, params: List) -> dict:
-    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
-    resp = requests.post(url, json=payload, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
+    data = transport.post_json(url, _payload(method, params))
     return data.get("result")
 
 
-def list_transactions(q: TxQuery) -> TxPage:
-    """Return last transactions for the given address on Solana."""
-    url = q.rpc_url or RPC_URL
-    limit = q.limit
-    sig_params = [q.address, {"limit": limit}]
-    signatures = _rpc_call(url, "getSignaturesForAddress", sig_params) or []
+async def _arpc_call(url: str, method: str, params: List) -> dict:
+    data = await transport.apost_json(url, _payload(method, params))
+    return data.get("result")
+
+
+def _batch_payload(method: str, params_list: List[List]) -> List[dict]:
+    return [_payload(method, params, i) for i, params in enumerate(params_list)]
+
+
+def _correlate(reply, count: int) -> Optional[list]:
+    """Order batch replies by id; None if the reply is not a batch response."""
+    if not isinstance(reply, list):
+        return None
+    by_id = {r.get("id"): r.get("result") for r in reply if isinstance(r, dict)}
+    return [by_id.get(i) for i in range(count)]
+
+
+def _is_batch_rejection(err: requests.HTTPError) -> bool:
+    status = getattr(err.response, "status_code", None)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _options(q: TxQuery) -> tuple[int, int]:
+    extra = q.extra or {}
+    return (
+        max(1, int(extra.get("batch_size", BATCH_SIZE))),
+        max(1, int(extra.get("concurrency", MAX_CONCURRENCY))),
+    )
+
+
+def _rpc_batch(
+    url: str,
+    method: str,
+    params_list: List[List],
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = MAX_CONCURRENCY,
+) -> list:
+    """Call ``method`` once per params entry, results in input order.
+
+    Uses JSON-RPC array payloads of ``batch_size`` calls. Providers that
+    reject batches are remembered and served by at most ``concurrency``
+    parallel single calls instead.
+    """
+    results: list = []
+    for chunk in _chunks(params_list, batch_size):
+        if url in _no_batch:
+            break
+        try:
+            reply = transport.post_json(url, _batch_payload(method, chunk))
+        except requests.HTTPError as e:
+            if not _is_batch_rejection(e):
+                raise
+            reply = None
+        ordered = _correlate(reply, len(chunk))
+        if ordered is None:
+            _no_batch.add(url)
+            break
+        results.extend(ordered)
+    rest = params_list[len(results):]
+    if rest:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(rest))) as pool:
+            results.extend(pool.map(lambda p: _rpc_call(url, method, p), rest))
+    return results
+
+
+async def _arpc_batch(
+    url: str,
+    method: str,
+    params_list: List[List],
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = MAX_CONCURRENCY,
+) -> list:
+    """Async variant of :func:`_rpc_batch`."""
+    results: list = []
+    for chunk in _chunks(params_list, batch_size):
+        if url in _no_batch:
+            break
+        try:
+            reply = await transport.apost_json(url, _batch_payload(method, chunk))
+        except requests.HTTPError as e:
+            if not _is_batch_rejection(e):
+                raise
+            reply = None
+        ordered = _correlate(reply, len(chunk))
+        if ordered is None:
+            _no_batch.add(url)
+            break
+        results.extend(ordered)
+    rest = params_list[len(results):]
+    if rest:
+        import asyncio
+
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(params):
+            async with sem:
+                return await _arpc_call(url, method, params)
+
+        results.extend(await asyncio.gather(*(one(p) for p in rest)))
+    return results
+
+
+def _in_range(q: TxQuery, sig_info: dict) -> bool:
+    ts = sig_info.get("blockTime")
+    return not (older(q, ts) or newer(q, ts))
+
+
+def _parse_tx(q: TxQuery, sig: str, tx: Optional[dict]) -> Optional[TxRecord]:
+    """Build a record from a ``getTransaction`` result, or None if irrelevant."""
+    if not tx:
+        return None
+    meta = tx.get("meta", {})
+    status = "failed" if meta.get("err") else "confirmed"
+    block_time = tx.get("blockTime")
+    slot = tx.get("slot")
+    if not q.token:
+        message = tx.get("transaction", {}).get("message", {})
+        instructions = message.get("instructions", [])
+        for inst in instructions:
+            if inst.get("program") == "system" and inst.get("parsed", {}).get("type") == "transfer":
+                info = inst["parsed"]["info"]
+                from_addr = info.get("source")
+                to_addr = info.get("destination")
+                amount = int(info.get("lamports", 0))
+                direction = "incoming" if to_addr == q.address else "outgoing" if from_addr == q.address else "all"
+                if q.direction == "incoming" and direction != "incoming":
+                    return None
+                if q.direction == "outgoing" and direction != "outgoing":
+                    return None
+                return TxRecord(
+                    chain="SOL",
+                    tx_id=sig,
+                    ts=block_time,
+                    block_height=slot,
+                    from_addr=from_addr,
+                    to_addr=to_addr,
+                    amount_raw=amount,
+                    amount_decimals=9,
+                    asset="SOL",
+                    status=status,
+                )
+        return None
+    mint = q.token
+    pre = meta.get("preTokenBalances", [])
+    post = meta.get("postTokenBalances", [])
+    pre_amt = 0
+    post_amt = 0
+    decimals = 0
+    for b in pre:
+        if b.get("owner") == q.address and b.get("mint") == mint:
+            pre_amt = int(b.get("uiTokenAmount", {}).get("amount", 0))
+            decimals = int(b.get("uiTokenAmount", {}).get("decimals", 0))
+    for b in post:
+        if b.get("owner") == q.address and b.get("mint") == mint:
+            post_amt = int(b.get("uiTokenAmount", {}).get("amount", 0))
+            decimals = int(b.get("uiTokenAmount", {}).get("decimals", decimals))
+    delta = post_amt - pre_amt
+    if delta == 0:
+        return None
+    direction = "incoming" if delta > 0 else "outgoing"
+    if q.direction == "incoming" and direction != "incoming":
+        return None
+    if q.direction == "outgoing" and direction != "outgoing":
+        return None
+    return TxRecord(
+        chain="SOL",
+        tx_id=sig,
+        ts=block_time,
+        block_height=slot,
+        from_addr=None,
+        to_addr=None,
+        amount_raw=abs(delta),
+        amount_decimals=decimals,
+        asset="TOKEN",
+        status=status,
+    )
+
+
+def _sig_params(q: TxQuery, address: Optional[str] = None, before: Optional[str] = None) -> List:
+    opts = {"limit": q.limit}
+    if address is None:
+        before = (q.extra or {}).get("cursor")
+    if before:
+        opts["before"] = before
+    return [address or q.address, opts]
+
+
+def _next_cursor(q: TxQuery, signatures: list) -> Optional[str]:
+    if len(signatures) < q.limit or older(q, signatures[-1].get("blockTime")):
+        return None
+    return signatures[-1].get("signature")
+
+
+def _collect(q: TxQuery, sigs: List[str], txs: list) -> TxPage:
     items: list[TxRecord] = []
-    for sig_info in signatures:
-        sig = sig_info.get("signature")
-        ts = sig_info.get("blockTime")
-        if q.since_ts and ts and ts < q.since_ts:
+    for sig, tx in zip(sigs, txs):
+        rec = _parse_tx(q, sig, tx)
+        if rec is None:
             continue
-        if q.until_ts and ts and ts > q.until_ts:
-            continue
-        tx = _rpc_call(
-            url,
-            "getTransaction",
-            [sig, {"encoding": "json", "maxSupportedTransactionVersion": 0}],
-        )
-        if not tx:
-            continue
-        meta = tx.get("meta", {})
-        status = "failed" if meta.get("err") else "confirmed"
-        block_time = tx.get("blockTime")
-        slot = tx.get("slot")
-        added = False
-        if not q.token:
-            message = tx.get("transaction", {}).get("message", {})
-            instructions = message.get("instructions", [])
-            for inst in instructions:
-                if inst.get("program") == "system" and inst.get("parsed", {}).get("type") == "transfer":
-                    info = inst["parsed"]["info"]
-                    from_addr = info.get("source")
-                    to_addr = info.get("destination")
-                    amount = int(info.get("lamports", 0))
-                    direction = "incoming" if to_addr == q.address else "outgoing" if from_addr == q.address else "all"
-                    if q.direction == "incoming" and direction != "incoming":
-                        break
-                    if q.direction == "outgoing" and direction != "outgoing":
-                        break
-                    items.append(
-                        TxRecord(
-                            chain="SOL",
-                            tx_id=sig,
-                            ts=block_time,
-                            block_height=slot,
-                            from_addr=from_addr,
-                            to_addr=to_addr,
-                            amount_raw=amount,
-                            amount_decimals=9,
-                            asset="SOL",
-                            status=status,
-                        )
-                    )
-                    added = True
-                    break
-        else:
-            mint = q.token
-            pre = meta.get("preTokenBalances", [])
-            post = meta.get("postTokenBalances", [])
-            pre_amt = 0
-            post_amt = 0
-            decimals = 0
-            for b in pre:
-                if b.get("owner") == q.address and b.get("mint") == mint:
-                    pre_amt = int(b.get("uiTokenAmount", {}).get("amount", 0))
-                    decimals = int(b.get("uiTokenAmount", {}).get("decimals", 0))
-            for b in post:
-                if b.get("owner") == q.address and b.get("mint") == mint:
-                    post_amt = int(b.get("uiTokenAmount", {}).get("amount", 0))
-                    decimals = int(b.get("uiTokenAmount", {}).get("decimals", decimals))
-            delta = post_amt - pre_amt
-            if delta != 0:
-                direction = "incoming" if delta > 0 else "outgoing"
-                if q.direction == "incoming" and direction != "incoming":
-                    pass
-                elif q.direction == "outgoing" and direction != "outgoing":
-                    pass
-                else:
-                    items.append(
-                        TxRecord(
-                            chain="SOL",
-                            tx_id=sig,
-                            ts=block_time,
-                            block_height=slot,
-                            from_addr=None,
-                            to_addr=None,
-                            amount_raw=abs(delta),
-                            amount_decimals=decimals,
-                            asset="TOKEN",
-                            status=status,
-                        )
-                    )
-                    added = True
-        if added and len(items) >= q.limit:
+        items.append(rec)
+        if len(items) >= q.limit:
             break
     return TxPage(items=items)
+
+
+# === Token accounts ===
+
+
+def _accounts_params(q: TxQuery) -> List:
+    return [q.address, {"mint": q.token}, ACCOUNTS_CONFIG]
+
+
+def _known_accounts(q: TxQuery) -> tuple[Optional[List[str]], bool]:
+    """``(accounts, discovery due)``; ``([], False)`` means scan the owner."""
+    extra = q.extra or {}
+    option = extra.get("token_accounts", True)
+    cursor = extra.get("cursor")
+    if not q.token or option is False or (cursor and "=" not in str(cursor)):
+        # Native history, disabled, or resuming an owner scan.
+        return [], False
+    if isinstance(option, (list, tuple)):
+        return list(option), False
+    accounts = sol_accounts.get_index().get(q.address, q.token)
+    return accounts, accounts is None
+
+
+def _remember_accounts(q: TxQuery, result: Optional[dict]) -> List[str]:
+    found = [a.get("pubkey") for a in (result or {}).get("value") or [] if isinstance(a, dict)]
+    return sol_accounts.get_index().put(q.address, q.token, [a for a in found if a])
+
+
+def _account_state(q: TxQuery, accounts: List[str]) -> dict[str, str]:
+    """Per-account ``before`` signature: ``""`` for the tip, ``EXHAUSTED`` when done."""
+    cursor = (q.extra or {}).get("cursor")
+    if not cursor:
+        return {a: "" for a in accounts}
+    # Accounts created after the first page only hold newer history.
+    return dict(part.split("=", 1) for part in str(cursor).split(";") if "=" in part)
+
+
+def _merge_signatures(q: TxQuery, state: dict[str, str], results: dict[str, list]) -> tuple[list, Optional[str]]:
+    """Newest-first signatures of all accounts and the next account cursor."""
+    live: dict[str, list] = {}
+    more: dict[str, bool] = {}
+    for account, rows in results.items():
+        # An account whose signatures pass ``since_ts`` is finished.
+        live[account] = [r for r in rows if not older(q, r.get("blockTime"))]
+        more[account] = len(rows) >= q.limit and len(live[account]) == len(rows)
+
+    def entries(account: str, rows: list):
+        slot = None
+        for row in rows:
+            slot = row.get("slot") or 0
+            yield (-slot, 0), account, row
+        if more[account] and slot is not None:
+            # Older signatures of this account are not fetched yet; rows of
+            # other accounts in the same slot may still pass.
+            yield (-slot, 1), account, None
+
+    consumed = dict(state)
+    seen: set = set()
+    signatures: list = []
+    for _, account, row in heapq.merge(*(entries(a, r) for a, r in live.items()), key=lambda e: e[0]):
+        if row is None:
+            break
+        sig = row.get("signature")
+        if sig in seen:
+            # Same transaction seen through another account of the owner.
+            consumed[account] = sig
+            continue
+        if len(signatures) >= q.limit:
+            break
+        consumed[account] = sig
+        seen.add(sig)
+        signatures.append(row)
+    parts = []
+    for account, before in consumed.items():
+        rows = live.get(account)
+        if rows is not None and not more[account] and (not rows or before == rows[-1].get("signature")):
+            before = EXHAUSTED
+        parts.append(f"{account}={before}")
+    if all(p.endswith("=" + EXHAUSTED) for p in parts):
+        return signatures, None
+    return signatures, ";".join(parts)
+
+
+def _in_range_sigs(q: TxQuery, signatures: list) -> List[str]:
+    return [s.get("signature") for s in signatures if _in_range(q, s)]
+
+
+def _list_accounts(q: TxQuery, url: str, accounts: List[str], batch_size: int, concurrency: int) -> TxPage:
+    state = _account_state(q, accounts)
+    active = [a for a, before in state.items() if before != EXHAUSTED]
+    fetched = _rpc_batch(url, "getSignaturesForAddress", [_sig_params(q, a, state[a]) for a in active],
+                         batch_size, concurrency)
+    signatures, cursor = _merge_signatures(q, state, {a: r or [] for a, r in zip(active, fetched)})
+    sigs = _in_range_sigs(q, signatures)
+    txs = _rpc_batch(url, "getTransaction", [[sig, TX_CONFIG] for sig in sigs], batch_size, concurrency)
+    page = _collect(q, sigs, txs)
+    page.next_cursor = cursor
+    return page
+
+
+async def _alist_accounts(q: TxQuery, url: str, accounts: List[str], batch_size: int, concurrency: int) -> TxPage:
+    state = _account_state(q, accounts)
+    active = [a for a, before in state.items() if before != EXHAUSTED]
+    fetched = await _arpc_batch(url, "getSignaturesForAddress", [_sig_params(q, a, state[a]) for a in active],
+                                batch_size, concurrency)
+    signatures, cursor = _merge_signatures(q, state, {a: r or [] for a, r in zip(active, fetched)})
+    sigs = _in_range_sigs(q, signatures)
+    txs = await _arpc_batch(url, "getTransaction", [[sig, TX_CONFIG] for sig in sigs], batch_size, concurrency)
+    page = _collect(q, sigs, txs)
+    page.next_cursor = cursor
+    return page
+
+
+def list_transactions(q: TxQuery) -> TxPage:
+    """Return last transactions for the given address on Solana."""
+    url = q.rpc_url or RPC_URL
+    batch_size, concurrency = _options(q)
+    accounts, discover = _known_accounts(q)
+    if discover:
+        accounts = _remember_accounts(q, _rpc_call(url, "getTokenAccountsByOwner", _accounts_params(q)))
+    if accounts:
+        return _list_accounts(q, url, accounts, batch_size, concurrency)
+    signatures = _rpc_call(url, "getSignaturesForAddress", _sig_params(q)) or []
+    sigs = _in_range_sigs(q, signatures)
+    txs = _rpc_batch(url, "getTransaction", [[sig, TX_CONFIG] for sig in sigs], batch_size, concurrency)
+    page = _collect(q, sigs, txs)
+    page.next_cursor = _next_cursor(q, signatures)
+    return page
+
+
+async def alist_transactions(q: TxQuery) -> TxPage:
+    """Async variant of :func:`list_transactions` over the pooled transport."""
+    url = q.rpc_url or RPC_URL
+    batch_size, concurrency = _options(q)
+    accounts, discover = _known_accounts(q)
+    if discover:
+        accounts = _remember_accounts(q, await _arpc_call(url, "getTokenAccountsByOwner", _accounts_params(q)))
+    if accounts:
+        return await _alist_accounts(q, url, accounts, batch_size, concurrency)
+    signatures = await _arpc_call(url, "getSignaturesForAddress", _sig_params(q)) or []
+    sigs = _in_range_sigs(q, signatures)
+    txs = await _arpc_batch(url, "getTransaction", [[sig, TX_CONFIG] for sig in sigs], batch_size, concurrency)
+    page = _collect(q, sigs, txs)
+    page.next_cursor = _next_cursor(q, signatures)
+    return page
@@ -0,0 +1,98 @@
+"""Persistent owner -> SPL token account index for the Solana adapter.
+
+Token history is scanned per token account rather than per owner, so only
+transactions touching the mint are fetched. Discovered accounts are kept in
+SQLite and never forgotten: a closed account drops out of
+``getTokenAccountsByOwner`` but its history still belongs to the owner.
+Discovery is repeated at most once per ``ttl`` seconds for an owner/mint.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+# Default database location. Override with PAYCHAIN_SOL_ACCOUNTS.
+DEFAULT_PATH = "data/sol_token_accounts.sqlite"
+# Seconds before an owner's accounts are re-discovered.
+DISCOVERY_TTL = 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_accounts (
+    owner TEXT NOT NULL,
+    mint TEXT NOT NULL,
+    account TEXT NOT NULL,
+    PRIMARY KEY (owner, mint, account)
+);
+CREATE TABLE IF NOT EXISTS discoveries (
+    owner TEXT NOT NULL,
+    mint TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (owner, mint)
+);
+"""
+
+
+class TokenAccountIndex:
+    """Token accounts per ``(owner, mint)`` with the time of the last discovery."""
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = DISCOVERY_TTL):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def get(self, owner: str, mint: str) -> Optional[List[str]]:
+        """Known accounts, or None when a (re-)discovery is due."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checked_at FROM discoveries WHERE owner=? AND mint=?", (owner, mint)
+            ).fetchone()
+            if row is None or time.time() - row[0] > self.ttl:
+                return None
+            rows = self._conn.execute(
+                "SELECT account FROM token_accounts WHERE owner=? AND mint=? ORDER BY account", (owner, mint)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def put(self, owner: str, mint: str, accounts: Iterable[str]) -> List[str]:
+        """Merge freshly discovered ``accounts``; return all known ones."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO token_accounts (owner, mint, account) VALUES (?, ?, ?)",
+                [(owner, mint, a) for a in accounts],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO discoveries (owner, mint, checked_at) VALUES (?, ?, ?)",
+                (owner, mint, time.time()),
+            )
+            rows = self._conn.execute(
+                "SELECT account FROM token_accounts WHERE owner=? AND mint=? ORDER BY account", (owner, mint)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_index: Optional[TokenAccountIndex] = None
+
+
+def get_index() -> TokenAccountIndex:
+    """Process-wide index, opened on first use."""
+    global _index
+    if _index is None:
+        _index = TokenAccountIndex(os.getenv("PAYCHAIN_SOL_ACCOUNTS", DEFAULT_PATH))
+    return _index
+
+
+def set_index(index: Optional[TokenAccountIndex]) -> Optional[TokenAccountIndex]:
+    """Install ``index`` process-wide and return the previous one."""
+    global _index
+    prev, _index = _index, index
+    return prev
@@ -1,61 +1,222 @@
-"""TON adapter using TonAPI REST."""
+"""TON adapter using TonAPI REST.
+
+Every ``TonTransfer`` and ``JettonTransfer`` action of an event becomes a
+record. Jetton amounts use the decimals of the jetton master; they come with
+the event's jetton preview and are cached per master, falling back to one
+``/jettons/{master}`` lookup when a preview omits them.
+
+Pages are addressed by logical time: ``next_cursor`` is ``"<before_lt>"`` or,
+when a page ends inside a multi-action event, ``"<before_lt>:<action>"``.
+``q.extra["after_lt"]`` stops paging at the first event not newer than that
+lt, so polling with the last seen lt fetches only new events.
+"""
+import base64
 import os
-import requests
+import threading
+from typing import Optional
 
+from paychain.core import transport
+from paychain.core.timerange import newer, older
 from paychain.core.types import TxQuery, TxRecord, TxPage
 
 # Base TonAPI URL. MAY CHANGE.
 API_URL = "https://tonapi.io/v2"
+# TonAPI's maximum page size for account events.
+MAX_LIMIT = 100
+TON_DECIMALS = 9
+JETTON_CACHE_SIZE = 4096
 
+# (api base, jetton master in raw form) -> (symbol, decimals).
+_jettons: dict[tuple[str, str], tuple[str, int]] = {}
+_jettons_lock = threading.Lock()
 
-def list_transactions(q: TxQuery) -> TxPage:
-    """Return last transactions for the given address on TON."""
-    base = q.rpc_url or API_URL
+
+def _raw(addr: Optional[str]) -> Optional[str]:
+    """Raw ``wc:hex`` form of a raw or user-friendly address."""
+    if not addr:
+        return addr
+    if ":" in addr:
+        wc, _, hex_part = addr.partition(":")
+        return f"{int(wc)}:{hex_part.lower()}"
+    try:
+        data = base64.urlsafe_b64decode(addr.replace("+", "-").replace("/", "_") + "==")
+    except ValueError:
+        return addr
+    if len(data) != 36:
+        return addr
+    return f"{int.from_bytes(data[1:2], 'big', signed=True)}:{data[2:34].hex()}"
+
+
+def _account(value) -> Optional[str]:
+    # TonAPI returns account objects; older payloads used plain strings.
+    if isinstance(value, dict):
+        return value.get("address")
+    return value
+
+
+def _cached_jetton(base: str, master: str) -> Optional[tuple[str, int]]:
+    with _jettons_lock:
+        return _jettons.get((base, _raw(master)))
+
+
+def _remember_jetton(base: str, master: str, symbol: str, decimals: int) -> None:
+    with _jettons_lock:
+        if len(_jettons) >= JETTON_CACHE_SIZE:
+            _jettons.pop(next(iter(_jettons)))
+        _jettons[(base, _raw(master))] = (symbol, decimals)
+
+
+def _base(q: TxQuery) -> str:
+    return q.rpc_url or API_URL
+
+
+def _headers(q: TxQuery) -> dict:
     api_key = q.api_key or os.getenv("TONAPI_TOKEN")
     headers = {}
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
-    params = {"limit": q.limit, "sort": "desc"}
-    resp = requests.get(f"{base}/accounts/{q.address}/events", params=params, headers=headers, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
+    return headers
+
+
+def _cursor(q: TxQuery) -> tuple[Optional[str], int]:
+    cursor = (q.extra or {}).get("cursor")
+    if not cursor:
+        return None, 0
+    before_lt, _, action = str(cursor).partition(":")
+    return before_lt, int(action or 0)
+
+
+def _request(q: TxQuery) -> tuple[str, dict, dict]:
+    params = {"limit": min(q.limit, MAX_LIMIT), "sort": "desc"}
+    before_lt, _ = _cursor(q)
+    if before_lt:
+        params["before_lt"] = before_lt
+    if q.since_ts:
+        params["start_date"] = int(q.since_ts)
+    if q.until_ts:
+        params["end_date"] = int(q.until_ts)
+    return f"{_base(q)}/accounts/{q.address}/events", params, _headers(q)
+
+
+def _learn_jettons(base: str, data: dict) -> list[str]:
+    """Cache jetton previews of a page; return masters still missing decimals."""
+    missing = []
+    for ev in data.get("events") or data.get("items") or []:
+        for act in ev.get("actions", []):
+            jetton = (act.get("JettonTransfer") or {}).get("jetton") or {}
+            master = jetton.get("address")
+            if not master or _cached_jetton(base, master):
+                continue
+            if jetton.get("decimals") is not None:
+                _remember_jetton(base, master, jetton.get("symbol") or "JETTON", int(jetton["decimals"]))
+            elif master not in missing:
+                missing.append(master)
+    return missing
+
+
+def _jetton_request(q: TxQuery, master: str) -> tuple[str, dict]:
+    return f"{_base(q)}/jettons/{master}", _headers(q)
+
+
+def _remember_metadata(base: str, master: str, info: dict) -> None:
+    meta = info.get("metadata") or {}
+    _remember_jetton(base, master, meta.get("symbol") or "JETTON", int(meta.get("decimals", TON_DECIMALS)))
+
+
+def _action_record(q: TxQuery, ev: dict, index: int, act: dict, ts, status: str) -> Optional[TxRecord]:
+    tt = act.get("type")
+    if tt in ("TonTransfer", "SimpleTransfer"):
+        info = act.get(tt) or act.get("action", {})
+        asset, decimals, meta = "TON", TON_DECIMALS, {"kind": "ton"}
+    elif tt == "JettonTransfer":
+        info = act.get(tt) or {}
+        master = (info.get("jetton") or {}).get("address")
+        symbol, decimals = _cached_jetton(_base(q), master) or ("JETTON", None)
+        asset, meta = symbol, {"kind": "jetton", "jetton": master}
+    else:
+        return None
+    from_addr = _account(info.get("sender") or info.get("from"))
+    to_addr = _account(info.get("recipient") or info.get("to"))
+    me = _raw(q.address)
+    if q.direction == "incoming" and _raw(to_addr) != me:
+        return None
+    if q.direction == "outgoing" and _raw(from_addr) != me:
+        return None
+    if act.get("status") == "failed":
+        status = "failed"
+    event_id = str(ev.get("event_id")) if ev.get("event_id") else str(ev.get("lt"))
+    meta["action"] = index
+    return TxRecord(
+        chain="TON",
+        # One record per action; the first keeps the bare event id.
+        tx_id=event_id if index == 0 else f"{event_id}:{index}",
+        ts=ts,
+        block_height=ev.get("lt"),
+        from_addr=from_addr,
+        to_addr=to_addr,
+        amount_raw=int(info.get("amount", 0)),
+        amount_decimals=decimals,
+        asset=asset,
+        status=status,
+        meta=meta,
+    )
+
+
+def _parse(q: TxQuery, data: dict) -> TxPage:
     events = data.get("events") or data.get("items") or []
+    before_lt, skip = _cursor(q)
+    after_lt = (q.extra or {}).get("after_lt")
     items: list[TxRecord] = []
-    for ev in events:
+    for n, ev in enumerate(events):
+        lt = ev.get("lt")
+        if after_lt is not None and lt is not None and int(lt) <= int(after_lt):
+            return TxPage(items=items, next_cursor=None)
         ts = ev.get("timestamp") or ev.get("utime")
-        if q.since_ts and ts and ts < q.since_ts:
-            continue
-        if q.until_ts and ts and ts > q.until_ts:
+        if older(q, ts):
+            # Events are newest first: nothing older can match.
+            return TxPage(items=items, next_cursor=None)
+        if newer(q, ts):
             continue
+        # Resume inside the event the previous page stopped in.
+        first = skip if n == 0 and before_lt and lt is not None and int(lt) == int(before_lt) - 1 else 0
+        status = "pending" if ev.get("in_progress") else "confirmed"
         actions = ev.get("actions", [])
-        for act in actions:
-            tt = act.get("type")
-            if tt not in ("TonTransfer", "SimpleTransfer"):
-                continue
-            info = act.get("TonTransfer") or act.get("SimpleTransfer") or act.get("action", {})
-            from_addr = info.get("sender") or info.get("from")
-            to_addr = info.get("recipient") or info.get("to")
-            amount = int(info.get("amount", 0))
-            direction = "incoming" if to_addr == q.address else "outgoing" if from_addr == q.address else "all"
-            if q.direction == "incoming" and direction != "incoming":
-                continue
-            if q.direction == "outgoing" and direction != "outgoing":
-                continue
-            items.append(
-                TxRecord(
-                    chain="TON",
-                    tx_id=str(ev.get("event_id")) if ev.get("event_id") else str(ev.get("lt")),
-                    ts=ts,
-                    block_height=ev.get("lt"),
-                    from_addr=from_addr,
-                    to_addr=to_addr,
-                    amount_raw=amount,
-                    amount_decimals=9,
-                    asset="TON",
-                    status="confirmed",
-                )
-            )
-            break
-        if len(items) >= q.limit:
-            break
-    return TxPage(items=items)
+        for index in range(first, len(actions)):
+            if len(items) >= q.limit:
+                # Full page: the next one starts at this event's action.
+                return TxPage(items=items, next_cursor=f"{int(lt) + 1}:{index}" if lt is not None else None)
+            rec = _action_record(q, ev, index, actions[index], ts, status)
+            if rec is not None:
+                items.append(rec)
+        if len(items) >= q.limit and lt is not None:
+            return TxPage(items=items, next_cursor=str(lt) if n + 1 < len(events) or data.get("next_from") else None)
+    # ``next_from`` is the logical time to pass as ``before_lt``; 0 at the end.
+    next_from = data.get("next_from")
+    return TxPage(items=items, next_cursor=str(next_from) if next_from and events else None)
+
+
+def list_transactions(q: TxQuery) -> TxPage:
+    """Return last TON and jetton transfers for the given address."""
+    url, params, headers = _request(q)
+    data = transport.get_json(url, params=params, headers=headers)
+    for master in _learn_jettons(_base(q), data):
+        jetton_url, jetton_headers = _jetton_request(q, master)
+        _remember_metadata(_base(q), master, transport.get_json(jetton_url, headers=jetton_headers))
+    return _parse(q, data)
+
+
+async def alist_transactions(q: TxQuery) -> TxPage:
+    """Async variant of :func:`list_transactions` over the pooled transport."""
+    import asyncio
+
+    url, params, headers = _request(q)
+    data = await transport.aget_json(url, params=params, headers=headers)
+    missing = _learn_jettons(_base(q), data)
+    if missing:
+        calls = []
+        for master in missing:
+            jetton_url, jetton_headers = _jetton_request(q, master)
+            calls.append(transport.aget_json(jetton_url, headers=jetton_headers))
+        for master, info in zip(missing, await asyncio.gather(*calls)):
+            _remember_metadata(_base(q), master, info)
+    return _parse(q, data)
@@ -1,23 +1,48 @@
-"""TRON adapter fetching TRC-20 transfers from TronGrid."""
+"""TRON adapter fetching TRC-20 transfers from TronGrid.
+
+The default contract mode scans one TRC-20 contract's ``Transfer`` events
+(incoming only). ``q.extra["mode"] = "account"`` switches to the
+account-centric endpoints instead. Native TRX (``/v1/accounts/{addr}/transactions``)
+and every TRC-20 (``/v1/accounts/{addr}/transactions/trc20``) are read in
+both directions and merged newest first, each stream paging by its own
+fingerprint.
+"""
+import heapq
 import os
-import requests
+from hashlib import sha256
+from typing import Optional
+from urllib.parse import quote, unquote
 
+from paychain.core import transport
+from paychain.core.timerange import newer, older
 from paychain.core.types import TxQuery, TxRecord, TxPage
 
 # Base TronGrid API. MAY CHANGE.
 API_URL = "https://api.trongrid.io"
 # Default USDT TRC-20 contract. MAY CHANGE.
 USDT_CONTRACT = "TXLAQ63Xg1NAzckPwKHvzw7CSEmLMEqcdj"
+# TronGrid's maximum page size for the account endpoints.
+MAX_ACCOUNT_LIMIT = 200
+# Account-mode streams: name -> path suffix.
+ACCOUNT_STREAMS = {"trx": "/transactions", "trc20": "/transactions/trc20"}
+# Account-mode cursor marker of a stream with no older rows.
+EXHAUSTED = "-"
 
+_B58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
 
-def list_transactions(q: TxQuery) -> TxPage:
-    """Return last TRC-20 transactions for the given address (default USDT)."""
-    base = q.rpc_url or API_URL
-    contract = q.token or os.getenv("TRON_USDT_CONTRACT") or USDT_CONTRACT
+
+def _headers(q: TxQuery) -> dict:
     api_key = q.api_key or os.getenv("TRON_API_KEY")
     headers = {"Accept": "application/json"}
     if api_key:
         headers["TRON-PRO-API-KEY"] = api_key
+    return headers
+
+
+def _request(q: TxQuery) -> tuple[str, dict, dict]:
+    base = q.rpc_url or API_URL
+    contract = q.token or os.getenv("TRON_USDT_CONTRACT") or USDT_CONTRACT
+    headers = _headers(q)
     params = {
         "event_name": "Transfer",
         "to": q.address,
@@ -26,21 +51,28 @@ def list_transactions(q: TxQuery) -> TxPage:
     }
     if q.since_ts:
         params["min_block_timestamp"] = int(q.since_ts) * 1000
-    url = f"{base}/v1/contracts/{contract}/events"
-    resp = requests.get(url, params=params, headers=headers, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
+    if q.until_ts:
+        params["max_block_timestamp"] = int(q.until_ts) * 1000
+    cursor = (q.extra or {}).get("cursor")
+    if cursor:
+        params["fingerprint"] = cursor
+    return f"{base}/v1/contracts/{contract}/events", params, headers
+
+
+def _parse(q: TxQuery, data: dict) -> TxPage:
     events = data.get("data", [])
     items: list[TxRecord] = []
     for ev in events:
         result = ev.get("result", {})
         ts = ev.get("block_timestamp")
-        if q.until_ts and ts and ts/1000 > q.until_ts:
+        if ts and older(q, ts // 1000):
+            # Events are newest first: the window is over.
+            return TxPage(items=items)
+        if ts and newer(q, ts // 1000):
             continue
         from_addr = result.get("from")
         to_addr = result.get("to")
         amount = int(result.get("value", 0))
-        direction = "incoming"
         if q.direction == "outgoing" and from_addr != q.address:
             continue
         items.append(
@@ -59,4 +91,236 @@ def list_transactions(q: TxQuery) -> TxPage:
         )
         if len(items) >= q.limit:
             break
-    return TxPage(items=items)
+    # TronGrid pages with an opaque fingerprint; absent on the last page.
+    fingerprint = data.get("meta", {}).get("fingerprint")
+    return TxPage(items=items, next_cursor=fingerprint or None)
+
+
+# === Account mode ===
+
+
+def _base58(hex_addr: str) -> str:
+    """Hex ``41...`` address to base58check ``T...``."""
+    raw = bytes.fromhex(hex_addr)
+    data = raw + sha256(sha256(raw).digest()).digest()[:4]
+    n = int.from_bytes(data, "big")
+    out = ""
+    while n:
+        n, r = divmod(n, 58)
+        out = _B58[r] + out
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + out
+
+
+def _visible(addr: Optional[str]) -> Optional[str]:
+    if addr and len(addr) == 42 and addr.startswith("41"):
+        try:
+            return _base58(addr)
+        except ValueError:
+            return addr
+    return addr
+
+
+def _account_streams(q: TxQuery) -> tuple[str, ...]:
+    # A specific token only lives in the TRC-20 stream.
+    return ("trc20",) if q.token else tuple(ACCOUNT_STREAMS)
+
+
+def _decode_account_cursor(q: TxQuery, streams: tuple[str, ...]) -> dict[str, tuple[str, int, Optional[int]]]:
+    """``"trx=<fingerprint>@<skip>:<pin>;trc20=-"`` -> per-stream (fingerprint, skip, pin).
+
+    ``pin`` is the newest ``block_timestamp`` (ms) of a partly emitted first
+    page. That page has no fingerprint and starts at the live tip, so it is
+    re-read with ``max_timestamp=pin``; rows that arrived since do not shift
+    the ``skip`` offset.
+    """
+    state = {s: ("", 0, None) for s in streams}
+    raw = (q.extra or {}).get("cursor")
+    if raw:
+        for part in str(raw).split(";"):
+            name, _, value = part.partition("=")
+            if name in state:
+                fp, _, rest = value.partition("@")
+                skip, _, pin = rest.partition(":")
+                state[name] = (unquote(fp), int(skip or 0), int(pin) if pin else None)
+    return state
+
+
+def _account_request(q: TxQuery, stream: str, fingerprint: str, pin: Optional[int] = None) -> tuple[str, dict, dict]:
+    base = q.rpc_url or API_URL
+    params = {"limit": min(q.limit, MAX_ACCOUNT_LIMIT), "order_by": "block_timestamp,desc"}
+    if q.direction == "incoming":
+        params["only_to"] = "true"
+    elif q.direction == "outgoing":
+        params["only_from"] = "true"
+    if q.token:
+        params["contract_address"] = q.token
+    if q.since_ts:
+        params["min_timestamp"] = int(q.since_ts) * 1000
+    if q.until_ts:
+        params["max_timestamp"] = int(q.until_ts) * 1000
+    if pin is not None:
+        params["max_timestamp"] = min(pin, params.get("max_timestamp", pin))
+    if fingerprint:
+        params["fingerprint"] = fingerprint
+    return f"{base}/v1/accounts/{q.address}{ACCOUNT_STREAMS[stream]}", params, _headers(q)
+
+
+def _trx_record(tx: dict) -> Optional[TxRecord]:
+    contracts = (tx.get("raw_data") or {}).get("contract") or []
+    if not contracts:
+        return None
+    contract = contracts[0]
+    kind = contract.get("type")
+    value = (contract.get("parameter") or {}).get("value") or {}
+    if kind == "TransferContract":
+        asset, decimals = "TRX", 6
+    elif kind == "TransferAssetContract":
+        # TRC-10 token id; decimals are per token and not in the payload.
+        asset, decimals = str(value.get("asset_name") or "TRC10"), None
+    else:
+        return None
+    ret = (tx.get("ret") or [{}])[0].get("contractRet")
+    ts = tx.get("block_timestamp")
+    return TxRecord(
+        chain="TRON",
+        tx_id=tx.get("txID"),
+        ts=int(ts / 1000) if ts else None,
+        block_height=tx.get("blockNumber"),
+        from_addr=_visible(value.get("owner_address")),
+        to_addr=_visible(value.get("to_address")),
+        amount_raw=int(value.get("amount", 0)),
+        amount_decimals=decimals,
+        asset=asset,
+        status="confirmed" if ret in (None, "SUCCESS") else "failed",
+        meta={"kind": kind},
+    )
+
+
+def _trc20_record(tx: dict) -> Optional[TxRecord]:
+    if tx.get("type") not in (None, "Transfer"):
+        return None
+    token = tx.get("token_info") or {}
+    ts = tx.get("block_timestamp")
+    decimals = token.get("decimals")
+    return TxRecord(
+        chain="TRON",
+        tx_id=tx.get("transaction_id"),
+        ts=int(ts / 1000) if ts else None,
+        block_height=None,
+        from_addr=tx.get("from"),
+        to_addr=tx.get("to"),
+        amount_raw=int(tx.get("value", 0)),
+        amount_decimals=int(decimals) if decimals is not None else None,
+        asset=token.get("symbol") or "TOKEN",
+        status="confirmed",
+        meta={"kind": "trc20", "contract": token.get("address")},
+    )
+
+
+def _account_entries(stream: str, rows: list, skip: int, more: bool):
+    """Merge entries ``(sort key, stream, raw index, row)``; see eth._stream."""
+    key = None
+    for i in range(skip, len(rows)):
+        key = -int(rows[i].get("block_timestamp") or 0)
+        yield key, stream, i, rows[i]
+    if more and key is not None:
+        yield key, stream, len(rows), None
+
+
+def _merge_account(q: TxQuery, streams: tuple[str, ...], state: dict, pages: dict) -> TxPage:
+    entries = []
+    consumed: dict[str, int] = {}
+    for stream in streams:
+        if stream not in pages:
+            continue
+        rows, fingerprint = pages[stream]
+        consumed[stream] = state[stream][1]
+        entries.append(_account_entries(stream, rows, state[stream][1], more=bool(fingerprint)))
+    items: list[TxRecord] = []
+    for _, stream, i, row in heapq.merge(*entries, key=lambda e: e[0]):
+        if row is None or len(items) >= q.limit:
+            break
+        consumed[stream] = i + 1
+        rec = _trx_record(row) if stream == "trx" else _trc20_record(row)
+        if rec is not None:
+            items.append(rec)
+    parts = []
+    for stream in streams:
+        if stream not in pages:
+            parts.append(f"{stream}={EXHAUSTED}")
+            continue
+        rows, fingerprint = pages[stream]
+        current, skip, pin = state[stream]
+        # Once pinned, later pages keep the filter their fingerprints came from.
+        tail = f":{pin}" if pin is not None else ""
+        if consumed[stream] < len(rows):
+            # Re-read the same page next time and skip what was emitted.
+            if not current and pin is None and rows[0].get("block_timestamp"):
+                tail = f":{rows[0]['block_timestamp']}"
+            parts.append(f"{stream}={quote(current, safe='')}@{consumed[stream]}{tail}")
+        elif fingerprint:
+            parts.append(f"{stream}={quote(fingerprint, safe='')}" + (f"@0{tail}" if tail else ""))
+        else:
+            parts.append(f"{stream}={EXHAUSTED}")
+    done = all(p.endswith("=" + EXHAUSTED) for p in parts)
+    return TxPage(items=items, next_cursor=None if done else ";".join(parts))
+
+
+def _account_pages(data_by_stream: dict) -> dict:
+    return {
+        stream: (data.get("data") or [], (data.get("meta") or {}).get("fingerprint"))
+        for stream, data in data_by_stream.items()
+    }
+
+
+def _account_state(q: TxQuery) -> tuple[tuple[str, ...], dict, list]:
+    streams = _account_streams(q)
+    state = _decode_account_cursor(q, streams)
+    active = [s for s in streams if state[s][0] != EXHAUSTED]
+    return streams, state, active
+
+
+def _list_account(q: TxQuery) -> TxPage:
+    from concurrent.futures import ThreadPoolExecutor
+
+    streams, state, active = _account_state(q)
+    with ThreadPoolExecutor(max_workers=max(1, len(active))) as pool:
+        futures = {}
+        for s in active:
+            url, params, headers = _account_request(q, s, state[s][0], state[s][2])
+            futures[s] = pool.submit(transport.get_json, url, params, headers)
+        data = {s: f.result() for s, f in futures.items()}
+    return _merge_account(q, streams, state, _account_pages(data))
+
+
+async def _alist_account(q: TxQuery) -> TxPage:
+    import asyncio
+
+    streams, state, active = _account_state(q)
+    calls = []
+    for s in active:
+        url, params, headers = _account_request(q, s, state[s][0], state[s][2])
+        calls.append(transport.aget_json(url, params=params, headers=headers))
+    results = await asyncio.gather(*calls)
+    return _merge_account(q, streams, state, _account_pages(dict(zip(active, results))))
+
+
+def list_transactions(q: TxQuery) -> TxPage:
+    """Return last TRC-20 transactions for the given address (default USDT).
+
+    With ``q.extra["mode"] = "account"``: TRX and all TRC-20 transfers
+    (or only ``q.token``) in the requested direction.
+    """
+    if (q.extra or {}).get("mode") == "account":
+        return _list_account(q)
+    url, params, headers = _request(q)
+    return _parse(q, transport.get_json(url, params=params, headers=headers))
+
+
+async def alist_transactions(q: TxQuery) -> TxPage:
+    """Async variant of :func:`list_transactions` over the pooled transport."""
+    if (q.extra or {}).get("mode") == "account":
+        return await _alist_account(q)
+    url, params, headers = _request(q)
+    data = await transport.aget_json(url, params=params, headers=headers)
+    return _parse(q, data)
@@ -1,4 +1,5 @@
 """Core package for PayChain."""
 
 # Expose commonly used types
-from .types import TxQuery, TxRecord, TxPage  # noqa: F401
+from .types import TxQuery, TxRecord, TxPage, CompactTxRecord  # noqa: F401
+from .columnar import TxBatch  # noqa: F401
@@ -0,0 +1,89 @@
+"""Shared asyncio HTTP client pool backing ``HttpTransport.asend``.
+
+One keep-alive ``httpx.AsyncClient`` is kept per provider host and per event
+loop, so thousands of concurrent adapter calls reuse a handful of pooled
+connections instead of opening a new one per request. ``httpx`` and
+``asyncio`` are imported lazily: the sync path keeps depending only on
+``requests``.
+"""
+import importlib.util
+import weakref
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+# Pool sizing per provider host.
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 30.0
+
+
+class AsyncClientPool:
+    """Lazily created ``httpx.AsyncClient`` instances keyed by host."""
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        transport=None,
+        http2: bool = False,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        # Optional httpx transport (e.g. ``httpx.MockTransport`` in tests).
+        self.transport = transport
+        # HTTP/2 multiplexes concurrent requests over one connection; it
+        # needs the optional ``h2`` package and falls back to HTTP/1.1.
+        self.http2 = http2
+        # Clients are bound to the loop they were created on.
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _new_client(self):
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        http2 = self.http2 and importlib.util.find_spec("h2") is not None
+        return httpx.AsyncClient(limits=limits, timeout=self.timeout, transport=self.transport, http2=http2)
+
+    def client_for(self, url: str):
+        """Return the pooled client for the host of ``url``."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        host = urlsplit(url).netloc
+        client = clients.get(host)
+        if client is None or client.is_closed:
+            client = clients[host] = self._new_client()
+        return client
+
+    async def aclose(self) -> None:
+        """Close every client created on the running loop."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        clients = self._clients.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
+
+
+_pool = AsyncClientPool()
+
+
+def get_pool() -> AsyncClientPool:
+    return _pool
+
+
+def set_pool(pool: AsyncClientPool) -> None:
+    global _pool
+    _pool = pool
@@ -0,0 +1,302 @@
+"""TTL response cache for the HTTP transport.
+
+``CacheTransport`` keys responses by method, URL, query parameters and JSON
+body with API keys removed, so callers using different keys share entries.
+Responses live in an in-memory LRU tier and, optionally, an SQLite disk tier.
+"Tip" requests (the newest page of a history) get a short TTL. Cursor-based
+older pages and immutable RPC lookups get a long one. Concurrent identical
+requests are coalesced: one goes to the network, the rest wait for its reply.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+from paychain.core.ratelimit import KEY_PARAMS, throttle_pause
+from paychain.core.transport import Request, Response, Transport, WrappingTransport, host_of
+
+# Default TTLs in seconds.
+TIP_TTL = 5.0
+IMMUTABLE_TTL = 24 * 3600.0
+MEMORY_ENTRIES = 10_000
+
+# Query parameters that mark a cursor-based (older, immutable) page.
+IMMUTABLE_PARAMS = ("fingerprint", "before_lt", "endblock")
+# URL fragments of cursor-based paths.
+IMMUTABLE_PATHS = ("/txs/chain/",)
+# JSON-RPC methods whose result does not change.
+IMMUTABLE_RPC_METHODS = ("getTransaction", "getBlock", "eth_getBlockByNumber", "eth_getTransactionReceipt")
+# Block tags ("latest", "pending", ...) name the moving tip, not a block.
+BLOCK_TAGS = ("latest", "pending", "earliest", "safe", "finalized")
+
+
+def cache_key(req: Request) -> str:
+    """Stable key for ``req`` that excludes API keys."""
+    parts = urlsplit(req.url)
+    # Keys may also sit in the URL itself (e.g. ``?api-key=`` RPC endpoints).
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k.lower() not in KEY_PARAMS]
+    query += [(k, str(v)) for k, v in (req.params or {}).items() if k.lower() not in KEY_PARAMS]
+    url = urlunsplit(parts._replace(query=""))
+    raw = json.dumps([req.method.upper(), url, sorted(query), req.json], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _rpc_immutable(call) -> bool:
+    if not isinstance(call, dict):
+        return False
+    method = call.get("method")
+    params = call.get("params") or []
+    if method == "eth_getBlockByNumber":
+        return bool(params) and isinstance(params[0], (str, int)) and params[0] not in BLOCK_TAGS
+    if method in IMMUTABLE_RPC_METHODS:
+        return True
+    # getSignaturesForAddress below a ``before`` signature is history.
+    return (
+        method == "getSignaturesForAddress"
+        and len(params) > 1
+        and isinstance(params[1], dict)
+        and bool(params[1].get("before"))
+    )
+
+
+def is_immutable(req: Request) -> bool:
+    """True for requests whose answer is not expected to change."""
+    if any(k in (req.params or {}) for k in IMMUTABLE_PARAMS):
+        return True
+    if any(p in req.url for p in IMMUTABLE_PATHS):
+        return True
+    body = req.json
+    if isinstance(body, dict):
+        return _rpc_immutable(body)
+    if isinstance(body, list) and body:
+        return all(_rpc_immutable(c) for c in body)
+    return False
+
+
+def _rpc_found(resp: Response) -> bool:
+    """True unless a JSON-RPC reply holds an error or a null ``result``.
+
+    A null result is "not found (yet)": an unmined transaction or receipt,
+    a future block. It must not be kept as long as settled history.
+    """
+    try:
+        body = resp.json()
+    except ValueError:
+        return False
+    replies = body if isinstance(body, list) else [body]
+    return all(isinstance(r, dict) and r.get("error") is None and r.get("result") is not None for r in replies)
+
+
+class MemoryCache:
+    """Thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Response]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Response]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, resp = item
+            if expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return resp
+
+    def set(self, key: str, resp: Response, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, resp)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class DiskCache:
+    """SQLite tier surviving restarts; expired rows are purged lazily."""
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, expires REAL NOT NULL, status INTEGER NOT NULL, "
+                "headers TEXT NOT NULL, url TEXT NOT NULL, content BLOB NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[Response, float]]:
+        """Return the response and its remaining TTL."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires, status, headers, url, content FROM responses WHERE key=?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        expires, status, headers, url, content = row
+        ttl = expires - time.time()
+        if ttl <= 0:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM responses WHERE key=?", (key,))
+            return None
+        return Response(status, json.loads(headers), content, url), ttl
+
+    def set(self, key: str, resp: Response, ttl: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, time.time() + ttl, resp.status_code, json.dumps(resp.headers), resp.url, resp.content),
+            )
+
+    def purge(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CacheTransport(WrappingTransport):
+    """Serve repeated requests from cache and coalesce in-flight duplicates."""
+
+    def __init__(
+        self,
+        inner: Transport,
+        tip_ttl: float = TIP_TTL,
+        immutable_ttl: float = IMMUTABLE_TTL,
+        max_entries: int = MEMORY_ENTRIES,
+        disk_path: Optional[str] = None,
+    ):
+        super().__init__(inner)
+        self.tip_ttl = tip_ttl
+        self.immutable_ttl = immutable_ttl
+        self.memory = MemoryCache(max_entries)
+        self.disk = DiskCache(disk_path) if disk_path else None
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._ainflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _ttl(self, req: Request, resp: Optional[Response] = None) -> float:
+        if not is_immutable(req):
+            return self.tip_ttl
+        if resp is not None and req.json is not None and not _rpc_found(resp):
+            return self.tip_ttl
+        return self.immutable_ttl
+
+    def _lookup(self, key: str) -> Optional[Response]:
+        resp = self.memory.get(key)
+        if resp is None and self.disk is not None:
+            hit = self.disk.get(key)
+            if hit is not None:
+                resp, ttl = hit
+                self.memory.set(key, resp, ttl)
+        return resp
+
+    def _store(self, key: str, req: Request, resp: Response) -> None:
+        # Only clean successes; throttle replies sometimes come as HTTP 200.
+        if resp.status_code != 200 or throttle_pause(host_of(req.url), resp) is not None:
+            return
+        ttl = self._ttl(req, resp)
+        if ttl <= 0:
+            return
+        self.memory.set(key, resp, ttl)
+        # Tip pages expire too fast to be worth a disk write.
+        if self.disk is not None and ttl >= self.immutable_ttl:
+            self.disk.set(key, resp, ttl)
+
+    def send(self, req: Request) -> Response:
+        key = cache_key(req)
+        resp = self._lookup(key)
+        if resp is not None:
+            return resp
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+        if not owner:
+            try:
+                return fut.result()
+            except CancelledError:
+                # The owner was interrupted, not failed: fetch it ourselves.
+                return self.send(req)
+        try:
+            resp = self.inner.send(req)
+            self._store(key, req, resp)
+        except Exception as e:
+            self._release(key, fut)
+            fut.set_exception(e)
+            raise
+        except BaseException:
+            self._release(key, fut)
+            fut.cancel()
+            raise
+        self._release(key, fut)
+        fut.set_result(resp)
+        return resp
+
+    def _release(self, key: str, fut: Future) -> None:
+        with self._inflight_lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+    async def asend(self, req: Request) -> Response:
+        key = cache_key(req)
+        resp = self._lookup(key)
+        if resp is not None:
+            return resp
+        inflight = self._ainflight.setdefault(asyncio.get_running_loop(), {})
+        fut = inflight.get(key)
+        if fut is not None:
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    # This waiter itself was cancelled.
+                    raise
+                # The owner was cancelled: fetch it ourselves.
+                return await self.asend(req)
+        fut = inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            resp = await self.inner.asend(req)
+            self._store(key, req, resp)
+        except Exception as e:
+            inflight.pop(key, None)
+            fut.set_exception(e)
+            # Mark retrieved so an unawaited future does not warn.
+            fut.exception()
+            raise
+        except BaseException:
+            # Cancelled (or interrupted): waiters are not, and retry.
+            inflight.pop(key, None)
+            fut.cancel()
+            raise
+        inflight.pop(key, None)
+        fut.set_result(resp)
+        return resp
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+        super().close()
@@ -0,0 +1,219 @@
+"""Columnar container for large sets of transaction records.
+
+``TxBatch`` stores records column by column. ``ts``, ``block_height``,
+``amount_raw`` and ``amount_decimals`` live in ``array.array`` buffers.
+``chain``, ``asset`` and ``status`` are dictionary-encoded (a ``uint8`` code
+per row plus a small category list). Ids and addresses stay Python strings,
+deduplicated within the batch. A million records cost tens of megabytes
+instead of gigabytes of per-object overhead.
+
+Numeric columns are exported without copying through ``memoryview`` and,
+if installed, NumPy (:meth:`TxBatch.to_numpy`) or PyArrow
+(:meth:`TxBatch.to_arrow`).
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from paychain.core.types import CompactTxRecord, TxPage, TxRecord
+
+# Sentinel for missing ``ts``/``block_height`` values.
+NULL = -(2 ** 63)
+# Sentinel for a missing ``amount_decimals``.
+NULL_DECIMALS = -1
+# ``amount_raw`` sentinel for missing (``None``) amounts.
+NULL_AMOUNT = 2 ** 64 - 1
+# ``amount_raw`` sentinel for values that do not fit into uint64; the exact
+# value is kept in ``TxBatch.big_amounts``.
+BIG_AMOUNT = 2 ** 64 - 2
+
+NUMERIC_COLUMNS = ("ts", "block_height", "amount_raw", "amount_decimals")
+CATEGORY_COLUMNS = ("chain", "asset", "status")
+
+
+class _Categories:
+    """Dictionary encoding of a low-cardinality string column."""
+
+    __slots__ = ("codes", "values", "_index")
+
+    def __init__(self):
+        self.codes = array("B")
+        self.values: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def append(self, value: str) -> None:
+        code = self._index.get(value)
+        if code is None:
+            if len(self.values) >= 255:
+                raise ValueError("too many distinct categories for a uint8 column")
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, i: int) -> str:
+        return self.values[self.codes[i]]
+
+
+class TxBatch:
+    """Column-oriented, append-only list of transaction records."""
+
+    __slots__ = (
+        "ts", "block_height", "amount_raw", "amount_decimals",
+        "chain", "asset", "status", "tx_id", "from_addr", "to_addr",
+        "big_amounts", "meta", "next_cursor", "_strings",
+    )
+
+    def __init__(self, records: Iterable[TxRecord] = (), next_cursor: Optional[str] = None):
+        self.ts = array("q")
+        self.block_height = array("q")
+        self.amount_raw = array("Q")
+        self.amount_decimals = array("b")
+        self.chain = _Categories()
+        self.asset = _Categories()
+        self.status = _Categories()
+        self.tx_id: List[str] = []
+        self.from_addr: List[Optional[str]] = []
+        self.to_addr: List[Optional[str]] = []
+        # Row index -> exact amount for amounts >= BIG_AMOUNT.
+        self.big_amounts: Dict[int, int] = {}
+        # Row index -> meta dict (sparse).
+        self.meta: Dict[int, dict] = {}
+        self.next_cursor = next_cursor
+        self._strings: Dict[str, str] = {}
+        self.extend(records)
+
+    @classmethod
+    def from_page(cls, page: TxPage) -> "TxBatch":
+        return cls(page.items, next_cursor=page.next_cursor)
+
+    def _dedup(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def append(self, rec) -> None:
+        """Append a :class:`TxRecord` or :class:`CompactTxRecord`."""
+        row = len(self.tx_id)
+        self.ts.append(NULL if rec.ts is None else rec.ts)
+        self.block_height.append(NULL if rec.block_height is None else rec.block_height)
+        amount = rec.amount_raw
+        if amount is None:
+            self.amount_raw.append(NULL_AMOUNT)
+        elif 0 <= amount < BIG_AMOUNT:
+            self.amount_raw.append(amount)
+        else:
+            self.amount_raw.append(BIG_AMOUNT)
+            self.big_amounts[row] = amount
+        self.amount_decimals.append(NULL_DECIMALS if rec.amount_decimals is None else rec.amount_decimals)
+        self.chain.append(rec.chain)
+        self.asset.append(rec.asset)
+        self.status.append(rec.status)
+        self.tx_id.append(rec.tx_id)
+        self.from_addr.append(self._dedup(rec.from_addr))
+        self.to_addr.append(self._dedup(rec.to_addr))
+        if rec.meta:
+            self.meta[row] = rec.meta
+
+    def extend(self, records: Iterable[TxRecord]) -> None:
+        for rec in records:
+            self.append(rec)
+
+    def __len__(self) -> int:
+        return len(self.tx_id)
+
+    def __getitem__(self, i: int) -> CompactTxRecord:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        ts = self.ts[i]
+        height = self.block_height[i]
+        amount = self.amount_raw[i]
+        decimals = self.amount_decimals[i]
+        if amount == BIG_AMOUNT:
+            amount = self.big_amounts.get(i, amount)
+        return CompactTxRecord(
+            chain=self.chain[i],
+            tx_id=self.tx_id[i],
+            ts=None if ts == NULL else ts,
+            block_height=None if height == NULL else height,
+            from_addr=self.from_addr[i],
+            to_addr=self.to_addr[i],
+            amount_raw=None if amount == NULL_AMOUNT else amount,
+            amount_decimals=None if decimals == NULL_DECIMALS else decimals,
+            asset=self.asset[i],
+            status=self.status[i],
+            meta=self.meta.get(i),
+        )
+
+    def __iter__(self) -> Iterator[CompactTxRecord]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_records(self) -> List[TxRecord]:
+        return [rec.to_record() for rec in self]
+
+    def to_page(self) -> TxPage:
+        return TxPage(items=self.to_records(), next_cursor=self.next_cursor)
+
+    def buffers(self) -> Dict[str, memoryview]:
+        """Zero-copy views of the numeric columns and category codes."""
+        views = {name: memoryview(getattr(self, name)) for name in NUMERIC_COLUMNS}
+        for name in CATEGORY_COLUMNS:
+            views[name + "_codes"] = memoryview(getattr(self, name).codes)
+        return views
+
+    def categories(self, name: str) -> List[str]:
+        """Category values of ``chain``/``asset``/``status``, indexed by code."""
+        return list(getattr(self, name).values)
+
+    def to_numpy(self) -> Dict[str, "object"]:
+        """NumPy arrays sharing memory with the batch (requires numpy).
+
+        Missing values use the module sentinels (``NULL``, ``NULL_AMOUNT``,
+        ``NULL_DECIMALS``). The arrays alias the batch, so do not append
+        to it while they are in use.
+        """
+        import numpy as np
+
+        return {name: np.frombuffer(view, dtype=view.format) for name, view in self.buffers().items()}
+
+    def to_arrow(self):
+        """A ``pyarrow.Table`` whose numeric columns wrap the batch buffers.
+
+        Missing values become Arrow nulls. ``amount_raw`` is ``uint64``;
+        rows listed in ``big_amounts`` hold ``BIG_AMOUNT`` there.
+        """
+        import pyarrow as pa
+
+        n = len(self)
+        views = self.buffers()
+
+        def numeric(name: str, typ, sentinel: int):
+            column = getattr(self, name)
+            validity = None
+            if sentinel in column:
+                bits = bytearray((n + 7) // 8)
+                for i, v in enumerate(column):
+                    if v != sentinel:
+                        bits[i >> 3] |= 1 << (i & 7)
+                validity = pa.py_buffer(bits)
+            # The data buffer itself is shared, only the validity bitmap is built.
+            return pa.Array.from_buffers(typ, n, [validity, pa.py_buffer(views[name])])
+
+        def category(name: str):
+            cats = getattr(self, name)
+            indices = pa.Array.from_buffers(pa.uint8(), n, [None, pa.py_buffer(views[name + "_codes"])])
+            return pa.DictionaryArray.from_arrays(indices, pa.array(cats.values, type=pa.string()))
+
+        return pa.table({
+            "chain": category("chain"),
+            "tx_id": pa.array(self.tx_id, type=pa.string()),
+            "ts": numeric("ts", pa.int64(), NULL),
+            "block_height": numeric("block_height", pa.int64(), NULL),
+            "from_addr": pa.array(self.from_addr, type=pa.string()),
+            "to_addr": pa.array(self.to_addr, type=pa.string()),
+            "amount_raw": numeric("amount_raw", pa.uint64(), NULL_AMOUNT),
+            "amount_decimals": numeric("amount_decimals", pa.int8(), NULL_DECIMALS),
+            "asset": category("asset"),
+            "status": category("status"),
+        })
@@ -4,25 +4,38 @@ Description: Centralized storage and access to paychain global parameters.
 """
 
 import os
-from core.env_loader import load_env
+from .env_loader import load_env
+
+# Settings read from the environment on first access.
+_ENV_SETTINGS = ("mnemonic", "salt", "master_address_tron", "chainabuse_api_key", "enable_chainabuse")
 
-load_env()  # Load .env before accessing any environment variables
 
 class PaychainConfig:
     def __init__(self):
-        # Master seed for address generation
-        self.mnemonic = os.getenv("SEED_MNEMONIC", "").strip()
-        self.salt = os.getenv("TRON_SALT", "").strip()
-        self.master_address_tron = os.getenv("TRON_MASTER_ADDRESS", "").strip()
-
-        # Chainabuse
-        self.chainabuse_api_key = os.getenv("CHAINABUSE_API_KEY", "").strip()
-        self.enable_chainabuse = bool(self.chainabuse_api_key)
-
         # Local in-memory blocklists
         self._blocklist_addr = set()
         self._blocklist_uid = set()
 
+    def __getattr__(self, name):
+        # Load .env only when a setting is first needed, not at import time.
+        if name not in _ENV_SETTINGS:
+            raise AttributeError(name)
+        self._load()
+        return self.__dict__[name]
+
+    def _load(self):
+        load_env()
+        # Values set by callers before the first read win over the environment.
+        settings = self.__dict__
+        # Master seed for address generation
+        settings.setdefault("mnemonic", os.getenv("SEED_MNEMONIC", "").strip())
+        settings.setdefault("salt", os.getenv("TRON_SALT", "").strip())
+        settings.setdefault("master_address_tron", os.getenv("TRON_MASTER_ADDRESS", "").strip())
+
+        # Chainabuse
+        settings.setdefault("chainabuse_api_key", os.getenv("CHAINABUSE_API_KEY", "").strip())
+        settings.setdefault("enable_chainabuse", bool(self.chainabuse_api_key))
+
     # === Зерно ===
     def get_seed(self) -> str:
         return self.mnemonic
@@ -4,11 +4,19 @@ Description: Loads environment variables from .env file and OS environment.
 """
 
 import os
-from dotenv import load_dotenv
+
+_loaded = False
+
 
 def load_env():
     """
-    Load environment variables from .env file if present.
+    Load environment variables from .env file if present (once per process).
     """
+    global _loaded
+    if _loaded:
+        return
+    from dotenv import load_dotenv
+
     env_path = os.getenv("ENV_FILE", ".env")
-    load_dotenv(dotenv_path=env_path)
\ No newline at end of file
+    load_dotenv(dotenv_path=env_path)
+    _loaded = True
@@ -0,0 +1,303 @@
+"""Multi-endpoint failover, circuit breaking and hedged requests.
+
+``FailoverTransport`` knows groups of equivalent base URLs (for example two
+Solana RPC nodes or two Esplora instances). A request whose URL starts with
+any member of a group is sent to the healthiest member instead, falling back
+to the others on connection errors, 5xx and throttle replies:
+
+* every endpoint keeps an EWMA of its latency and error rate; once every
+  member has ``MIN_SAMPLES`` latency samples they are tried best score
+  first, before that in list order (so the first URL is the primary until
+  it misbehaves);
+* ``failure_threshold`` consecutive failures open the endpoint's circuit for
+  ``cooldown`` seconds; afterwards a single trial request is let through and
+  closes the circuit again on success;
+* with ``hedge=True`` a duplicate request goes to the next endpoint when the
+  first one has not answered within its observed p95 latency, and the first
+  valid response wins.
+
+Sit it above the rate limiter so every endpoint spends its own bucket; see
+``default_transport(endpoints=...)``.
+"""
+import asyncio
+import dataclasses
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+
+from paychain.core.ratelimit import throttle_pause
+from paychain.core.transport import Request, Response, Transport, WrappingTransport, host_of
+
+# Equivalent public endpoints per chain, primary first. MAY CHANGE.
+ENDPOINTS: Dict[str, List[str]] = {
+    "BTC": ["https://blockstream.info/api", "https://mempool.space/api"],
+    "SOL": ["https://api.mainnet-beta.solana.com", "https://solana-rpc.publicnode.com"],
+}
+FAILURE_THRESHOLD = 3
+COOLDOWN = 30.0
+# Hedge delay used until an endpoint has enough latency samples.
+HEDGE_DELAY = 1.0
+MIN_SAMPLES = 20
+SAMPLES = 200
+# Smoothing factor of the latency/error EWMAs.
+ALPHA = 0.2
+# How strongly the error rate inflates an endpoint's score.
+ERROR_WEIGHT = 10.0
+HEDGE_WORKERS = 16
+
+_Attempt = Tuple[Optional[Response], Optional[BaseException]]
+
+
+class Endpoint:
+    """Health statistics and circuit state of one base URL."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.samples: deque = deque(maxlen=SAMPLES)
+        self._lock = threading.Lock()
+
+    def score(self) -> float:
+        return (self.latency or 0.0) * (1.0 + ERROR_WEIGHT * self.error_rate)
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def record(self, ok: bool, seconds: float, threshold: int, cooldown: float) -> None:
+        with self._lock:
+            self.error_rate += ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+            if ok:
+                self.samples.append(seconds)
+                self.latency = seconds if self.latency is None else self.latency + ALPHA * (seconds - self.latency)
+                self.failures = 0
+                self.open_until = 0.0
+            else:
+                self.failures += 1
+                if self.failures >= threshold:
+                    self.open_until = time.monotonic() + cooldown
+
+    def claim(self, now: float, threshold: int, cooldown: float) -> bool:
+        """True if a request may go here; half-open circuits admit one trial."""
+        with self._lock:
+            if self.open_until > now:
+                return False
+            if self.failures >= threshold:
+                # Keep others out until the trial request reports back.
+                self.open_until = now + cooldown
+            return True
+
+    @property
+    def is_open(self) -> bool:
+        return self.open_until > time.monotonic()
+
+
+class FailoverTransport(WrappingTransport):
+    """Route requests among equivalent endpoints by health."""
+
+    def __init__(
+        self,
+        inner: Transport,
+        groups: Iterable[Sequence[str]],
+        hedge: bool = False,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        cooldown: float = COOLDOWN,
+        hedge_delay: float = HEDGE_DELAY,
+    ):
+        super().__init__(inner)
+        self.groups: List[List[Endpoint]] = [[Endpoint(u) for u in urls] for urls in groups if urls]
+        self.hedge = hedge
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_delay = hedge_delay
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _match(self, url: str) -> Optional[Tuple[int, List[Endpoint]]]:
+        best: Optional[Tuple[int, List[Endpoint]]] = None
+        for group in self.groups:
+            for ep in group:
+                if url.startswith(ep.url) and (best is None or len(ep.url) > best[0]):
+                    best = (len(ep.url), group)
+        return best
+
+    def _order(self, group: List[Endpoint]) -> deque:
+        now = time.monotonic()
+        # An unmeasured endpoint has no score to compare yet.
+        measured = all(len(ep.samples) >= MIN_SAMPLES for ep in group)
+        ranked = sorted(group, key=Endpoint.score) if measured else group
+        ready = [ep for ep in ranked if ep.open_until <= now]
+        if ready:
+            return deque(ready)
+        # Every circuit is open: try the one closest to recovery anyway.
+        return deque([None, min(group, key=lambda ep: ep.open_until)])
+
+    def _take(self, order: deque) -> Optional[Endpoint]:
+        """Pop the next endpoint that admits a request (``None`` marks a forced pick)."""
+        now = time.monotonic()
+        while order:
+            ep = order.popleft()
+            if ep is None:
+                return order.popleft()
+            if ep.claim(now, self.failure_threshold, self.cooldown):
+                return ep
+        return None
+
+    def _ok(self, resp: Optional[Response], exc: Optional[BaseException]) -> bool:
+        if exc is not None or resp is None:
+            return False
+        if resp.status_code >= 500 or resp.status_code == 429:
+            return False
+        return throttle_pause(host_of(resp.url), resp) is None
+
+    def _finish(self, ep: Endpoint, start: float, resp: Optional[Response], exc: Optional[BaseException]) -> _Attempt:
+        ep.record(self._ok(resp, exc), time.monotonic() - start, self.failure_threshold, self.cooldown)
+        return resp, exc
+
+    def _attempt(self, req: Request, ep: Endpoint, prefix: int) -> _Attempt:
+        start = time.monotonic()
+        try:
+            resp = self.inner.send(dataclasses.replace(req, url=ep.url + req.url[prefix:]))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            return self._finish(ep, start, None, e)
+        return self._finish(ep, start, resp, None)
+
+    async def _aattempt(self, req: Request, ep: Endpoint, prefix: int) -> _Attempt:
+        start = time.monotonic()
+        try:
+            resp = await self.inner.asend(dataclasses.replace(req, url=ep.url + req.url[prefix:]))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            return self._finish(ep, start, None, e)
+        return self._finish(ep, start, resp, None)
+
+    def _hedge_after(self, ep: Endpoint) -> float:
+        p95 = ep.p95()
+        return self.hedge_delay if p95 is None else p95
+
+    @staticmethod
+    def _give_up(last: _Attempt) -> Response:
+        resp, exc = last
+        if resp is not None:
+            return resp
+        if exc is None:
+            # Every endpoint was busy with a half-open trial.
+            raise requests.ConnectionError("No endpoint available: all circuits are open")
+        raise exc
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="paychain-hedge")
+            return self._pool
+
+    def send(self, req: Request) -> Response:
+        match = self._match(req.url)
+        if match is None:
+            return self.inner.send(req)
+        prefix, group = match
+        order = self._order(group)
+        if self.hedge and len(order) > 1:
+            return self._send_hedged(req, prefix, order)
+        last: _Attempt = (None, None)
+        ep = self._take(order)
+        while ep is not None:
+            last = self._attempt(req, ep, prefix)
+            if self._ok(*last):
+                return last[0]
+            ep = self._take(order)
+        return self._give_up(last)
+
+    def _send_hedged(self, req: Request, prefix: int, order: deque) -> Response:
+        pool = self._executor()
+        first = self._take(order)
+        if first is None:
+            return self._give_up((None, None))
+        delay = self._hedge_after(first)
+        pending = {pool.submit(self._attempt, req, first, prefix)}
+        hedged = False
+        last: _Attempt = (None, None)
+        while pending:
+            timeout = delay if order and not hedged else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slower than its p95: race a duplicate on the next endpoint.
+                hedged = True
+                ep = self._take(order)
+                if ep is not None:
+                    pending.add(pool.submit(self._attempt, req, ep, prefix))
+                continue
+            for fut in done:
+                last = fut.result()
+                if self._ok(*last):
+                    # Losers keep running in their threads; their outcome
+                    # still feeds the endpoint statistics.
+                    return last[0]
+            ep = self._take(order) if not pending else None
+            if ep is not None:
+                pending.add(pool.submit(self._attempt, req, ep, prefix))
+        return self._give_up(last)
+
+    async def asend(self, req: Request) -> Response:
+        match = self._match(req.url)
+        if match is None:
+            return await self.inner.asend(req)
+        prefix, group = match
+        order = self._order(group)
+        if self.hedge and len(order) > 1:
+            return await self._asend_hedged(req, prefix, order)
+        last: _Attempt = (None, None)
+        ep = self._take(order)
+        while ep is not None:
+            last = await self._aattempt(req, ep, prefix)
+            if self._ok(*last):
+                return last[0]
+            ep = self._take(order)
+        return self._give_up(last)
+
+    async def _asend_hedged(self, req: Request, prefix: int, order: deque) -> Response:
+        first = self._take(order)
+        if first is None:
+            return self._give_up((None, None))
+        delay = self._hedge_after(first)
+        pending = {asyncio.ensure_future(self._aattempt(req, first, prefix))}
+        hedged = False
+        last: _Attempt = (None, None)
+        try:
+            while pending:
+                timeout = delay if order and not hedged else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    ep = self._take(order)
+                    if ep is not None:
+                        pending.add(asyncio.ensure_future(self._aattempt(req, ep, prefix)))
+                    continue
+                for task in done:
+                    last = task.result()
+                    if self._ok(*last):
+                        # The slower duplicate is cancelled below.
+                        return last[0]
+                ep = self._take(order) if not pending else None
+                if ep is not None:
+                    pending.add(asyncio.ensure_future(self._aattempt(req, ep, prefix)))
+        finally:
+            for task in pending:
+                task.cancel()
+        return self._give_up(last)
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+        super().close()
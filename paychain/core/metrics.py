@@ -0,0 +1,296 @@
+"""Pluggable metrics hooks for the transport and the history dispatcher.
+
+Instrumented code calls the process-wide :class:`Metrics` returned by
+:func:`get_metrics`. The default is a no-op whose ``enabled`` flag is False,
+so hot paths skip even the clock reads. Install :class:`PrometheusMetrics`
+(or any subclass) with :func:`set_metrics` to collect:
+
+* HTTP requests, latency and response bytes per provider host and endpoint;
+* JSON decode time per provider;
+* errors (exceptions and HTTP >= 400) and throttle replies;
+* adapter call latency and records emitted per chain.
+
+``InstrumentedTransport`` sits directly above ``HttpTransport`` in the
+default stack, so retries and rate-limit re-sends are counted individually.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from paychain.core.ratelimit import throttle_pause
+from paychain.core.transport import Request, Response, Transport, WrappingTransport, host_of
+
+# Histogram bucket upper bounds in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DECODE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+BYTES_BUCKETS = (512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+# Path segments longer than this are ids/addresses and are collapsed.
+MAX_SEGMENT = 12
+
+
+def endpoint_of(req: Request) -> str:
+    """Low-cardinality endpoint label: path template, Etherscan action or RPC method."""
+    body = req.json
+    if isinstance(body, dict) and "method" in body:
+        return "rpc:" + str(body["method"])
+    if isinstance(body, list):
+        method = body[0].get("method") if body and isinstance(body[0], dict) else None
+        return f"rpc-batch:{method}"
+    path = req.url.split("://", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else "/"
+    path = path.split("?", 1)[0]
+    segments = ["{id}" if len(s) > MAX_SEGMENT else s for s in path.split("/")]
+    endpoint = "/".join(segments) or "/"
+    params = req.params or {}
+    if "module" in params and "action" in params:
+        endpoint += f":{params['module']}.{params['action']}"
+    return endpoint
+
+
+class Metrics:
+    """No-op hooks; subclass and override the methods you need."""
+
+    enabled = False
+
+    def observe_request(self, provider: str, endpoint: str, status: int, seconds: float, nbytes: int) -> None:
+        pass
+
+    def observe_error(self, provider: str, endpoint: str, kind: str) -> None:
+        pass
+
+    def observe_throttle(self, provider: str, endpoint: str) -> None:
+        pass
+
+    def observe_decode(self, provider: str, seconds: float) -> None:
+        pass
+
+    def observe_call(self, chain: str, op: str, seconds: float, records: int, error: Optional[str] = None) -> None:
+        pass
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+class PrometheusMetrics(Metrics):
+    """Thread-safe in-process registry rendered in Prometheus text format."""
+
+    enabled = True
+
+    # name -> (type, help, label names, histogram bounds)
+    SPECS = {
+        "paychain_http_requests_total": ("counter", "HTTP requests sent.", ("provider", "endpoint", "status"), None),
+        "paychain_http_request_seconds": ("histogram", "HTTP request latency.", ("provider", "endpoint"), LATENCY_BUCKETS),
+        "paychain_http_response_bytes": ("histogram", "HTTP response body size.", ("provider", "endpoint"), BYTES_BUCKETS),
+        "paychain_http_errors_total": ("counter", "Failed HTTP requests.", ("provider", "endpoint", "kind"), None),
+        "paychain_http_throttles_total": ("counter", "Provider throttle replies.", ("provider", "endpoint"), None),
+        "paychain_json_decode_seconds": ("histogram", "JSON decode time.", ("provider",), DECODE_BUCKETS),
+        "paychain_adapter_call_seconds": ("histogram", "Adapter call latency.", ("chain", "op"), LATENCY_BUCKETS),
+        "paychain_records_total": ("counter", "Transaction records emitted.", ("chain",), None),
+        "paychain_adapter_errors_total": ("counter", "Failed adapter calls.", ("chain", "op", "error"), None),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple[str, ...], float]] = {}
+        self._histograms: Dict[str, Dict[Tuple[str, ...], _Histogram]] = {}
+
+    def inc(self, name: str, labels: Tuple[str, ...], value: float = 1.0) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0.0) + value
+
+    def observe(self, name: str, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(labels)
+            if hist is None:
+                hist = series[labels] = _Histogram(self.SPECS[name][3])
+            hist.observe(value)
+
+    def value(self, name: str, *labels: str) -> float:
+        """Current counter value, or histogram observation count."""
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name].get(labels, 0.0)
+            hist = self._histograms.get(name, {}).get(labels)
+            return float(hist.count) if hist else 0.0
+
+    def observe_request(self, provider, endpoint, status, seconds, nbytes):
+        self.inc("paychain_http_requests_total", (provider, endpoint, str(status)))
+        self.observe("paychain_http_request_seconds", (provider, endpoint), seconds)
+        self.observe("paychain_http_response_bytes", (provider, endpoint), nbytes)
+
+    def observe_error(self, provider, endpoint, kind):
+        self.inc("paychain_http_errors_total", (provider, endpoint, kind))
+
+    def observe_throttle(self, provider, endpoint):
+        self.inc("paychain_http_throttles_total", (provider, endpoint))
+
+    def observe_decode(self, provider, seconds):
+        self.observe("paychain_json_decode_seconds", (provider,), seconds)
+
+    def observe_call(self, chain, op, seconds, records, error=None):
+        self.observe("paychain_adapter_call_seconds", (chain, op), seconds)
+        if records:
+            self.inc("paychain_records_total", (chain,), records)
+        if error:
+            self.inc("paychain_adapter_errors_total", (chain, op, error))
+
+    def render(self) -> str:
+        """Prometheus text exposition (format 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            for name, (typ, help_, names, _) in self.SPECS.items():
+                if typ == "counter":
+                    series = self._counters.get(name)
+                    if not series:
+                        continue
+                    lines += [f"# HELP {name} {help_}", f"# TYPE {name} counter"]
+                    for labels, value in sorted(series.items()):
+                        lines.append(f"{name}{_labels(names, labels)} {_fmt(value)}")
+                else:
+                    series = self._histograms.get(name)
+                    if not series:
+                        continue
+                    lines += [f"# HELP {name} {help_}", f"# TYPE {name} histogram"]
+                    for labels, hist in sorted(series.items()):
+                        cumulative = 0
+                        for bound, count in zip(hist.bounds + (float("inf"),), hist.counts):
+                            cumulative += count
+                            le = _labels(names, labels, f'le="{_fmt(bound)}"')
+                            lines.append(f"{name}_bucket{le} {cumulative}")
+                        lines.append(f"{name}_sum{_labels(names, labels)} {_fmt(hist.sum)}")
+                        lines.append(f"{name}_count{_labels(names, labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+_metrics: Metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def set_metrics(metrics: Metrics) -> Metrics:
+    """Install ``metrics`` process-wide and return the previous hooks."""
+    global _metrics
+    prev, _metrics = _metrics, metrics
+    return prev
+
+
+class _TimedResponse(Response):
+    """Response whose ``json()`` reports its decode time."""
+
+    __slots__ = ("provider",)
+
+    def json(self):
+        metrics = _metrics
+        if not metrics.enabled:
+            return super().json()
+        start = time.perf_counter()
+        data = super().json()
+        metrics.observe_decode(self.provider, time.perf_counter() - start)
+        return data
+
+
+def _timed(resp: Response, provider: str) -> Response:
+    timed = _TimedResponse.__new__(_TimedResponse)
+    timed.status_code = resp.status_code
+    timed.headers = resp.headers
+    timed.content = resp.content
+    timed.url = resp.url
+    timed.provider = provider
+    return timed
+
+
+class InstrumentedTransport(WrappingTransport):
+    """Report every request to the installed :class:`Metrics`."""
+
+    def _before(self, req: Request):
+        return host_of(req.url), endpoint_of(req), time.perf_counter()
+
+    def _after(self, metrics: Metrics, provider: str, endpoint: str, start: float, resp: Response) -> Response:
+        metrics.observe_request(provider, endpoint, resp.status_code, time.perf_counter() - start, len(resp.content))
+        if throttle_pause(provider, resp) is not None:
+            metrics.observe_throttle(provider, endpoint)
+        elif resp.status_code >= 400:
+            metrics.observe_error(provider, endpoint, f"http_{resp.status_code}")
+        return _timed(resp, provider)
+
+    def send(self, req: Request) -> Response:
+        metrics = _metrics
+        if not metrics.enabled:
+            return self.inner.send(req)
+        provider, endpoint, start = self._before(req)
+        try:
+            resp = self.inner.send(req)
+        except Exception as e:
+            metrics.observe_error(provider, endpoint, type(e).__name__)
+            raise
+        return self._after(metrics, provider, endpoint, start, resp)
+
+    async def asend(self, req: Request) -> Response:
+        metrics = _metrics
+        if not metrics.enabled:
+            return await self.inner.asend(req)
+        provider, endpoint, start = self._before(req)
+        try:
+            resp = await self.inner.asend(req)
+        except Exception as e:
+            metrics.observe_error(provider, endpoint, type(e).__name__)
+            raise
+        return self._after(metrics, provider, endpoint, start, resp)
+
+
+class ObservedCall:
+    """Context manager timing one adapter call; used by the dispatcher."""
+
+    __slots__ = ("metrics", "chain", "op", "start", "records")
+
+    def __init__(self, chain: str, op: str):
+        self.metrics = _metrics
+        self.chain = chain
+        self.op = op
+        self.records = 0
+
+    def __enter__(self) -> "ObservedCall":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        error = exc_type.__name__ if exc_type is not None else None
+        self.metrics.observe_call(self.chain, self.op, time.perf_counter() - self.start, self.records, error)
@@ -0,0 +1,219 @@
+"""Per-provider token-bucket rate limiting for the HTTP transport.
+
+Buckets are keyed by provider host and API key and are shared by every
+thread and asyncio task of the process: a reservation is taken under a
+lock and the caller then sleeps (``time.sleep`` or ``asyncio.sleep``) for
+the returned delay. ``429``/``Retry-After`` and provider-specific throttle
+replies pause the whole bucket, so all workers back off together.
+"""
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from paychain.core.transport import (
+    Request,
+    Response,
+    Transport,
+    WrappingTransport,
+    host_of,
+    retry_after,
+)
+
+# (requests per second, burst) with an API key. MAY CHANGE with your plan.
+PROVIDER_LIMITS: Dict[str, Tuple[float, float]] = {
+    "api.etherscan.io": (5.0, 5.0),
+    "api.trongrid.io": (15.0, 15.0),
+    "tonapi.io": (10.0, 10.0),
+    "blockstream.info": (10.0, 10.0),
+    "mempool.space": (10.0, 10.0),
+    "api.mainnet-beta.solana.com": (10.0, 10.0),
+}
+# Anonymous access is throttled much harder by some providers.
+KEYLESS_LIMITS: Dict[str, Tuple[float, float]] = {
+    "api.etherscan.io": (0.2, 1.0),
+    "api.trongrid.io": (3.0, 3.0),
+    "tonapi.io": (1.0, 1.0),
+}
+# Pause applied on a throttle reply without a usable Retry-After.
+DEFAULT_PAUSE = 1.0
+# Times a throttled request is re-sent through the bucket.
+THROTTLE_RETRIES = 5
+
+# Query parameters and headers carrying API keys.
+KEY_PARAMS = ("apikey", "api_key", "api-key")
+KEY_HEADERS = ("tron-pro-api-key", "authorization", "x-api-key")
+
+
+class TokenBucket:
+    """Thread-safe token bucket handing out reservations."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        # Time the token count refers to; lies in the future while paused.
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._stamp:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` and return how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            wait = self._stamp - now
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return max(0.0, wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds`` and restart from empty."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._stamp:
+                self._stamp = until
+                self._tokens = min(self._tokens, 0.0)
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: float = 1.0) -> None:
+        import asyncio
+
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def _etherscan_throttle(resp: Response) -> Optional[float]:
+    # Etherscan answers HTTP 200 with {"status": "0", "result": "Max rate limit reached"}.
+    if b"rate limit" not in resp.content:
+        return None
+    try:
+        data = resp.json()
+    except ValueError:
+        return None
+    if str(data.get("status")) == "0" and "rate limit" in str(data.get("result", "")).lower():
+        return DEFAULT_PAUSE
+    return None
+
+
+_SUSPENDED = re.compile(rb"suspended for (\d+)s")
+
+
+def _trongrid_throttle(resp: Response) -> Optional[float]:
+    # TronGrid: 403 "request rate exceeded ... the query server is suspended for Ns".
+    if b"rate exceeded" not in resp.content:
+        return None
+    match = _SUSPENDED.search(resp.content)
+    return float(match.group(1)) if match else DEFAULT_PAUSE
+
+
+# host -> callable returning a pause in seconds for a throttled reply.
+THROTTLE_DETECTORS: Dict[str, Callable[[Response], Optional[float]]] = {
+    "api.etherscan.io": _etherscan_throttle,
+    "api.trongrid.io": _trongrid_throttle,
+}
+
+
+def throttle_pause(host: str, resp: Response) -> Optional[float]:
+    """Seconds to pause if ``resp`` is a throttle reply, else None."""
+    if resp.status_code == 429:
+        hint = retry_after(resp)
+        return DEFAULT_PAUSE if hint is None else hint
+    detector = THROTTLE_DETECTORS.get(host)
+    return detector(resp) if detector else None
+
+
+def api_key_of(req: Request) -> Optional[str]:
+    for name in KEY_PARAMS:
+        if req.params and req.params.get(name):
+            return str(req.params[name])
+    if req.headers:
+        for name, value in req.headers.items():
+            if name.lower() in KEY_HEADERS:
+                return value
+    return None
+
+
+class RateLimiter:
+    """Registry of buckets keyed by ``(host, api_key)``."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        keyless_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        self.limits = dict(PROVIDER_LIMITS if limits is None else limits)
+        self.keyless_limits = dict(KEYLESS_LIMITS if keyless_limits is None else keyless_limits)
+        self._buckets: Dict[Tuple[str, Optional[str]], Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str, api_key: Optional[str] = None) -> Optional[TokenBucket]:
+        """Return the shared bucket, or None for unlimited hosts."""
+        key = (host, api_key)
+        try:
+            return self._buckets[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._buckets:
+                limit = None if api_key else self.keyless_limits.get(host)
+                limit = limit or self.limits.get(host)
+                self._buckets[key] = TokenBucket(*limit) if limit else None
+            return self._buckets[key]
+
+
+class RateLimitTransport(WrappingTransport):
+    """Wait for a token before each request and back off on throttling."""
+
+    def __init__(self, inner: Transport, limiter: Optional[RateLimiter] = None, retries: int = THROTTLE_RETRIES):
+        super().__init__(inner)
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+
+    def send(self, req: Request) -> Response:
+        host = host_of(req.url)
+        bucket = self.limiter.bucket(host, api_key_of(req))
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            resp = self.inner.send(req)
+            pause = throttle_pause(host, resp)
+            if pause is None or attempt >= self.retries:
+                return resp
+            if bucket is not None:
+                bucket.pause(pause)
+            else:
+                time.sleep(pause)
+            attempt += 1
+
+    async def asend(self, req: Request) -> Response:
+        import asyncio
+
+        host = host_of(req.url)
+        bucket = self.limiter.bucket(host, api_key_of(req))
+        attempt = 0
+        while True:
+            if bucket is not None:
+                await bucket.aacquire()
+            resp = await self.inner.asend(req)
+            pause = throttle_pause(host, resp)
+            if pause is None or attempt >= self.retries:
+                return resp
+            if bucket is not None:
+                bucket.pause(pause)
+            else:
+                await asyncio.sleep(pause)
+            attempt += 1
@@ -0,0 +1,124 @@
+"""Time-range planning shared by the adapters.
+
+Histories arrive newest first, so a ``since_ts``/``until_ts`` window is
+handled in three steps:
+
+* bounds the provider understands are pushed down (Etherscan block numbers,
+  TronGrid and TonAPI timestamps);
+* records :func:`newer` than the window are skipped and paging stops at the
+  first record :func:`older` than it;
+* chains addressed by height translate timestamps into heights with a
+  :class:`BlockIndex`, an interpolation search over block timestamps whose
+  samples are kept per endpoint, so later lookups need few or no probes.
+
+``BlockIndex.first_at`` is a generator yielding heights to probe and
+receiving their timestamps, so sync and async adapters share it.
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, Generator, List, Optional, Tuple
+
+from paychain.core.types import TxQuery
+
+# Samples kept per index; the oldest half is thinned out beyond this.
+MAX_SAMPLES = 4096
+
+_Search = Generator[int, Optional[int], int]
+
+
+def newer(q: TxQuery, ts: Optional[int]) -> bool:
+    """True if ``ts`` is after the query window."""
+    return bool(q.until_ts and ts and ts > q.until_ts)
+
+
+def older(q: TxQuery, ts: Optional[int]) -> bool:
+    """True if ``ts`` is before the query window; nothing further back matches."""
+    return bool(q.since_ts and ts and ts < q.since_ts)
+
+
+class BlockIndex:
+    """Known ``(height, timestamp)`` samples of one chain endpoint."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._heights: List[int] = []
+        self._times: List[int] = []
+        self._lock = threading.Lock()
+
+    def add(self, height: int, ts: int) -> None:
+        with self._lock:
+            i = bisect_left(self._heights, height)
+            if i < len(self._heights) and self._heights[i] == height:
+                return
+            self._heights.insert(i, height)
+            self._times.insert(i, ts)
+            if len(self._heights) > self.max_samples:
+                # Keep every other sample: the index stays evenly spread.
+                self._heights = self._heights[::2]
+                self._times = self._times[::2]
+
+    def __len__(self) -> int:
+        return len(self._heights)
+
+    def _bracket(self, ts: int, lo: int, hi: int) -> Tuple[int, Optional[int], int, Optional[int]]:
+        """Tightest known ``(a, ts_a, b, ts_b)`` with ``ts_a < ts <= ts_b`` in ``[lo-1, hi+1]``."""
+        a, ta, b, tb = lo - 1, None, hi + 1, None
+        with self._lock:
+            start = bisect_left(self._heights, lo)
+            for i in range(start, len(self._heights)):
+                h, t = self._heights[i], self._times[i]
+                if h > hi:
+                    break
+                if t < ts:
+                    a, ta = h, t
+                elif b > hi:
+                    b, tb = h, t
+        return a, ta, b, tb
+
+    def first_at(self, ts: int, lo: int, hi: int) -> _Search:
+        """First height in ``[lo, hi]`` with a timestamp ``>= ts`` (``hi + 1`` if none).
+
+        Yields heights to probe; send back their timestamps.
+        """
+        a, ta, b, tb = self._bracket(ts, lo, hi)
+        step = 0
+        while b - a > 1:
+            if ta is None and a + 1 < b:
+                guess = a + 1
+            elif tb is None and b - 1 > a:
+                guess = b - 1
+            elif step % 2 == 0 and tb > ta:
+                # Block times are near constant: interpolate, but alternate
+                # with bisection so bursts of empty slots cannot stall it.
+                guess = a + (ts - ta) * (b - a) // (tb - ta)
+                guess = min(max(guess, a + 1), b - 1)
+            else:
+                guess = (a + b) // 2
+            step += 1
+            t = yield guess
+            if t is None:
+                raise ValueError(f"No timestamp for block {guess}")
+            self.add(guess, t)
+            if t < ts:
+                a, ta = guess, t
+            else:
+                b, tb = guess, t
+        return b
+
+
+_indexes: Dict[str, BlockIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def block_index(key: str) -> BlockIndex:
+    """Process-wide index for ``key`` (usually the RPC URL)."""
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = BlockIndex()
+        return index
+
+
+def clear_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,381 @@
+"""Pluggable HTTP transport shared by all adapters.
+
+Adapters never call ``requests``/``httpx`` directly; they go through
+:func:`get_json`/:func:`post_json` (or the ``a``-prefixed coroutines), which
+send a :class:`Request` through the process-wide :class:`Transport`. The
+default stack is ``RetryTransport(RateLimitTransport(HttpTransport()))``:
+
+* ``HttpTransport`` keeps one keep-alive ``requests.Session`` per host (sync)
+  and delegates async calls to the pooled clients of :mod:`paychain.core.aio`;
+* ``RateLimitTransport`` (:mod:`paychain.core.ratelimit`) spends per-provider
+  token buckets and backs off on 429 and provider throttle replies;
+* ``RetryTransport`` retries connection errors and 5xx (plus 429 when used
+  without the rate limiter) with jittered exponential backoff, honouring
+  ``Retry-After``.
+
+``InstrumentedTransport`` (:mod:`paychain.core.metrics`) wraps the HTTP layer
+and reports to the installed metrics hooks; it is a pass-through by default.
+
+Custom transports (recording, caching, ...) subclass
+:class:`Transport` and are installed with :func:`set_transport`.
+"""
+import json as _json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from paychain.core import aio
+
+DEFAULT_TIMEOUT = 30.0
+# Connection pool sizing per host.
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+# Retry policy.
+RETRIES = 3
+BACKOFF = 0.5
+MAX_BACKOFF = 10.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    params: Optional[Dict[str, Any]] = None
+    headers: Optional[Dict[str, str]] = None
+    json: Any = None
+    timeout: float = DEFAULT_TIMEOUT
+
+
+class Response:
+    """Minimal transport-independent HTTP response."""
+
+    __slots__ = ("status_code", "headers", "content", "url")
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes, url: str):
+        self.status_code = status_code
+        # Lower-cased header names.
+        self.headers = {k.lower(): v for k, v in headers.items()}
+        self.content = content
+        self.url = url
+
+    def json(self) -> Any:
+        return _json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def retry_after(resp: Response) -> Optional[float]:
+    """Seconds requested by a ``Retry-After`` header, if any."""
+    value = resp.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Transport:
+    """Base transport. ``asend`` defaults to running ``send`` in a thread."""
+
+    def send(self, req: Request) -> Response:
+        raise NotImplementedError
+
+    async def asend(self, req: Request) -> Response:
+        import asyncio
+
+        return await asyncio.to_thread(self.send, req)
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+class WrappingTransport(Transport):
+    """Base class for middleware that delegates to an inner transport."""
+
+    def __init__(self, inner: Transport):
+        self.inner = inner
+
+    def send(self, req: Request) -> Response:
+        return self.inner.send(req)
+
+    async def asend(self, req: Request) -> Response:
+        return await self.inner.asend(req)
+
+    def close(self) -> None:
+        self.inner.close()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class HttpTransport(Transport):
+    """Real network transport with per-host connection pools."""
+
+    def __init__(
+        self,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        gzip: bool = True,
+        async_pool: Optional[aio.AsyncClientPool] = None,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.gzip = gzip
+        self.async_pool = async_pool
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url: str) -> requests.Session:
+        """Return the keep-alive session for the host of ``url``."""
+        host = host_of(url)
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers["Accept-Encoding"] = "gzip, deflate" if self.gzip else "identity"
+                    self._sessions[host] = session
+        return session
+
+    def send(self, req: Request) -> Response:
+        resp = self.session_for(req.url).request(
+            req.method,
+            req.url,
+            params=req.params,
+            headers=req.headers,
+            json=req.json,
+            timeout=req.timeout,
+        )
+        return Response(resp.status_code, dict(resp.headers), resp.content, resp.url)
+
+    async def asend(self, req: Request) -> Response:
+        import httpx
+
+        pool = self.async_pool or aio.get_pool()
+        headers = dict(req.headers or {})
+        if not self.gzip:
+            headers.setdefault("Accept-Encoding", "identity")
+        try:
+            resp = await pool.client_for(req.url).request(
+                req.method,
+                req.url,
+                params=req.params,
+                headers=headers,
+                json=req.json,
+                timeout=req.timeout,
+            )
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            # Surface the same exception family as the sync path.
+            raise requests.ConnectionError(str(e)) from e
+        return Response(resp.status_code, dict(resp.headers), resp.content, str(resp.url))
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    async def aclose(self) -> None:
+        await (self.async_pool or aio.get_pool()).aclose()
+
+
+class RetryTransport(WrappingTransport):
+    """Retry connection errors and retryable statuses with jittered backoff."""
+
+    def __init__(
+        self,
+        inner: Transport,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+        retry_statuses: Tuple[int, ...] = RETRY_STATUSES,
+    ):
+        super().__init__(inner)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+
+    def _delay(self, attempt: int, resp: Optional[Response] = None) -> float:
+        # Full jitter: uniform in [0, backoff * 2^attempt], capped.
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        hint = retry_after(resp) if resp is not None else None
+        if hint is not None:
+            delay = max(delay, min(hint, self.max_backoff))
+        return delay
+
+    def send(self, req: Request) -> Response:
+        attempt = 0
+        while True:
+            try:
+                resp = self.inner.send(req)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                time.sleep(self._delay(attempt))
+            else:
+                if resp.status_code not in self.retry_statuses or attempt >= self.retries:
+                    return resp
+                time.sleep(self._delay(attempt, resp))
+            attempt += 1
+
+    async def asend(self, req: Request) -> Response:
+        import asyncio
+
+        attempt = 0
+        while True:
+            try:
+                resp = await self.inner.asend(req)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+            else:
+                if resp.status_code not in self.retry_statuses or attempt >= self.retries:
+                    return resp
+                await asyncio.sleep(self._delay(attempt, resp))
+            attempt += 1
+
+
+def default_transport(
+    pool_connections: int = POOL_CONNECTIONS,
+    pool_maxsize: int = POOL_MAXSIZE,
+    retries: int = RETRIES,
+    backoff: float = BACKOFF,
+    gzip: bool = True,
+    rate_limit: bool = True,
+    cache: bool = False,
+    endpoints: Optional[Dict[str, List[str]]] = None,
+    hedge: bool = False,
+) -> Transport:
+    """Build the default pooled, rate-limited and retrying transport stack.
+
+    With ``cache`` the stack is wrapped in a ``CacheTransport`` using its
+    default TTLs; build one directly for custom TTLs or a disk tier.
+    ``endpoints`` (chain -> equivalent base URLs, primary first, e.g.
+    ``paychain.core.failover.ENDPOINTS``) adds a ``FailoverTransport``
+    between the retry and rate-limit layers; ``hedge`` enables hedging.
+    """
+    from paychain.core.metrics import InstrumentedTransport
+
+    t: Transport = HttpTransport(pool_connections=pool_connections, pool_maxsize=pool_maxsize, gzip=gzip)
+    # Pass-through unless metrics are installed (paychain.core.metrics).
+    t = InstrumentedTransport(t)
+    statuses = RETRY_STATUSES
+    if rate_limit:
+        from paychain.core.ratelimit import RateLimitTransport
+
+        t = RateLimitTransport(t)
+        # Throttle replies (429) are handled by the rate limiter.
+        statuses = tuple(s for s in statuses if s != 429)
+    if endpoints:
+        from paychain.core.failover import FailoverTransport
+
+        t = FailoverTransport(t, endpoints.values(), hedge=hedge)
+    if retries > 0:
+        t = RetryTransport(t, retries=retries, backoff=backoff, retry_statuses=statuses)
+    if cache:
+        from paychain.core.cache import CacheTransport
+
+        t = CacheTransport(t)
+    return t
+
+
+# Built on first use so importing this module stays cheap.
+_transport: Optional[Transport] = None
+
+
+def get_transport() -> Transport:
+    global _transport
+    if _transport is None:
+        _transport = default_transport()
+    return _transport
+
+
+def set_transport(transport: Transport) -> Transport:
+    """Install ``transport`` process-wide and return the previous one."""
+    global _transport
+    prev, _transport = get_transport(), transport
+    return prev
+
+
+def get_json(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Any:
+    resp = get_transport().send(Request("GET", url, params=params, headers=headers, timeout=timeout))
+    resp.raise_for_status()
+    return resp.json()
+
+
+def post_json(
+    url: str,
+    payload: Any,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Any:
+    resp = get_transport().send(Request("POST", url, headers=headers, json=payload, timeout=timeout))
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def aget_json(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Any:
+    resp = await get_transport().asend(Request("GET", url, params=params, headers=headers, timeout=timeout))
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def apost_json(
+    url: str,
+    payload: Any,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Any:
+    resp = await get_transport().asend(Request("POST", url, headers=headers, json=payload, timeout=timeout))
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def aclose() -> None:
+    """Close pooled async clients of the running loop (call on shutdown)."""
+    await get_transport().aclose()
@@ -1,4 +1,5 @@
 # Comments in English.
+import sys
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 
@@ -35,3 +36,34 @@ class TxRecord:
 class TxPage:
     items: List[TxRecord]
     next_cursor: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class CompactTxRecord:
+    """Immutable, ``__dict__``-free variant of :class:`TxRecord`."""
+    chain: str
+    tx_id: str
+    ts: Optional[int]
+    block_height: Optional[int]
+    from_addr: Optional[str]
+    to_addr: Optional[str]
+    amount_raw: Optional[int]
+    amount_decimals: Optional[int]
+    asset: str
+    status: str
+    meta: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_record(cls, rec: TxRecord) -> "CompactTxRecord":
+        return cls(
+            sys.intern(rec.chain), rec.tx_id, rec.ts, rec.block_height, rec.from_addr,
+            rec.to_addr, rec.amount_raw, rec.amount_decimals, sys.intern(rec.asset),
+            sys.intern(rec.status), rec.meta,
+        )
+
+    def to_record(self) -> TxRecord:
+        return TxRecord(
+            self.chain, self.tx_id, self.ts, self.block_height, self.from_addr,
+            self.to_addr, self.amount_raw, self.amount_decimals, self.asset,
+            self.status, self.meta,
+        )
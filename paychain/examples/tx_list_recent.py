@@ -1,8 +1,6 @@
 """CLI example to print recent transactions for any supported chain."""
 import argparse
 import json
-from paychain.core.types import TxQuery
-from paychain.features.tx_history.api import list_transactions
 
 
 def main() -> None:
@@ -18,6 +16,11 @@ def main() -> None:
     parser.add_argument("--json", action="store_true")
     args = parser.parse_args()
 
+    # Imported after argument parsing so ``--help`` and usage errors return
+    # without loading the HTTP stack.
+    from paychain.core.types import TxQuery
+    from paychain.features.tx_history.api import list_transactions
+
     q = TxQuery(
         address=args.address,
         since_ts=args.since,
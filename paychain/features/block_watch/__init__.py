@@ -0,0 +1 @@
+"""Block-scanning watcher for large deposit address sets."""
@@ -1,19 +1,231 @@
 """Unified transaction history API."""
-from paychain.core.types import TxQuery, TxPage
-from paychain.adapters import btc, eth, sol, ton, tron
+import dataclasses
+import threading
+import weakref
+from collections import deque
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional
+
+from paychain.core.types import TxQuery, TxRecord, TxPage
+from paychain.adapters.registry import canonical, get_adapter
+from .types import TxResult
+
+# Max in-flight requests per provider host, shared by all fan-out calls in
+# the process. Edit before first use to match your API plan.
+PROVIDER_CONCURRENCY: Dict[str, int] = {
+    "blockstream.info": 8,
+    "api.etherscan.io": 5,
+    "api.mainnet-beta.solana.com": 4,
+    "tonapi.io": 4,
+    "api.trongrid.io": 10,
+}
+DEFAULT_CONCURRENCY = 8
+
+_sync_limits: Dict[str, threading.BoundedSemaphore] = {}
+_sync_limits_lock = threading.Lock()
+# asyncio is imported on first async use to keep sync startup fast.
+_async_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _adapter(chain: str):
+    return get_adapter(chain)
+
+
+def _call(chain: str, adapter, q: TxQuery) -> TxPage:
+    # Imported here: metrics pulls in the HTTP transport and ``requests``.
+    from paychain.core.metrics import ObservedCall, get_metrics
+
+    if not get_metrics().enabled:
+        return adapter.list_transactions(q)
+    with ObservedCall(canonical(chain), "list") as call:
+        page = adapter.list_transactions(q)
+        call.records = len(page.items)
+    return page
+
+
+async def _acall(chain: str, adapter, q: TxQuery) -> TxPage:
+    from paychain.core.metrics import ObservedCall, get_metrics
+
+    if not get_metrics().enabled:
+        return await adapter.alist_transactions(q)
+    with ObservedCall(canonical(chain), "alist") as call:
+        page = await adapter.alist_transactions(q)
+        call.records = len(page.items)
+    return page
+
+
+def _with_cursor(q: TxQuery, cursor: str) -> TxQuery:
+    return dataclasses.replace(q, extra={**(q.extra or {}), "cursor": cursor})
 
 
 def list_transactions(chain: str, q: TxQuery) -> TxPage:
     """Dispatch to an adapter based on chain string."""
-    chain = chain.upper()
-    if chain == "BTC":
-        return btc.list_transactions(q)
-    if chain == "ETH":
-        return eth.list_transactions(q)
-    if chain == "SOL":
-        return sol.list_transactions(q)
-    if chain == "TON":
-        return ton.list_transactions(q)
-    if chain in ("TRON", "TRX"):
-        return tron.list_transactions(q)
-    raise ValueError(f"Unsupported chain: {chain}")
+    return _call(chain, _adapter(chain), q)
+
+
+async def alist_transactions(chain: str, q: TxQuery) -> TxPage:
+    """Async dispatch; adapters share one pooled HTTP client per host."""
+    return await _acall(chain, _adapter(chain), q)
+
+
+def iter_pages(chain: str, q: TxQuery) -> Iterator[TxPage]:
+    """Lazily yield pages of up to ``q.limit`` records, newest first.
+
+    The next provider page is requested only when the consumer asks for it.
+    Every page carries ``next_cursor``; pass it back as
+    ``q.extra["cursor"]`` to resume from that point later.
+    """
+    adapter = _adapter(chain)
+    while True:
+        page = _call(chain, adapter, q)
+        yield page
+        if not page.next_cursor:
+            return
+        q = _with_cursor(q, page.next_cursor)
+
+
+async def aiter_pages(chain: str, q: TxQuery) -> AsyncIterator[TxPage]:
+    """Async variant of :func:`iter_pages`."""
+    adapter = _adapter(chain)
+    while True:
+        page = await _acall(chain, adapter, q)
+        yield page
+        if not page.next_cursor:
+            return
+        q = _with_cursor(q, page.next_cursor)
+
+
+def iter_transactions(chain: str, q: TxQuery) -> Iterator[TxRecord]:
+    """Stream the full history record by record in constant memory."""
+    for page in iter_pages(chain, q):
+        yield from page.items
+
+
+async def aiter_transactions(chain: str, q: TxQuery) -> AsyncIterator[TxRecord]:
+    """Async variant of :func:`iter_transactions`."""
+    async for page in aiter_pages(chain, q):
+        for tx in page.items:
+            yield tx
+
+
+def _provider(adapter, q: TxQuery) -> str:
+    from paychain.core.transport import host_of
+
+    base = q.rpc_url or getattr(adapter, "API_URL", None) or getattr(adapter, "RPC_URL", "")
+    return host_of(base)
+
+
+def _sync_limit(host: str) -> threading.BoundedSemaphore:
+    with _sync_limits_lock:
+        sem = _sync_limits.get(host)
+        if sem is None:
+            sem = _sync_limits[host] = threading.BoundedSemaphore(
+                PROVIDER_CONCURRENCY.get(host, DEFAULT_CONCURRENCY)
+            )
+        return sem
+
+
+def _async_limit(host: str) -> "asyncio.Semaphore":
+    import asyncio
+
+    limits = _async_limits.setdefault(asyncio.get_running_loop(), {})
+    sem = limits.get(host)
+    if sem is None:
+        sem = limits[host] = asyncio.Semaphore(PROVIDER_CONCURRENCY.get(host, DEFAULT_CONCURRENCY))
+    return sem
+
+
+def _fetch_one(chain: str, adapter, q: TxQuery) -> TxResult:
+    try:
+        with _sync_limit(_provider(adapter, q)):
+            return TxResult(q, page=_call(chain, adapter, q))
+    except Exception as e:
+        return TxResult(q, error=e)
+
+
+async def _afetch_one(chain: str, adapter, q: TxQuery) -> TxResult:
+    try:
+        async with _async_limit(_provider(adapter, q)):
+            return TxResult(q, page=await _acall(chain, adapter, q))
+    except Exception as e:
+        return TxResult(q, error=e)
+
+
+def list_transactions_many(
+    chain: str,
+    queries: Iterable[TxQuery],
+    concurrency: Optional[int] = None,
+    ordered: bool = True,
+) -> Iterator[TxResult]:
+    """Run many queries concurrently and yield one :class:`TxResult` each.
+
+    Failures are reported per query instead of aborting the batch. Results
+    are yielded in input order, or as completed if ``ordered`` is False.
+    ``concurrency`` bounds the worker threads of this call; the per-host
+    limits in ``PROVIDER_CONCURRENCY`` apply across all calls. ``queries``
+    is consumed lazily, so very large address lists stay cheap.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    adapter = _adapter(chain)
+    workers = concurrency or DEFAULT_CONCURRENCY
+    queries = iter(queries)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending: deque = deque()
+    try:
+        while True:
+            while len(pending) < workers * 2:
+                q = next(queries, None)
+                if q is None:
+                    break
+                pending.append(pool.submit(_fetch_one, chain, adapter, q))
+            if not pending:
+                return
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    pending.remove(fut)
+                    yield fut.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def alist_transactions_many(
+    chain: str,
+    queries: Iterable[TxQuery],
+    concurrency: Optional[int] = None,
+    ordered: bool = True,
+) -> AsyncIterator[TxResult]:
+    """Async variant of :func:`list_transactions_many`.
+
+    ``concurrency`` bounds the tasks scheduled by this call (default: a
+    window of 1000); provider limits are shared by all tasks of the loop.
+    """
+    import asyncio
+
+    adapter = _adapter(chain)
+    window = concurrency or 1000
+    queries = iter(queries)
+    pending: deque = deque()
+    try:
+        while True:
+            while len(pending) < window:
+                q = next(queries, None)
+                if q is None:
+                    break
+                pending.append(asyncio.ensure_future(_afetch_one(chain, adapter, q)))
+            if not pending:
+                return
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.remove(task)
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,3 +1,17 @@
-"""Types for tx_history feature (currently re-exporting core types)."""
+"""Types for tx_history feature."""
+from dataclasses import dataclass
+from typing import Optional
 
 from paychain.core.types import TxQuery, TxRecord, TxPage  # noqa: F401
+
+
+@dataclass
+class TxResult:
+    """Outcome of one query in a fan-out call: a page or the error raised."""
+    query: TxQuery
+    page: Optional[TxPage] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
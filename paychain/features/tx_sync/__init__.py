@@ -0,0 +1 @@
+"""Incremental transaction sync feature."""
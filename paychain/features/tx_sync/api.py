@@ -0,0 +1,75 @@
+"""Incremental sync: fetch only records newer than the stored high-water mark."""
+from typing import List, Optional
+
+from paychain.core.types import TxQuery, TxRecord
+from paychain.features.tx_history.api import aiter_transactions, iter_transactions
+from .store import TxStore, get_store
+
+
+def _chain_key(chain: str) -> str:
+    chain = chain.upper()
+    return "TRON" if chain == "TRX" else chain
+
+
+# ``TxQuery.extra`` options that select a different history of the address.
+STREAM_OPTIONS = ("mode", "backend", "timeline")
+
+
+def _stream(q: TxQuery) -> str:
+    """Mark key: token, direction filter and the options selecting the history."""
+    extra = q.extra or {}
+    parts = [q.token or ""]
+    if q.direction != "all":
+        # A filtered sync must not advance the mark of the full history.
+        parts.append(f"direction={q.direction}")
+    for option in STREAM_OPTIONS:
+        value = extra.get(option)
+        if value in (None, False):
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = ",".join(sorted(map(str, value)))
+        parts.append(f"{option}={value}")
+    return "|".join(parts)
+
+
+def _is_older(tx: TxRecord, mark: Optional[int], mark_ts: Optional[int]) -> bool:
+    # Histories are newest first; records at the mark itself are re-read
+    # and deduplicated by the store, so same-block arrivals are not lost.
+    if tx.block_height is not None:
+        return mark is not None and tx.block_height < mark
+    # Records without a height (TRON TRC-20) fall back to their timestamp.
+    return mark_ts is not None and tx.ts is not None and tx.ts < mark_ts
+
+
+def sync(chain: str, address: str, store: Optional[TxStore] = None, **query) -> List[TxRecord]:
+    """Fetch new history of ``address`` and return the delta.
+
+    Extra keyword arguments (``api_key``, ``token``, ``rpc_url``, ``limit``
+    as page size, ...) are passed to :class:`TxQuery`. Paging stops at the
+    first record below the address' high-water mark. Pending records and
+    records whose status changed since the last sync are part of the delta.
+    """
+    store = store or get_store()
+    q = TxQuery(address=address, **query)
+    chain, stream = _chain_key(chain), _stream(q)
+    mark, mark_ts = store.get_marks(chain, address, stream)
+    fresh = []
+    for tx in iter_transactions(chain, q):
+        if _is_older(tx, mark, mark_ts):
+            break
+        fresh.append(tx)
+    return store.put(chain, address, stream, fresh)
+
+
+async def async_sync(chain: str, address: str, store: Optional[TxStore] = None, **query) -> List[TxRecord]:
+    """Async variant of :func:`sync`."""
+    store = store or get_store()
+    q = TxQuery(address=address, **query)
+    chain, stream = _chain_key(chain), _stream(q)
+    mark, mark_ts = store.get_marks(chain, address, stream)
+    fresh = []
+    async for tx in aiter_transactions(chain, q):
+        if _is_older(tx, mark, mark_ts):
+            break
+        fresh.append(tx)
+    return store.put(chain, address, stream, fresh)
@@ -0,0 +1,214 @@
+"""SQLite-backed local transaction store with per-address high-water marks."""
+import dataclasses
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from paychain.core.types import TxRecord
+
+# Default database location. Override with PAYCHAIN_TX_STORE.
+DEFAULT_PATH = "data/tx_store.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS txs (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    tx_id TEXT NOT NULL,
+    ts INTEGER,
+    block_height INTEGER,
+    status TEXT NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (chain, address, record_key)
+);
+CREATE TABLE IF NOT EXISTS marks (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    stream TEXT NOT NULL,
+    height INTEGER,
+    ts INTEGER,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (chain, address, stream)
+);
+"""
+
+# Stores created before marks kept a timestamp: height was NOT NULL.
+_MIGRATE_MARKS = """
+CREATE TABLE marks_v2 (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    stream TEXT NOT NULL,
+    height INTEGER,
+    ts INTEGER,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (chain, address, stream)
+);
+INSERT INTO marks_v2 (chain, address, stream, height, updated_at)
+    SELECT chain, address, stream, height, updated_at FROM marks;
+DROP TABLE marks;
+ALTER TABLE marks_v2 RENAME TO marks;
+"""
+
+# Stores created before records had their own key: one row per tx_id.
+# Rows are re-keyed from their stored record in TxStore._migrate_txs.
+_MIGRATE_TXS = """
+ALTER TABLE txs RENAME TO txs_v1;
+CREATE TABLE txs (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    tx_id TEXT NOT NULL,
+    ts INTEGER,
+    block_height INTEGER,
+    status TEXT NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (chain, address, record_key)
+);
+"""
+
+# ``TxRecord.meta`` fields locating a record inside its transaction.
+_POSITION_FIELDS = ("log_index", "trace_id", "action")
+# ``TxRecord.meta`` fields naming the kind of transfer.
+_LEG_FIELDS = ("kind", "contract", "jetton", "token_id")
+
+
+def record_key(r: TxRecord) -> str:
+    """Identity of a record: ``tx_id`` plus the leg of the transaction it is.
+
+    One transaction yields several records (native and token legs, several
+    Transfer logs, TON actions). Records that carry their position inside
+    the transaction are keyed by it; others by asset, parties and amount.
+    """
+    meta = r.meta or {}
+    parts = [r.tx_id]
+    parts += [f"{f}={meta[f]}" for f in _LEG_FIELDS + _POSITION_FIELDS if meta.get(f) not in (None, "")]
+    if not any(meta.get(f) not in (None, "") for f in _POSITION_FIELDS):
+        parts += [r.asset, r.from_addr or "", r.to_addr or "", str(r.amount_raw)]
+    return "|".join(parts)
+
+
+class TxStore:
+    """Transfer records keyed by ``(chain, address, record_key(record))``.
+
+    A high-water mark (block height / slot / lt, i.e. ``TxRecord.block_height``)
+    is kept per ``(chain, address, stream)`` where ``stream`` distinguishes
+    token histories and adapter modes of the same address (empty for the
+    default native history). The newest ``ts`` is kept alongside for
+    histories whose records carry no height (TRON TRC-20 in account mode).
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(marks)")}
+            if "ts" not in columns:
+                self._conn.executescript(_MIGRATE_MARKS)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(txs)")}
+            if "record_key" not in columns:
+                self._migrate_txs()
+
+    def _migrate_txs(self) -> None:
+        self._conn.executescript(_MIGRATE_TXS)
+        with self._conn:
+            rows = self._conn.execute("SELECT chain, address, tx_id, ts, block_height, status, record FROM txs_v1")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO txs (chain, address, record_key, tx_id, ts, block_height, status, record) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(chain, address, record_key(TxRecord(**json.loads(record))), tx_id, ts, height, status, record)
+                 for chain, address, tx_id, ts, height, status, record in rows.fetchall()],
+            )
+            self._conn.execute("DROP TABLE txs_v1")
+
+    def get_mark(self, chain: str, address: str, stream: str = "") -> Optional[int]:
+        return self.get_marks(chain, address, stream)[0]
+
+    def get_marks(self, chain: str, address: str, stream: str = "") -> Tuple[Optional[int], Optional[int]]:
+        """``(height, ts)`` high-water marks; either may be None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT height, ts FROM marks WHERE chain=? AND address=? AND stream=?",
+                (chain, address, stream),
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def put(self, chain: str, address: str, stream: str, records: Iterable[TxRecord]) -> List[TxRecord]:
+        """Upsert records and advance the mark; return new or changed ones."""
+        records = [r for r in records if r.tx_id]
+        if not records:
+            return []
+        keyed = {record_key(r): r for r in records}
+        with self._lock, self._conn:
+            known = {}
+            keys = list(keyed)
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                known.update(self._conn.execute(
+                    f"SELECT record_key, status FROM txs WHERE chain=? AND address=? AND record_key IN ({marks})",
+                    (chain, address, *chunk),
+                ))
+            delta = [(key, r) for key, r in keyed.items() if known.get(key) != r.status]
+            self._conn.executemany(
+                "INSERT INTO txs (chain, address, record_key, tx_id, ts, block_height, status, record) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (chain, address, record_key) DO UPDATE SET "
+                "ts=excluded.ts, block_height=excluded.block_height, "
+                "status=excluded.status, record=excluded.record",
+                [
+                    (chain, address, key, r.tx_id, r.ts, r.block_height, r.status,
+                     json.dumps(dataclasses.asdict(r)))
+                    for key, r in delta
+                ],
+            )
+            # Pending records never advance the marks.
+            settled = [r for r in records if r.status != "pending"]
+            heights = [r.block_height for r in settled if r.block_height is not None]
+            stamps = [r.ts for r in settled if r.ts is not None]
+            if heights or stamps:
+                # MAX() ignores NULL, so a missing side keeps its stored value.
+                self._conn.execute(
+                    "INSERT INTO marks (chain, address, stream, height, ts, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (chain, address, stream) DO UPDATE SET "
+                    "height=MAX(COALESCE(height, excluded.height), COALESCE(excluded.height, height)), "
+                    "ts=MAX(COALESCE(ts, excluded.ts), COALESCE(excluded.ts, ts)), "
+                    "updated_at=excluded.updated_at",
+                    (chain, address, stream, max(heights) if heights else None, max(stamps) if stamps else None,
+                     int(time.time())),
+                )
+        return [r for _, r in delta]
+
+    def get_records(self, chain: str, address: str, since_height: Optional[int] = None) -> List[TxRecord]:
+        """Stored records of an address, newest first."""
+        sql = "SELECT record FROM txs WHERE chain=? AND address=?"
+        args: list = [chain, address]
+        if since_height is not None:
+            sql += " AND block_height >= ?"
+            args.append(since_height)
+        sql += " ORDER BY block_height DESC"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [TxRecord(**json.loads(row[0])) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[TxStore] = None
+
+
+def get_store() -> TxStore:
+    """Process-wide store, opened on first use."""
+    global _store
+    if _store is None:
+        _store = TxStore(os.getenv("PAYCHAIN_TX_STORE", DEFAULT_PATH))
+    return _store
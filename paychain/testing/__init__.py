@@ -0,0 +1,2 @@
+"""Offline helpers: record/replay transport, synthetic providers, stub server
+and a stub Ethereum JSON-RPC node."""
@@ -0,0 +1,255 @@
+"""Stub block sources for offline tests of the block watcher.
+
+Each stub is a :class:`Transport` serving a deterministic chain whose blocks
+move funds between the addresses in ``pool``; ``transfers`` lists every
+movement as ``(block, tx_id, from, to, amount, asset, ok)`` so tests can
+compute expected hits by brute force:
+
+* ``StubEthBlocks``: JSON-RPC ``eth_blockNumber``, ``eth_getBlockByNumber``
+  (full transactions), ``eth_getLogs`` (single-block ranges),
+  ``eth_getTransactionReceipt`` and ``eth_call`` for token metadata;
+* ``StubTronBlocks``: full-node HTTP ``/wallet/getnowblock`` and
+  ``/wallet/getblockbylimitnext``;
+* ``StubBtcBlocks``: bitcoind JSON-RPC ``getblockcount``, ``getblockhash`` and
+  ``getblock`` at verbosity 3. ``ok`` is the fee instead; amounts are in
+  satoshis.
+"""
+import json
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from paychain.adapters.tron import _base58
+from paychain.core.transport import Request, Response, Transport
+from paychain.testing.eth_node import BLOCK_TIME, TOKENS, TRANSFER_TOPIC, TS_GENESIS, _abi_string, _topic
+
+Transfer = Tuple[int, str, str, str, int, str, Any]
+
+USDT_TRON = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+
+
+class _Stub(Transport):
+    def __init__(self, head: int, pool: int, per_block: int):
+        self.head = head
+        self.per_block = per_block
+        self.calls: Counter = Counter()
+        self.transfers: List[Transfer] = []
+        self.pool: List[str] = [self._address(i) for i in range(pool)]
+
+    def _address(self, i: int) -> str:
+        raise NotImplementedError
+
+    def _pair(self, block: int, j: int) -> Tuple[str, str]:
+        n = len(self.pool)
+        src = self.pool[(block * 7 + j) % n]
+        dst = self.pool[(block * 13 + j * 3 + 1) % n]
+        return src, dst
+
+    def _reply(self, req: Request, body: Any) -> Response:
+        return Response(200, {"content-type": "application/json"}, json.dumps(body).encode(), req.url)
+
+    async def asend(self, req: Request) -> Response:
+        return self.send(req)
+
+
+class _JsonRpcStub(_Stub):
+    def _result(self, method: str, params: list) -> Any:
+        raise NotImplementedError
+
+    def _call(self, call: dict) -> dict:
+        method = call.get("method")
+        self.calls[method] += 1
+        try:
+            result = self._result(method, call.get("params") or [])
+        except KeyError:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "method not found"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    def send(self, req: Request) -> Response:
+        body = req.json
+        reply = [self._call(c) for c in body] if isinstance(body, list) else self._call(body or {})
+        return self._reply(req, reply)
+
+
+# === ETH ===
+
+
+class StubEthBlocks(_JsonRpcStub):
+    """Blocks with ``per_block`` ETH payments, a contract call and token transfers."""
+
+    def __init__(self, head: int = 1_000, pool: int = 40, per_block: int = 3):
+        super().__init__(head, pool, per_block)
+        self.blocks: Dict[int, dict] = {}
+        self.logs: Dict[int, List[dict]] = {}
+        self.receipts: Dict[str, dict] = {}
+        contracts = list(TOKENS)
+        for block in range(head + 1):
+            txs, logs = [], []
+            for j in range(per_block):
+                src, dst = self._pair(block, j)
+                tx_hash = "0x" + f"{block:032x}{j:032x}"
+                ok = (block + j) % 17 != 0
+                value = 10**15 * (block + j + 1)
+                txs.append({"hash": tx_hash, "from": src, "to": dst, "value": hex(value), "transactionIndex": hex(j)})
+                self.receipts[tx_hash] = {"transactionHash": tx_hash, "status": "0x1" if ok else "0x0"}
+                self.transfers.append((block, tx_hash, src, dst, value, "ETH", ok))
+            contract = contracts[block % len(contracts)]
+            call_hash = "0x" + f"{block:032x}{per_block:032x}"
+            # Token transfer: zero-value call whose log carries the movement.
+            src, dst = self._pair(block, per_block)
+            txs.append({"hash": call_hash, "from": src, "to": contract, "value": "0x0",
+                        "transactionIndex": hex(per_block)})
+            self.receipts[call_hash] = {"transactionHash": call_hash, "status": "0x1"}
+            amount = 1_000 + block
+            logs.append(self._log(block, 0, contract, [TRANSFER_TOPIC, _topic(src), _topic(dst)], amount, call_hash))
+            self.transfers.append((block, call_hash, src, dst, amount, TOKENS[contract][0], True))
+            if block % 5 == 0:
+                # ERC-721 transfer (token id as fourth topic) must be ignored.
+                logs.append(self._log(block, 1, "0x" + "9" * 40,
+                                      [TRANSFER_TOPIC, _topic(src), _topic(dst), _topic("7")], 0, call_hash))
+            self.blocks[block] = {"number": hex(block), "timestamp": hex(TS_GENESIS + block * BLOCK_TIME),
+                                  "transactions": txs}
+            self.logs[block] = logs
+
+    def _address(self, i: int) -> str:
+        return "0x" + f"{0xa000 + i:040x}"
+
+    @staticmethod
+    def _log(block: int, index: int, contract: str, topics: List[str], value: int, tx_hash: str) -> dict:
+        return {"address": contract, "topics": topics, "data": hex(value), "blockNumber": hex(block),
+                "logIndex": hex(index), "transactionHash": tx_hash, "removed": False}
+
+    def _result(self, method: str, params: list) -> Any:
+        if method == "eth_blockNumber":
+            return hex(self.head)
+        if method == "eth_getBlockByNumber":
+            block = self.blocks.get(int(params[0], 16))
+            if block is None or params[1]:
+                return block
+            return {k: v for k, v in block.items() if k != "transactions"}
+        if method == "eth_getLogs":
+            flt = params[0]
+            lo, hi = int(flt["fromBlock"], 16), int(flt["toBlock"], 16)
+            topic = (flt.get("topics") or [None])[0]
+            return [log for b in range(lo, hi + 1) for log in self.logs.get(b, ())
+                    if topic is None or log["topics"][0] == topic]
+        if method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0])
+        if method == "eth_call":
+            symbol, decimals = TOKENS.get(params[0]["to"].lower(), ("", 0))
+            if params[0]["data"] == "0x313ce567":
+                return "0x" + decimals.to_bytes(32, "big").hex() if symbol else "0x"
+            return _abi_string(symbol) if symbol else "0x"
+        raise KeyError(method)
+
+
+# === TRON ===
+
+
+class StubTronBlocks(_Stub):
+    """Blocks alternating TRX payments and USDT ``transfer``/``transferFrom`` calls."""
+
+    # Full nodes cap ``getblockbylimitnext`` ranges at 100 blocks.
+    MAX_RANGE = 100
+
+    def __init__(self, head: int = 2_000, pool: int = 40, per_block: int = 3):
+        super().__init__(head, pool, per_block)
+        self.usdt_hex = self._hex(USDT_TRON)
+        self.blocks = [self._block(n) for n in range(head + 1)]
+
+    def _address(self, i: int) -> str:
+        return _base58("41" + f"{0xb000 + i:040x}")
+
+    def _hex(self, address: str) -> str:
+        if address == USDT_TRON:
+            return "41a614f803b6fd780986a42c78ec9c7f77e6ded13c"
+        return "41" + f"{0xb000 + self.pool.index(address):040x}"
+
+    def _block(self, n: int) -> dict:
+        txs = []
+        for j in range(self.per_block):
+            src, dst = self._pair(n, j)
+            tx_id = f"{n:032x}{j:032x}"
+            ok = (n + j) % 19 != 0
+            amount = 1_000_000 * (j + 1) + n
+            if j % 3 == 0:
+                contract = {"type": "TransferContract", "parameter": {"value": {
+                    "owner_address": self._hex(src), "to_address": self._hex(dst), "amount": amount}}}
+                asset = "TRX"
+            else:
+                if j % 3 == 1:
+                    owner, data = src, "a9059cbb" + self._hex(dst)[2:].rjust(64, "0") + f"{amount:064x}"
+                else:
+                    # transferFrom: the caller is a spender, not a party.
+                    owner = self.pool[(n + 5) % len(self.pool)]
+                    data = ("23b872dd" + self._hex(src)[2:].rjust(64, "0") + self._hex(dst)[2:].rjust(64, "0")
+                            + f"{amount:064x}")
+                contract = {"type": "TriggerSmartContract", "parameter": {"value": {
+                    "owner_address": self._hex(owner), "contract_address": self.usdt_hex, "data": data}}}
+                asset = "USDT"
+            txs.append({"txID": tx_id, "raw_data": {"contract": [contract]},
+                        "ret": [{"contractRet": "SUCCESS" if ok else "REVERT"}]})
+            self.transfers.append((n, tx_id, src, dst, amount, asset, ok))
+        # Other contract calls are ignored.
+        txs.append({"txID": f"{n:032x}{'f' * 32}", "raw_data": {"contract": [{"type": "VoteWitnessContract",
+                    "parameter": {"value": {"owner_address": self._hex(self.pool[0])}}}]}, "ret": [{}]})
+        return {"blockID": f"{n:064x}", "block_header": {"raw_data": {"number": n,
+                "timestamp": (TS_GENESIS + n * 3) * 1000}}, "transactions": txs}
+
+    def send(self, req: Request) -> Response:
+        path = req.url.split("/wallet/", 1)[-1]
+        self.calls[path] += 1
+        if path == "getnowblock":
+            return self._reply(req, self.blocks[self.head])
+        if path == "getblockbylimitnext":
+            lo, hi = req.json["startNum"], req.json["endNum"]
+            if hi - lo > self.MAX_RANGE:
+                return self._reply(req, {"Error": "class java.lang.IllegalArgumentException : too many blocks"})
+            return self._reply(req, {"block": self.blocks[lo:min(hi, self.head + 1)]})
+        return Response(404, {}, b"{}", req.url)
+
+
+# === BTC ===
+
+
+class StubBtcBlocks(_JsonRpcStub):
+    """Blocks with a coinbase and ``per_block`` payments returning change."""
+
+    def __init__(self, head: int = 300, pool: int = 40, per_block: int = 3):
+        super().__init__(head, pool, per_block)
+        self.blocks: Dict[str, dict] = {}
+        for n in range(head + 1):
+            miner = self.pool[n % len(self.pool)]
+            txs = [{"txid": f"{n:032x}{'c' * 32}", "vin": [{"coinbase": "03" + f"{n:06x}", "sequence": 0}],
+                    "vout": [{"value": 3.125, "n": 0, "scriptPubKey": {"address": miner}}]}]
+            self.transfers.append((n, txs[0]["txid"], None, miner, 312_500_000, "BTC", 0))
+            for j in range(self.per_block):
+                src, dst = self._pair(n, j)
+                amount, change, fee = 100_000 * (j + 1) + n, 50_000 + j, 1_000
+                txid = f"{n:032x}{j:032x}"
+                txs.append({
+                    "txid": txid,
+                    "vin": [{"txid": "0" * 64, "vout": 0, "prevout": {"value": (amount + change + fee) / 1e8,
+                                                                        "scriptPubKey": {"address": src}}}],
+                    "vout": [
+                        {"value": amount / 1e8, "n": 0, "scriptPubKey": {"address": dst}},
+                        {"value": change / 1e8, "n": 1, "scriptPubKey": {"address": src}},
+                    ],
+                })
+                self.transfers.append((n, txid, src, dst, amount, "BTC", fee))
+            self.blocks[self._hash(n)] = {"hash": self._hash(n), "height": n, "time": TS_GENESIS + n * 600, "tx": txs}
+
+    def _address(self, i: int) -> str:
+        return f"bc1qstub{i:04d}"
+
+    @staticmethod
+    def _hash(n: int) -> str:
+        return f"{n:064x}"
+
+    def _result(self, method: str, params: list) -> Any:
+        if method == "getblockcount":
+            return self.head
+        if method == "getblockhash":
+            return self._hash(params[0])
+        if method == "getblock":
+            return self.blocks[params[0]]
+        raise KeyError(method)
@@ -0,0 +1,135 @@
+"""Cassette-style record/replay for the HTTP transport.
+
+A cassette is a JSON file of request/response pairs. ``RecordingTransport``
+wraps a real transport and appends every exchange; ``ReplayTransport`` serves
+them back without network access. Requests are matched with
+:func:`paychain.core.cache.cache_key`, so API keys are neither stored nor
+needed for a match.
+"""
+import base64
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from paychain.core.cache import cache_key
+from paychain.core.ratelimit import KEY_PARAMS
+from paychain.core.transport import Request, Response, Transport, WrappingTransport
+
+CASSETTE_VERSION = 1
+
+
+def _strip_host(url: str) -> str:
+    parts = urlsplit(url)
+    return urlunsplit(("", "", parts.path, parts.query, ""))
+
+
+def _scrub_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k.lower() not in KEY_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def match_key(req: Request, ignore_host: bool = False) -> str:
+    if ignore_host:
+        req = Request(req.method, _strip_host(req.url), params=req.params, json=req.json)
+    return cache_key(req)
+
+
+class Cassette:
+    """In-memory list of recorded exchanges with JSON (de)serialization."""
+
+    def __init__(self, interactions: Optional[List[Dict[str, Any]]] = None):
+        self.interactions: List[Dict[str, Any]] = interactions or []
+        self._lock = threading.Lock()
+
+    def add(self, req: Request, resp: Response) -> None:
+        params = {k: v for k, v in (req.params or {}).items() if k.lower() not in KEY_PARAMS}
+        with self._lock:
+            self.interactions.append({
+                "request": {"method": req.method, "url": _scrub_url(req.url), "params": params or None, "json": req.json},
+                "response": {
+                    "status": resp.status_code,
+                    "headers": resp.headers,
+                    "url": _scrub_url(resp.url),
+                    "body": base64.b64encode(resp.content).decode(),
+                },
+            })
+
+    @staticmethod
+    def to_request(item: Dict[str, Any]) -> Request:
+        r = item["request"]
+        return Request(r["method"], r["url"], params=r.get("params"), json=r.get("json"))
+
+    @staticmethod
+    def to_response(item: Dict[str, Any]) -> Response:
+        r = item["response"]
+        return Response(r["status"], r.get("headers") or {}, base64.b64decode(r["body"]), r.get("url", ""))
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {data.get('version')}")
+        return cls(data["interactions"])
+
+    def save(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            data = {"version": CASSETTE_VERSION, "interactions": list(self.interactions)}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+class RecordingTransport(WrappingTransport):
+    """Pass requests through and record every exchange into ``cassette``."""
+
+    def __init__(self, inner: Transport, cassette: Optional[Cassette] = None):
+        super().__init__(inner)
+        self.cassette = cassette if cassette is not None else Cassette()
+
+    def send(self, req: Request) -> Response:
+        resp = self.inner.send(req)
+        self.cassette.add(req, resp)
+        return resp
+
+    async def asend(self, req: Request) -> Response:
+        resp = await self.inner.asend(req)
+        self.cassette.add(req, resp)
+        return resp
+
+
+class ReplayTransport(Transport):
+    """Serve recorded responses; unknown requests raise ``ConnectionError``.
+
+    With ``ignore_host`` requests match on path, query and body only, so a
+    cassette recorded against a provider can be served by a local stub.
+    Repeated identical requests cycle through their recorded responses.
+    """
+
+    def __init__(self, cassette: Cassette, ignore_host: bool = False):
+        self.ignore_host = ignore_host
+        self._responses: Dict[str, List[Response]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for item in cassette.interactions:
+            key = match_key(Cassette.to_request(item), ignore_host)
+            self._responses.setdefault(key, []).append(Cassette.to_response(item))
+
+    def send(self, req: Request) -> Response:
+        key = match_key(req, self.ignore_host)
+        with self._lock:
+            replies = self._responses.get(key)
+            if not replies:
+                raise requests.ConnectionError(f"No recorded response for {req.method} {req.url}")
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = (i + 1) % len(replies)
+        return replies[i]
+
+    async def asend(self, req: Request) -> Response:
+        return self.send(req)
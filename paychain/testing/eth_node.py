@@ -0,0 +1,157 @@
+"""Minimal Ethereum JSON-RPC node for offline tests.
+
+``StubEthNode`` is a :class:`Transport` serving ``eth_blockNumber``,
+``eth_getLogs``, ``eth_getBlockByNumber`` and ``eth_call`` (``decimals()``/
+``symbol()``) over a deterministic set of ERC-20 ``Transfer`` logs. Like real
+providers it refuses ``eth_getLogs`` ranges matching more than
+``max_results`` logs. Run it behind
+:class:`~paychain.testing.stub_server.StubServer` to test over HTTP.
+"""
+import json
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from paychain.core.transport import Request, Response, Transport
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+TS_GENESIS = 1_600_000_000
+BLOCK_TIME = 12
+TOKENS = {
+    "0x00000000000000000000000000000000000000c1": ("USDT", 6),
+    "0x00000000000000000000000000000000000000c2": ("DAI", 18),
+}
+
+
+def _topic(address: str) -> str:
+    return "0x" + address.lower().removeprefix("0x").rjust(64, "0")
+
+
+def _abi_string(text: str) -> str:
+    raw = text.encode()
+    padded = raw.ljust((len(raw) + 31) // 32 * 32, b"\0")
+    return "0x" + (32).to_bytes(32, "big").hex() + len(raw).to_bytes(32, "big").hex() + padded.hex()
+
+
+class StubEthNode(Transport):
+    def __init__(
+        self,
+        address: str,
+        transfers: int = 300,
+        head: int = 50_000,
+        every: int = 37,
+        max_results: int = 50,
+        range_hint: bool = False,
+        batch: bool = True,
+    ):
+        self.address = address.lower()
+        self.head = head
+        self.max_results = max_results
+        self.range_hint = range_hint
+        self.batch = batch
+        self.calls: Counter = Counter()
+        self.logs: List[Dict[str, Any]] = []
+        contracts = list(TOKENS)
+        for i in range(transfers):
+            block = head - i * every
+            if block < 0:
+                break
+            other = "0x" + f"{i % 50:040x}"
+            incoming = i % 3 != 0
+            src, dst = (other, self.address) if incoming else (self.address, other)
+            if i % 41 == 0:
+                src = dst = self.address  # self-transfer: matches both filters
+            self._add(block, contracts[i % len(contracts)], [TRANSFER_TOPIC, _topic(src), _topic(dst)], 1000 + i)
+            if i % 25 == 0:
+                # ERC-721 transfer in the same block (token id as fourth topic).
+                self._add(block, "0x" + "9" * 40, [TRANSFER_TOPIC, _topic(other), _topic(self.address), _topic("7")], 0)
+
+    def _add(self, block: int, contract: str, topics: List[str], value: int) -> None:
+        index = sum(1 for log in self.logs if log["blockNumber"] == hex(block))
+        self.logs.append({
+            "address": contract,
+            "topics": topics,
+            "data": hex(value),
+            "blockNumber": hex(block),
+            "logIndex": hex(index),
+            "transactionHash": "0x" + f"{block:032x}{index:032x}",
+            "removed": False,
+        })
+
+    def expected(self, direction: str = "all", token: Optional[str] = None) -> List[Dict[str, Any]]:
+        """ERC-20 logs the adapter should return, newest first."""
+        me = _topic(self.address)
+        out = []
+        for log in self.logs:
+            topics = log["topics"]
+            if len(topics) != 3 or (token and log["address"] != token.lower()):
+                continue
+            if (direction in ("all", "outgoing") and topics[1] == me) or (
+                direction in ("all", "incoming") and topics[2] == me
+            ):
+                out.append(log)
+        return sorted(out, key=lambda l: (int(l["blockNumber"], 16), int(l["logIndex"], 16)), reverse=True)
+
+    # === Methods ===
+
+    def _get_logs(self, flt: dict) -> Any:
+        lo, hi = int(flt["fromBlock"], 16), int(flt["toBlock"], 16)
+        topics = flt.get("topics") or []
+        address = flt.get("address")
+        matched = []
+        for log in self.logs:
+            if not lo <= int(log["blockNumber"], 16) <= hi:
+                continue
+            if address and log["address"] != address.lower():
+                continue
+            if any(t is not None and (i >= len(log["topics"]) or log["topics"][i] != t) for i, t in enumerate(topics)):
+                continue
+            matched.append(log)
+        if len(matched) > self.max_results:
+            message = f"query returned more than {self.max_results} results"
+            if self.range_hint:
+                message += f". Try with this block range [{hex(lo)}, {hex(lo + (hi - lo) // 4)}]."
+            raise _RpcFault(-32005, message)
+        return matched
+
+    def _call(self, call: dict) -> dict:
+        method = call.get("method")
+        params = call.get("params") or []
+        self.calls[method] += 1
+        try:
+            if method == "eth_blockNumber":
+                result: Any = hex(self.head)
+            elif method == "eth_getLogs":
+                result = self._get_logs(params[0])
+            elif method == "eth_getBlockByNumber":
+                number = int(params[0], 16)
+                result = {"number": params[0], "timestamp": hex(TS_GENESIS + number * BLOCK_TIME)}
+            elif method == "eth_call":
+                symbol, decimals = TOKENS.get(params[0]["to"].lower(), ("", 0))
+                if params[0]["data"] == "0x313ce567":
+                    result = "0x" + decimals.to_bytes(32, "big").hex() if symbol else "0x"
+                else:
+                    result = _abi_string(symbol) if symbol else "0x"
+            else:
+                raise _RpcFault(-32601, "method not found")
+        except _RpcFault as e:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": e.code, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    def send(self, req: Request) -> Response:
+        body = req.json
+        if isinstance(body, list):
+            if not self.batch:
+                return Response(400, {}, b'{"error": "batch requests are not supported"}', req.url)
+            reply: Any = [self._call(c) for c in body]
+        else:
+            reply = self._call(body or {})
+        return Response(200, {"content-type": "application/json"}, json.dumps(reply).encode(), req.url)
+
+    async def asend(self, req: Request) -> Response:
+        return self.send(req)
+
+
+class _RpcFault(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
@@ -0,0 +1,83 @@
+"""Local HTTP server answering requests through a :class:`Transport`.
+
+Wrap :class:`~paychain.testing.synthetic.SyntheticProviders` or a
+:class:`~paychain.testing.cassette.ReplayTransport` (with ``ignore_host``)
+and point adapters at :attr:`StubServer.url` via ``TxQuery.rpc_url``. The
+adapters then run their real network path against localhost.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from paychain.core.transport import Request, Transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls.
+    disable_nagle_algorithm = True
+    backend: Transport
+
+    def _serve(self, method: str) -> None:
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query)) or None
+        body = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = json.loads(self.rfile.read(length))
+        req = Request(method, parts.path, params=params, json=body)
+        try:
+            resp = self.backend.send(req)
+            status, content = resp.status_code, resp.content
+        except requests.ConnectionError as e:
+            status, content = 502, json.dumps({"error": str(e)}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:
+        self._serve("GET")
+
+    def do_POST(self) -> None:
+        self._serve("POST")
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class StubServer:
+    """Threaded localhost server; use as a context manager."""
+
+    def __init__(self, backend: Transport, host: str = "127.0.0.1", port: int = 0):
+        handler = type("StubHandler", (_Handler,), {"backend": backend})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,220 @@
+"""Deterministic synthetic provider responses.
+
+``SyntheticProviders`` is a :class:`Transport` answering the subset of the
+Blockstream, Etherscan, Solana JSON-RPC, TonAPI and TronGrid APIs used by the
+adapters. Routing is by path (or JSON-RPC body), never by host, so it works
+both in-process and behind :class:`paychain.testing.stub_server.StubServer`.
+Every address has ``history`` transactions, newest first, with cursors that
+behave like the real ones.
+"""
+import json
+import re
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from paychain.core.transport import Request, Response, Transport
+
+BTC_PAGE = 25
+# Synthetic chain tips.
+BTC_TIP = 900_000
+ETH_TIP = 20_000_000
+SOL_TIP = 300_000_000
+TON_TIP_LT = 50_000_000_000
+TRON_TIP = 70_000_000
+TS_TIP = 1_700_000_000
+
+_BTC_PATH = re.compile(r"/address/([^/]+)/txs(?:/chain/([0-9a-f]+))?$")
+_TON_PATH = re.compile(r"/accounts/([^/]+)/events$")
+_TRON_PATH = re.compile(r"/v1/contracts/([^/]+)/events$")
+
+
+def _hex(address: str, i: int, width: int = 64) -> str:
+    return f"{zlib.crc32(address.encode()) & 0xffff:04x}{i:0{width - 4}x}"
+
+
+class SyntheticProviders(Transport):
+    def __init__(self, history: int = 1000):
+        self.history = history
+        self.requests = 0
+
+    # === BTC (Blockstream) ===
+
+    def _btc_tx(self, address: str, i: int) -> dict:
+        incoming = i % 2 == 0
+        other = f"bc1qother{i % 97}"
+        return {
+            "txid": _hex(address, i),
+            "status": {"confirmed": True, "block_height": BTC_TIP - i, "block_time": TS_TIP - i * 600},
+            "vin": [{"prevout": {"scriptpubkey_address": other if incoming else address, "value": 10_000 + i}}],
+            "vout": [
+                {"scriptpubkey_address": address if incoming else other, "value": 9_000 + i},
+                {"scriptpubkey_address": f"bc1qchange{i % 13}", "value": 500},
+            ],
+        }
+
+    def _btc(self, address: str, after: Optional[str]) -> list:
+        start = 0
+        if after:
+            start = int(after[4:], 16) + 1
+        end = min(self.history, start + BTC_PAGE)
+        return [self._btc_tx(address, i) for i in range(start, end)]
+
+    # === ETH (Etherscan) ===
+
+    def _eth(self, params: Dict[str, Any]) -> dict:
+        address = params["address"]
+        token = params.get("action") == "tokentx"
+        offset = int(params.get("offset", 10))
+        end_block = int(params["endblock"]) if "endblock" in params else None
+        # Two transactions per block.
+        start = 0 if end_block is None else max(0, (ETH_TIP - end_block) * 2)
+        rows = []
+        for i in range(start, min(self.history, start + offset)):
+            row = {
+                "hash": "0x" + _hex(address, i),
+                "blockNumber": str(ETH_TIP - i // 2),
+                "timeStamp": str(TS_TIP - i * 6),
+                "from": "0x" + _hex("from", i % 50, 40) if i % 2 == 0 else address,
+                "to": address if i % 2 == 0 else "0x" + _hex("to", i % 50, 40),
+                "value": str(10 ** 15 * (i + 1)),
+                "isError": "0",
+            }
+            if token:
+                row.update({"contractAddress": params.get("contractaddress"), "tokenSymbol": "USDT",
+                            "tokenDecimal": "6", "value": str(1_000_000 * (i + 1))})
+            rows.append(row)
+        return {"status": "1" if rows else "0", "message": "OK", "result": rows}
+
+    # === SOL (JSON-RPC) ===
+
+    def _sol_sig(self, address: str, i: int) -> str:
+        # Not base58, but lets getTransaction recover owner and index.
+        return f"{address}-{i:08d}"
+
+    def _sol_parse_sig(self, sig: str) -> Tuple[str, int]:
+        owner, _, i = sig.rpartition("-")
+        return owner, int(i)
+
+    def _sol_call(self, call: dict) -> dict:
+        method = call.get("method")
+        params = call.get("params") or []
+        if method == "getTokenAccountsByOwner":
+            # One token account per owner; its signatures carry the owner.
+            result = {"context": {"slot": SOL_TIP}, "value": [{"pubkey": f"{params[0]}.ata", "account": {}}]}
+        elif method == "getSignaturesForAddress":
+            address, opts = params[0], (params[1] if len(params) > 1 else {})
+            start = self._sol_parse_sig(opts["before"])[1] + 1 if opts.get("before") else 0
+            limit = int(opts.get("limit", 1000))
+            result: Any = [
+                {"signature": self._sol_sig(address, i), "slot": SOL_TIP - i * 10,
+                 "blockTime": TS_TIP - i * 4, "err": None}
+                for i in range(start, min(self.history, start + limit))
+            ]
+        elif method == "getTransaction":
+            owner, i = self._sol_parse_sig(params[0])
+            owner = owner.removesuffix(".ata")
+            result = {
+                "slot": SOL_TIP - i * 10,
+                "blockTime": TS_TIP - i * 4,
+                "meta": {
+                    "err": None,
+                    "preTokenBalances": [{"owner": owner, "mint": "MintUSDT",
+                                          "uiTokenAmount": {"amount": str(i * 1000), "decimals": 6}}],
+                    "postTokenBalances": [{"owner": owner, "mint": "MintUSDT",
+                                           "uiTokenAmount": {"amount": str(i * 1000 + 500), "decimals": 6}}],
+                },
+                "transaction": {"message": {"instructions": [
+                    {"program": "system", "parsed": {"type": "transfer", "info": {
+                        "source": f"Payer{i % 31}", "destination": owner, "lamports": 1_000_000 + i}}},
+                ]}},
+            }
+        else:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "not found"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    # === TON (TonAPI) ===
+
+    def _ton(self, address: str, params: Dict[str, Any]) -> dict:
+        limit = int(params.get("limit", 20))
+        before = int(params["before_lt"]) if params.get("before_lt") else None
+        start = 0 if before is None else (TON_TIP_LT - before) // 1000 + 1
+        events = []
+        for i in range(start, min(self.history, start + limit)):
+            incoming = i % 2 == 0
+            other = f"0:{_hex('ton', i % 40)}"
+            events.append({
+                "event_id": _hex(address, i),
+                "timestamp": TS_TIP - i * 5,
+                "lt": TON_TIP_LT - i * 1000,
+                "actions": [{"type": "TonTransfer", "TonTransfer": {
+                    "sender": other if incoming else address,
+                    "recipient": address if incoming else other,
+                    "amount": 1_000_000_000 + i,
+                }}],
+            })
+        next_from = events[-1]["lt"] if events and start + limit < self.history else 0
+        return {"events": events, "next_from": next_from}
+
+    # === TRON (TronGrid) ===
+
+    def _tron(self, contract: str, params: Dict[str, Any]) -> dict:
+        address = params.get("to") or ""
+        limit = int(params.get("limit", 20))
+        start = int(params["fingerprint"]) if params.get("fingerprint") else 0
+        data = [
+            {
+                "transaction_id": _hex(address, i),
+                "block_number": TRON_TIP - i,
+                "block_timestamp": (TS_TIP - i * 3) * 1000,
+                "contract_address": contract,
+                "event_name": "Transfer",
+                "result": {"from": f"TSender{i % 57}", "to": address, "value": str(1_000_000 * (i + 1))},
+            }
+            for i in range(start, min(self.history, start + limit))
+        ]
+        meta: Dict[str, Any] = {"page_size": len(data)}
+        if start + limit < self.history:
+            meta["fingerprint"] = str(start + limit)
+        return {"data": data, "success": True, "meta": meta}
+
+    # === Routing ===
+
+    def route(self, req: Request) -> Tuple[int, Any]:
+        path = req.url.split("?", 1)[0]
+        params = dict(req.params or {})
+        if req.method.upper() == "POST":
+            body = req.json
+            if isinstance(body, list):
+                return 200, [self._sol_call(c) for c in body]
+            return 200, self._sol_call(body or {})
+        m = _BTC_PATH.search(path)
+        if m:
+            return 200, self._btc(m.group(1), m.group(2))
+        m = _TON_PATH.search(path)
+        if m:
+            return 200, self._ton(m.group(1), params)
+        m = _TRON_PATH.search(path)
+        if m:
+            return 200, self._tron(m.group(1), params)
+        if params.get("module") == "account":
+            return 200, self._eth(params)
+        return 404, {"error": "not found"}
+
+    def send(self, req: Request) -> Response:
+        self.requests += 1
+        status, body = self.route(req)
+        return Response(status, {"content-type": "application/json"}, json.dumps(body).encode(), req.url)
+
+    async def asend(self, req: Request) -> Response:
+        return self.send(req)
+
+
+def default_queries(suffix: str = "synthetic") -> Dict[str, Dict[str, Any]]:
+    """TxQuery keyword arguments exercising every adapter against the fakes."""
+    return {
+        "BTC": {"address": f"bc1q{suffix}"},
+        "ETH": {"address": f"0x{suffix}"},
+        "SOL": {"address": f"Owner{suffix}", "token": "MintUSDT"},
+        "TON": {"address": f"0:{suffix}"},
+        "TRON": {"address": f"T{suffix}"},
+    }
@@ -0,0 +1,96 @@
+import logging
+import sys
+import threading
+import types
+
+import pytest
+
+# The AML modules import ``loguru`` and ``mdbx`` at top level. Neither is
+# needed to exercise them offline, so stand-ins are installed when missing.
+try:
+    import loguru  # noqa: F401
+except ImportError:
+    sys.modules["loguru"] = types.SimpleNamespace(logger=logging.getLogger("aml"))
+
+
+class _Txn:
+    def __init__(self, store: dict):
+        self.store = store
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def put(self, key, value):
+        self.store[key] = bytes(value)
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+class FakeEnvironment:
+    """Dict-backed ``mdbx.Environment``; counts transactions."""
+
+    def __init__(self, path, **kwargs):
+        self.store: dict = {}
+        self.txns = 0
+
+    def open_db(self, name):
+        return name
+
+    def begin(self, db=None, write=False):
+        self.txns += 1
+        return _Txn(self.store)
+
+
+try:
+    import mdbx  # noqa: F401
+except ImportError:
+    sys.modules["mdbx"] = types.SimpleNamespace(Environment=FakeEnvironment)
+
+from aml.aml_cache import AmlCache  # noqa: E402
+
+
+class FakeBackend(AmlCache):
+    """In-memory persistent tier that records batches.
+
+    ``fail`` makes ``set_many`` raise; a ``gate`` event holds every batch
+    until it is set, with ``writing`` set while one waits.
+    """
+
+    def __init__(self):
+        self.data: dict = {}
+        self.batches: list = []
+        self.fail = False
+        self.gate = None
+        self.writing = threading.Event()
+
+    def get(self, network, address):
+        return self.data.get((network, address))
+
+    def set(self, network, address, data):
+        self.set_many(network, [(address, data)])
+
+    def set_many(self, network, records):
+        records = list(records)
+        if self.gate is not None:
+            self.writing.set()
+            self.gate.wait(5)
+        if self.fail:
+            raise OSError("backend unavailable")
+        self.batches.append((network, [address for address, _ in records]))
+        for address, data in records:
+            self.data[(network, address)] = data
+
+    def delete(self, network, address):
+        self.data.pop((network, address), None)
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+
+import pytest
+
+from aml import aml_cache
+from aml.aml_cache import MdbxAmlCache, TieredAmlCache, _decode, _encode, _read
+
+
+def _record(status="safe", score=0.0, flags=(), checked_at=None):
+    data = {"status": status, "score": score, "flags": list(flags), "source": "auto"}
+    data["checked_at"] = int(time.time()) if checked_at is None else checked_at
+    return data
+
+
+@pytest.mark.parametrize("data", [
+    _record(),
+    _record("warning", 0.35, ["large_balance", "high_tx_volume"], checked_at=1_700_000_000),
+    {"status": "blocked", "score": 1.0, "flags": ["manual_block", "тест"], "source": "manual", "checked_at": 5},
+    {"status": "blocked", "score": 1.0, "flags": ["blocked_locally"], "checked_at": 7},
+])
+def test_codec_round_trip(data):
+    raw = _encode(data)
+    assert raw[0] == aml_cache._RECORD_V1
+    assert _decode(raw) == data
+
+
+@pytest.mark.parametrize("data", [
+    {**_record(), "note": "extra field"},
+    _record(score=0.1234),
+    {**_record(), "status": "unknown"},
+])
+def test_codec_falls_back_to_json(data):
+    raw = _encode(data)
+    assert json.loads(raw) == data and _decode(raw) == data
+
+
+def test_read_applies_ttl_to_both_formats():
+    now = 1_700_000_000
+    for raw in (_encode(_record(checked_at=now - 100)), json.dumps(_record(checked_at=now - 100)).encode()):
+        assert _read(raw, 200, now)["checked_at"] == now - 100
+        assert _read(raw, 50, now) is None
+        assert _read(raw, None, now) is not None
+    assert _read(None, 50, now) is None
+
+
+def test_mdbx_reads_legacy_json_records(tmp_path):
+    cache = MdbxAmlCache(str(tmp_path / "aml.mdbx"))
+    old, new = _record("warning", 0.3, ["large_balance"], checked_at=1), _record()
+    with cache.env.begin(write=True, db=cache.db) as txn:
+        txn.put(b"tron:old", json.dumps(old).encode())
+        txn.put(b"tron:new", json.dumps(new).encode())
+    assert cache.get("tron", "old") == old
+    assert cache.get_fresh("tron", "old", 3600) is None and cache.is_expired("tron", "old", 3600)
+    assert cache.get_fresh("tron", "new", 3600) == new
+    assert cache.get_many("tron", ["old", "new"], ttl_seconds=3600) == {"new": new}
+    # Rewritten records switch to the binary format.
+    cache.set("tron", "old", old)
+    with cache.env.begin(db=cache.db) as txn:
+        assert txn.get(b"tron:old")[0] == aml_cache._RECORD_V1
+    assert cache.get("tron", "old") == old
+
+
+def test_mdbx_expires_binary_records_by_header(tmp_path):
+    cache = MdbxAmlCache(str(tmp_path / "aml.mdbx"))
+    cache.set_many("tron", [("stale", _record(checked_at=int(time.time()) - 7200)), ("fresh", _record())])
+    assert cache.get_fresh("tron", "stale", 3600) is None and cache.is_expired("tron", "stale", 3600)
+    assert cache.get_fresh("tron", "stale", 10800)["checked_at"] < time.time() - 3600
+    assert cache.get_fresh("tron", "fresh", 3600) is not None
+
+
+def test_mdbx_batches_share_one_transaction(tmp_path):
+    cache = MdbxAmlCache(str(tmp_path / "aml.mdbx"))
+    cache.set_many("tron", [(f"T{i}", _record(checked_at=i)) for i in range(5)])
+    cache.set("tron", "fresh", _record())
+    found = cache.get_many("tron", ["T0", "T4", "fresh", "missing"])
+    assert set(found) == {"T0", "T4", "fresh"} and found["T4"]["checked_at"] == 4
+    assert set(cache.get_many("tron", ["T0", "fresh"], ttl_seconds=3600)) == {"fresh"}
+    assert cache.get_many("tron", ["missing", "other"]) == {}
+    assert cache.is_expired("tron", "T0") and not cache.is_expired("tron", "fresh")
+
+
+def test_lru_evicts_to_backend(backend):
+    cache = TieredAmlCache(backend, max_entries=2, flush_interval=60)
+    for i in range(3):
+        cache.set("tron", f"T{i}", _record(checked_at=i))
+    assert list(cache._lru) == [("tron", "T1"), ("tron", "T2")]
+    # Evicted but not written yet: still served from the queue.
+    assert cache.get("tron", "T0")["checked_at"] == 0
+    cache.flush()
+    assert backend.batches == [("tron", ["T0", "T1", "T2"])]
+    backend.data[("tron", "T0")] = _record(checked_at=100)
+    assert cache.get("tron", "T0")["checked_at"] == 100
+    assert ("tron", "T0") in cache._lru and len(cache._lru) == 2
+    cache.close()
+
+
+def test_lru_byte_bound(backend):
+    cache = TieredAmlCache(backend, max_bytes=300, flush_interval=60)
+    for i in range(20):
+        cache.set("tron", f"T{i:02d}", _record(flags=["x" * 40]))
+    assert 0 < len(cache._lru) < 20 and cache._bytes <= 300
+    cache.close()
+    assert len(backend.data) == 20
+
+
+def test_ttl_of_cached_records(backend):
+    cache = TieredAmlCache(backend, flush_interval=60)
+    cache.set("tron", "old", _record(checked_at=int(time.time()) - 7200))
+    cache.set("tron", "new", _record())
+    assert cache.get_fresh("tron", "old", 3600) is None
+    assert cache.get_fresh("tron", "new", 3600) is not None
+    assert cache.is_expired("tron", "old", 3600)
+    assert set(cache.get_many("tron", ["old", "new", "missing"], 3600)) == {"new"}
+    backend.data[("tron", "stored")] = _record(checked_at=1)
+    assert cache.get_many("tron", ["stored"], 3600) == {}
+    # The stale record is still kept in memory for later unbounded reads.
+    assert cache.get("tron", "stored")["checked_at"] == 1 and ("tron", "stored") in cache._lru
+    cache.close()
+
+
+def test_errors_stay_in_memory(backend):
+    cache = TieredAmlCache(backend, error_ttl=0.05, flush_interval=60)
+    error = {"status": "error", "score": 1.0, "flags": ["aml_check_error", "timeout"], "source": "error"}
+    cache.set("tron", "T1", error)
+    assert cache.get_fresh("tron", "T1")["status"] == "error"
+    cache.flush()
+    assert backend.batches == [] and backend.data == {}
+    time.sleep(0.1)
+    # An expired error does not hide what the backend has.
+    backend.data[("tron", "T1")] = _record()
+    assert cache.get("tron", "T1")["status"] == "safe"
+    cache.set("tron", "T2", dict(error))
+    time.sleep(0.1)
+    assert cache.get_many("tron", ["T2"]) == {}
+    cache.close()
+    assert ("tron", "T2") not in backend.data
+
+
+def test_failed_flush_keeps_records_and_retries(backend):
+    cache = TieredAmlCache(backend, max_entries=1, flush_interval=60)
+    cache.set("tron", "T1", _record(checked_at=1))
+    cache.set("tron", "T2", _record(checked_at=2))
+    backend.fail = True
+    with pytest.raises(OSError):
+        cache.flush()
+    assert cache.get("tron", "T1")["checked_at"] == 1
+    # A newer write made while the batch was out wins over the re-queued one.
+    cache.set("tron", "T2", _record(checked_at=3))
+    assert cache._pending_count == 2
+    backend.fail = False
+    cache.flush()
+    assert backend.data[("tron", "T1")]["checked_at"] == 1
+    assert backend.data[("tron", "T2")]["checked_at"] == 3
+    assert cache._pending_count == 0
+    cache.close()
+
+
+def test_full_queue_wakes_flusher_without_blocking(backend):
+    backend.gate = threading.Event()
+    cache = TieredAmlCache(backend, max_entries=1, flush_interval=60, flush_batch=3)
+    started = time.monotonic()
+    for i in range(3):
+        cache.set("tron", f"T{i}", _record(checked_at=i))
+    assert time.monotonic() - started < 1
+    assert backend.writing.wait(2)
+    # In flight: readable, and a delete is not undone by the running write.
+    assert cache.get("tron", "T0")["checked_at"] == 0
+    cache.delete("tron", "T1")
+    assert cache.get("tron", "T1") is None
+    backend.gate.set()
+    cache.close()
+    assert set(backend.data) == {("tron", "T0"), ("tron", "T2")}
+    assert cache.get("tron", "T1") is None
+
+
+def test_set_after_close_writes_through(backend):
+    cache = TieredAmlCache(backend, flush_interval=60)
+    cache.close()
+    cache.set("tron", "T1", _record())
+    assert ("tron", "T1") in backend.data
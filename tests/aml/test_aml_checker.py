@@ -0,0 +1,263 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from aml import http_client
+from aml.aml_cache import TieredAmlCache
+from aml.aml_config import tron_config
+from paychain.core.aio import AsyncClientPool
+from paychain.core.config import config
+from tron import aml_checker
+
+OLD = 1_500_000_000_000
+RISKY = {"balance": 2_000_000_000, "totalTransactionCount": 6000, "createTime": OLD}
+QUIET = {"balance": 10, "totalTransactionCount": 3, "createTime": OLD}
+
+# address -> (account info, senders newest first). L1/L2 sit at the depth
+# limit, so their own senders are never fetched. S3 is risky only through
+# its senders.
+GRAPH = {
+    "R1": (QUIET, ["S1", "S3"]),
+    "R2": (QUIET, ["S3", "S4"]),
+    "R3": (RISKY, []),
+    "R4": (QUIET, ["S1", "S4", "Z1"]),
+    "S1": (RISKY, []),
+    "S3": ({**QUIET, "balance": 2_000_000_000}, ["L1", "L2"]),
+    "S4": (RISKY, []),
+    "L1": (RISKY, ["X2"]),
+    "L2": (RISKY, ["X3"]),
+    "Z1": (QUIET, []),
+}
+
+
+class TronScan:
+    """TronScan and Chainabuse over ``httpx.MockTransport``.
+
+    ``delays`` holds per-address reply delays in seconds; ``active`` and
+    ``peak`` count requests in flight.
+    """
+
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+        self.delays: dict[str, float] = {}
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        address = request.url.params.get("address") or request.url.params.get("toAddress") or ""
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delays.get(address, 0))
+        finally:
+            self.active -= 1
+        if request.url.host == "api.chainabuse.com":
+            return httpx.Response(200, json={"reports": []})
+        if request.url.path.endswith("/account"):
+            info, _ = GRAPH.get(address, (QUIET, []))
+            return httpx.Response(200, json=info)
+        _, senders = GRAPH.get(address, (QUIET, []))
+        return httpx.Response(200, json={"token_transfers": [{"from_address": s, "amount": "5000000"} for s in senders]})
+
+    def fetched(self) -> list[str]:
+        return sorted(
+            r.url.params.get("address") or r.url.params.get("toAddress")
+            for r in self.requests if r.url.host != "api.chainabuse.com"
+        )
+
+
+@pytest.fixture
+def tronscan(monkeypatch, backend):
+    fake = TronScan()
+    prev = http_client._pool
+    http_client.set_pool(AsyncClientPool(transport=httpx.MockTransport(fake)))
+    monkeypatch.setattr(aml_checker, "aml_cache", TieredAmlCache(backend, flush_interval=60))
+    # Set directly: reading a missing setting would load .env.
+    monkeypatch.setitem(vars(config), "enable_chainabuse", False)
+    monkeypatch.setitem(vars(config), "chainabuse_api_key", "")
+    aml_checker._inflight.clear()
+    yield fake
+    http_client.set_pool(prev)
+
+
+def _fresh_cache(monkeypatch, backend):
+    backend.data.clear()
+    monkeypatch.setattr(aml_checker, "aml_cache", TieredAmlCache(backend, flush_interval=60))
+
+
+def _comparable(result: dict) -> dict:
+    return {k: v for k, v in result.items() if k != "checked_at"}
+
+
+def test_preload_fetches_concurrently(tronscan, monkeypatch):
+    monkeypatch.setitem(vars(config), "enable_chainabuse", True)
+    monkeypatch.setitem(vars(config), "chainabuse_api_key", "key")
+    tronscan.delays["R3"] = 0.05
+    ctx = aml_checker.AmlContext("tron", "R3")
+    asyncio.run(ctx.preload())
+    assert ctx.account_info == RISKY and ctx.trc20_transfers == [] and ctx.chainabuse_reports == []
+    # Account, transfers and Chainabuse were in flight together.
+    assert len(tronscan.requests) == 3 and tronscan.peak == 3
+    abuse = [r for r in tronscan.requests if r.url.host == "api.chainabuse.com"]
+    assert abuse[0].headers["X-API-Key"] == "key"
+
+
+def test_concurrent_preloads_share_one_fetch(tronscan):
+    tronscan.delays["S3"] = 0.05
+
+    async def run():
+        first, second, third = (aml_checker.AmlContext("tron", "S3") for _ in range(3))
+        cancelled = asyncio.ensure_future(third.preload())
+        await asyncio.sleep(0.01)
+        # A waiter going away does not cancel the fetch the others await.
+        cancelled.cancel()
+        await asyncio.gather(first.preload(), second.preload())
+        return first, second, cancelled
+
+    first, second, cancelled = asyncio.run(run())
+    assert cancelled.cancelled()
+    assert first.trc20_transfers == second.trc20_transfers == [{"from_address": s, "amount": "5000000"}
+                                                               for s in ["L1", "L2"]]
+    assert tronscan.fetched() == ["S3", "S3"]
+    assert aml_checker._inflight == {}
+
+
+def test_chainabuse_skipped_when_disabled(tronscan, monkeypatch):
+    assert tron_config["chainabuse"]["enabled"]
+    assert not aml_checker._chainabuse_enabled() and aml_checker._preload_calls() == 2
+    monkeypatch.setitem(vars(config), "enable_chainabuse", True)
+    # Switched on but without a key: still nothing to call.
+    assert not aml_checker._chainabuse_enabled() and aml_checker._preload_calls() == 2
+    asyncio.run(aml_checker.AmlContext("tron", "R3").preload())
+    assert all(r.url.host != "api.chainabuse.com" for r in tronscan.requests)
+
+    monkeypatch.setitem(vars(config), "chainabuse_api_key", "key")
+    assert aml_checker._preload_calls() == 3
+    monkeypatch.setitem(tron_config["chainabuse"], "enabled", False)
+    assert aml_checker._preload_calls() == 2
+    tronscan.requests.clear()
+    asyncio.run(aml_checker.AmlContext("tron", "R1").preload())
+    assert all(r.url.host != "api.chainabuse.com" for r in tronscan.requests)
+
+
+def test_check_address_scores_sender_graph(tronscan):
+    result = asyncio.run(aml_checker.check_address("R1"))
+    assert result["status"] == "safe" and result["flags"] == ["senders_with_risk"]
+    # Every address is fetched once: two calls each, chainabuse off.
+    assert tronscan.fetched() == sorted(2 * ["R1", "S1", "S3", "L1", "L2"])
+    assert aml_checker.aml_cache.get("tron", "S3")["flags"] == ["large_balance", "senders_with_risk"]
+
+
+def test_concurrent_checks_fetch_once(tronscan):
+    tronscan.delays["R1"] = 0.05
+
+    async def run():
+        return await asyncio.gather(*(aml_checker.check_address("R1") for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert all(r["flags"] == ["senders_with_risk"] for r in results)
+    assert tronscan.fetched() == sorted(2 * ["R1", "S1", "S3", "L1", "L2"])
+
+
+def test_budget_skips_senders_it_cannot_afford(tronscan, monkeypatch):
+    monkeypatch.setitem(tron_config["check_senders_aml"], "max_upstream_calls", 4)
+    result = asyncio.run(aml_checker.check_address("R1"))
+    assert result["status"] == "safe" and "senders_with_risk" not in result["flags"]
+    assert len(tronscan.requests) == 4
+
+
+def test_exhausted_budget_is_an_error_kept_in_memory(tronscan, monkeypatch, backend):
+    monkeypatch.setitem(tron_config["check_senders_aml"], "max_upstream_calls", 1)
+    result = asyncio.run(aml_checker.check_address("R3"))
+    assert result["status"] == "error" and result["flags"][0] == "aml_check_error"
+    assert tronscan.requests == []
+    assert aml_checker.aml_cache.get("tron", "R3")["status"] == "error"
+    aml_checker.aml_cache.flush()
+    assert backend.data == {}
+
+
+def test_exhausted_budget_raises_for_senders(tronscan):
+    with pytest.raises(aml_checker.BudgetExhausted):
+        asyncio.run(aml_checker.check_address("S1", current_depth=1, budget=aml_checker.CallBudget(0)))
+    assert tronscan.requests == []
+    assert aml_checker.aml_cache.get("tron", "S1") is None
+
+
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+def test_sender_checks_stop_at_threshold(tronscan):
+    assert tron_config["check_senders_aml"]["min_suspicious_senders"] == 2
+    tronscan.delays["Z1"] = 5
+    started = time.monotonic()
+    context = {}
+    result = asyncio.run(aml_checker.check_address("R4", context=context))
+    assert time.monotonic() - started < 2
+    assert result["flags"] == ["senders_with_risk"]
+    # The slow sender was cancelled before it had a result.
+    assert "Z1" not in context and aml_checker.aml_cache.get("tron", "Z1") is None
+    assert set(context) == {"R4", "S1", "S4"}
+
+
+class SpyCache(TieredAmlCache):
+    """Records the addresses of every ``get_many`` and ``set_many`` call."""
+
+    def __init__(self, backend):
+        super().__init__(backend, flush_interval=60)
+        self.reads: list[list[str]] = []
+        self.writes: list[list[str]] = []
+
+    def get_many(self, network, addresses, ttl=None):
+        self.reads.append(list(addresses))
+        return super().get_many(network, addresses, ttl)
+
+    def set_many(self, network, records):
+        records = list(records)
+        self.writes.append([address for address, _ in records])
+        super().set_many(network, records)
+
+
+def _collect(roots: list[str]) -> list[tuple[str, dict]]:
+    async def run():
+        return [item async for item in aml_checker.check_addresses(roots)]
+
+    return asyncio.run(run())
+
+
+def test_check_addresses_matches_check_address(tronscan, monkeypatch, backend):
+    roots = ["R1", "R2", "R3"]
+    expected = {}
+    for address in roots:
+        _fresh_cache(monkeypatch, backend)
+        expected[address] = _comparable(asyncio.run(aml_checker.check_address(address)))
+
+    _fresh_cache(monkeypatch, backend)
+    tronscan.requests.clear()
+    got = _collect(roots + ["R1"])
+    assert sorted(a for a, _ in got) == roots
+    assert {a: _comparable(r) for a, r in got} == expected
+    aml_checker.aml_cache.flush()
+    assert {a for _, a in backend.data} >= set(expected)
+
+
+def test_check_addresses_yields_in_level_order(tronscan):
+    # R1 waits for senders two levels down; R3 has none and is final first.
+    got = _collect(["R1", "R3"])
+    assert [a for a, _ in got] == ["R3", "R1"]
+
+
+def test_shared_senders_are_fetched_once(tronscan):
+    got = dict(_collect(["R1", "R2"]))
+    assert got["R1"]["flags"] == got["R2"]["flags"] == ["senders_with_risk"]
+    # S3 is a sender of both roots; it and its senders are fetched once.
+    assert tronscan.fetched() == sorted(2 * ["R1", "R2", "S1", "S3", "S4", "L1", "L2"])
+
+
+def test_cache_is_read_and_written_once_per_level(tronscan, monkeypatch, backend):
+    cache = SpyCache(backend)
+    monkeypatch.setattr(aml_checker, "aml_cache", cache)
+    _collect(["R1", "R2", "R3"])
+    assert cache.reads == [["R1", "R2", "R3"], ["S1", "S3", "S4"], ["L1", "L2"]]
+    assert [sorted(batch) for batch in cache.writes] == [["R3"], ["S1", "S4"], ["L1", "L2", "R1", "R2", "S3"]]
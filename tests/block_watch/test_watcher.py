@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from paychain.adapters import eth_rpc
+from paychain.core import transport
+from paychain.features.block_watch.api import BlockWatcher
+from paychain.testing.block_nodes import StubBtcBlocks, StubEthBlocks, StubTronBlocks
+from paychain.testing.eth_node import TOKENS
+
+# Addresses that never appear on the stub chains, to make the watch set large.
+NOISE = 20_000
+
+
+@pytest.fixture
+def use():
+    prev = []
+
+    def install(stub):
+        prev.append(transport.set_transport(stub))
+        return stub
+
+    yield install
+    if prev:
+        transport.set_transport(prev[0])
+
+
+def _expected(stub, watched, lo, hi):
+    """Brute force: ``(tx_id, address, direction, amount)`` for every watched party."""
+    out = []
+    for block, tx_id, src, dst, amount, asset, _ in stub.transfers:
+        if not lo <= block <= hi:
+            continue
+        if dst in watched:
+            out.append((tx_id, dst, "incoming", amount))
+        if src in watched and src != dst:
+            out.append((tx_id, src, "outgoing", amount))
+    return out
+
+
+def _got(records):
+    return [(tx.tx_id, tx.meta["address"], tx.meta["direction"], tx.amount_raw) for tx in records]
+
+
+def test_eth_scan_matches_brute_force(use):
+    stub = use(StubEthBlocks(head=200))
+    eth_rpc._token_cache.clear()
+    watched = set(stub.pool[::3])
+    noise = [f"0x{0xdead0000 + i:040x}" for i in range(NOISE)]
+    watcher = BlockWatcher("ETH", list(watched) + noise, rpc_url="http://eth.test")
+    got = watcher.scan(50, 149)
+    assert sorted(_got(got)) == sorted(_expected(stub, watched, 50, 149))
+    assert [tx.block_height for tx in got] == sorted(tx.block_height for tx in got)
+    failed = {tx.tx_id for tx in got if tx.status == "failed"}
+    assert failed == {t[1] for t in stub.transfers if 50 <= t[0] <= 149 and not t[6]
+                      and (t[2] in watched or t[3] in watched)}
+    tokens = [tx for tx in got if tx.meta["kind"] == "erc20"]
+    assert tokens and all((tx.asset, tx.amount_decimals) == TOKENS[tx.meta["contract"]] for tx in tokens)
+    # One block and one getLogs call per block; receipts only for native hits.
+    assert stub.calls["eth_getBlockByNumber"] == stub.calls["eth_getLogs"] == 100
+    assert stub.calls["eth_getTransactionReceipt"] == len({tx.tx_id for tx in got if tx.meta["kind"] == "native"})
+
+
+def test_eth_poll_follows_head_with_confirmations(use):
+    stub = use(StubEthBlocks(head=100))
+    watched = set(stub.pool[:10])
+    watcher = BlockWatcher("eth", watched, rpc_url="http://eth.test", confirmations=5)
+    assert watcher.poll() == []
+    assert watcher.next_block == 96
+    stub.head = 130
+    first = watcher.poll(max_blocks=20)
+    second = watcher.poll()
+    assert watcher.next_block == 126
+    assert sorted(_got(first + second)) == sorted(_expected(stub, watched, 96, 125))
+    assert watcher.poll() == []
+
+
+def test_watch_set_changes(use):
+    stub = use(StubEthBlocks(head=50))
+    address = stub.pool[3]
+    watcher = BlockWatcher("ETH", [address.upper().replace("0X", "0x")], rpc_url="http://eth.test")
+    assert address in watcher and len(watcher) == 1
+    assert {tx.meta["address"] for tx in watcher.scan(0, 50)} == {address}
+    watcher.unwatch([address])
+    assert watcher.scan(0, 50) == []
+
+
+def test_tron_scan_decodes_trx_and_trc20(use):
+    stub = use(StubTronBlocks(head=400))
+    watched = set(stub.pool[1::4])
+    watcher = BlockWatcher("TRX", watched, rpc_url="http://tron.test")
+    got = watcher.scan(100, 399)
+    assert sorted(_got(got)) == sorted(_expected(stub, watched, 100, 399))
+    by_kind = {tx.meta["kind"]: tx for tx in got}
+    assert (by_kind["trx"].asset, by_kind["trx"].amount_decimals) == ("TRX", 6)
+    assert (by_kind["trc20"].asset, by_kind["trc20"].amount_decimals) == ("USDT", 6)
+    assert by_kind["trc20"].meta["contract"] == "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+    assert {tx.tx_id for tx in got if tx.status == "failed"} == {
+        t[1] for t in stub.transfers if 100 <= t[0] <= 399 and not t[6] and (t[2] in watched or t[3] in watched)
+    }
+    # 300 blocks in ranges of 50.
+    assert stub.calls["getblockbylimitnext"] == 6
+
+
+def test_btc_scan_reports_net_amounts(use):
+    stub = use(StubBtcBlocks(head=60))
+    watched = set(stub.pool[::2])
+    watcher = BlockWatcher("BTC", watched, rpc_url="http://btc.test")
+    got = watcher.scan(10, 59)
+    expected = []
+    for block, txid, src, dst, amount, _, fee in stub.transfers:
+        if not 10 <= block <= 59:
+            continue
+        if src in watched:
+            # Change goes back to the sender; the fee leaves with the payment.
+            expected.append((txid, src, "outgoing", (amount if src != dst else 0) + fee))
+        if dst in watched and dst != src:
+            expected.append((txid, dst, "incoming", amount))
+    assert sorted(_got(got)) == sorted(expected)
+    assert all(tx.amount_decimals == 8 and tx.asset == "BTC" for tx in got)
+
+
+def test_btc_needs_rpc_url():
+    with pytest.raises(ValueError):
+        BlockWatcher("BTC", ["bc1qx"])
+
+
+def test_unsupported_chain():
+    with pytest.raises(ValueError):
+        BlockWatcher("SOL", [])
+
+
+def test_async_poll_matches_sync(use):
+    stub = use(StubEthBlocks(head=80))
+    eth_rpc._token_cache.clear()
+    watched = set(stub.pool[::4])
+    sync = BlockWatcher("ETH", watched, rpc_url="http://eth.test", start_block=20, confirmations=0)
+    aio = BlockWatcher("ETH", watched, rpc_url="http://eth.test", start_block=20, confirmations=0)
+    expected = sync.poll()
+    got = asyncio.run(aio.apoll())
+    assert _got(got) == _got(expected) and aio.next_block == sync.next_block == 81
+
+    tron = use(StubTronBlocks(head=120))
+    watched = set(tron.pool[::5])
+    got = asyncio.run(BlockWatcher("TRON", watched, rpc_url="http://tron.test").ascan(0, 120))
+    assert sorted(_got(got)) == sorted(_expected(tron, watched, 0, 120))
@@ -4,3 +4,16 @@ import sys
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _sol_account_index():
+    """Keep the persistent SOL token-account index out of ``data/``."""
+    from paychain.adapters import sol_accounts
+
+    prev = sol_accounts.set_index(sol_accounts.TokenAccountIndex(":memory:"))
+    yield
+    sol_accounts.set_index(prev)
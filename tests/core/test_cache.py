@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+import time
+
+from paychain.core.cache import CacheTransport, cache_key, is_immutable
+from paychain.core.transport import Request, Response, Transport
+
+
+class Slow(Transport):
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def send(self, req):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return Response(200, {}, b'{"n": %d}' % self.calls, req.url)
+
+
+def test_key_ignores_api_key():
+    a = Request("GET", "https://api.etherscan.io/api", params={"address": "0x1", "apikey": "A"})
+    b = Request("GET", "https://api.etherscan.io/api", params={"apikey": "B", "address": "0x1"})
+    c = Request("GET", "https://api.etherscan.io/api", params={"address": "0x2"})
+    assert cache_key(a) == cache_key(b) != cache_key(c)
+    assert cache_key(Request("POST", "https://rpc.test/?api-key=x", json={"m": 1})) == \
+        cache_key(Request("POST", "https://rpc.test/?api-key=y", json={"m": 1}))
+
+
+def test_tip_vs_immutable():
+    assert not is_immutable(Request("GET", "https://blockstream.info/api/address/a/txs"))
+    assert is_immutable(Request("GET", "https://blockstream.info/api/address/a/txs/chain/ff"))
+    assert is_immutable(Request("GET", "https://api.trongrid.io/v1/x", params={"fingerprint": "f"}))
+    assert is_immutable(Request("POST", "https://sol", json=[{"method": "getTransaction", "params": []}]))
+    assert not is_immutable(Request("POST", "https://sol", json={"method": "getSignaturesForAddress",
+                                                                 "params": ["a", {"limit": 5}]}))
+
+
+def test_memory_ttl_and_disk_tier(tmp_path):
+    inner = Slow(delay=0)
+    t = CacheTransport(inner, tip_ttl=0.05, disk_path=str(tmp_path / "c.sqlite"))
+    tip = Request("GET", "https://blockstream.info/api/address/a/txs")
+    old = Request("GET", "https://blockstream.info/api/address/a/txs/chain/ff")
+    assert t.send(tip).json() == t.send(tip).json()
+    t.send(old)
+    assert inner.calls == 2
+    time.sleep(0.06)
+    t.send(tip)
+    assert inner.calls == 3
+    # A fresh transport on the same disk file serves the immutable page.
+    t2 = CacheTransport(Slow(delay=0), disk_path=str(tmp_path / "c.sqlite"))
+    assert t2.send(old).json() == {"n": 2}
+    assert t2.inner.calls == 0
+    t.close()
+    t2.close()
+
+
+def test_inflight_coalescing_threads_and_tasks():
+    inner = Slow()
+    t = CacheTransport(inner, tip_ttl=0)
+    req = Request("GET", "https://tonapi.io/v2/accounts/a/events")
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(t.send(req))) for _ in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert inner.calls == 1 and len(out) == 8
+
+    async def run():
+        return await asyncio.gather(*(t.asend(req) for _ in range(8)))
+
+    assert len(asyncio.run(run())) == 8
+    assert inner.calls == 2
+
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    class Sleepy(Transport):
+        def __init__(self):
+            self.calls = 0
+
+        def send(self, req):
+            self.calls += 1
+            n = self.calls
+            time.sleep(0.05)
+            if n == 1:
+                raise KeyboardInterrupt
+            return Response(200, {}, b'{"n": %d}' % n, req.url)
+
+        async def asend(self, req):
+            self.calls += 1
+            await asyncio.sleep(0.05)
+            return Response(200, {}, b'{"n": %d}' % self.calls, req.url)
+
+    inner = Sleepy()
+    t = CacheTransport(inner, tip_ttl=0)
+    req = Request("GET", "https://tonapi.io/v2/accounts/a/events")
+
+    async def run():
+        owner = asyncio.ensure_future(t.asend(req))
+        await asyncio.sleep(0)
+        waiters = asyncio.gather(*(t.asend(req) for _ in range(3)))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return owner, await waiters
+
+    owner, got = asyncio.run(run())
+    assert owner.cancelled()
+    # The first waiter re-sends; the others join it.
+    assert [r.json()["n"] for r in got] == [2, 2, 2] and inner.calls == 2
+
+    inner.calls = 0
+    out = []
+
+    def interrupted():
+        try:
+            t.send(req)
+        except KeyboardInterrupt:
+            out.append("interrupted")
+
+    first = threading.Thread(target=interrupted)
+    first.start()
+    time.sleep(0.01)
+    second = threading.Thread(target=lambda: out.append(t.send(req).json()["n"]))
+    second.start()
+    first.join()
+    second.join()
+    assert sorted(out, key=str) == [2, "interrupted"] and inner.calls == 2
+
+
+def test_tags_and_null_results_are_not_immutable():
+    block = {"method": "eth_getBlockByNumber", "params": ["latest", False]}
+    assert not is_immutable(Request("POST", "https://eth", json=block))
+    assert is_immutable(Request("POST", "https://eth", json={**block, "params": ["0x10", False]}))
+
+    class Rpc(Transport):
+        def __init__(self):
+            self.calls = 0
+
+        def send(self, req):
+            self.calls += 1
+            result = None if self.calls == 1 else {"status": "0x1"}
+            return Response(200, {}, json.dumps({"jsonrpc": "2.0", "id": 1, "result": result}).encode(), req.url)
+
+    inner = Rpc()
+    t = CacheTransport(inner, tip_ttl=0)
+    receipt = Request("POST", "https://eth", json={"method": "eth_getTransactionReceipt", "params": ["0xab"]})
+    # Not mined yet: the null answer is not kept.
+    assert t.send(receipt).json()["result"] is None
+    assert t.send(receipt).json()["result"] == {"status": "0x1"}
+    assert t.send(receipt).json()["result"] == {"status": "0x1"}
+    assert inner.calls == 2
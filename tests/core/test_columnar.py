@@ -0,0 +1,66 @@
+import sys
+
+import pytest
+
+from paychain.core.columnar import BIG_AMOUNT, NULL, TxBatch
+from paychain.core.types import CompactTxRecord, TxPage, TxRecord
+
+
+def _records(n):
+    return [
+        TxRecord(
+            chain="ETH", tx_id=f"0x{i:x}", ts=1700000000 + i if i % 7 else None,
+            block_height=100 + i, from_addr="0xaa", to_addr=f"0x{i % 3}",
+            amount_raw=(10 ** 20 if i == 5 else i), amount_decimals=18,
+            asset="ETH" if i % 2 else "USDT", status="confirmed",
+            meta={"i": i} if i == 3 else None,
+        )
+        for i in range(n)
+    ]
+
+
+def test_roundtrip():
+    recs = _records(20)
+    batch = TxBatch.from_page(TxPage(items=recs, next_cursor="c"))
+    assert len(batch) == 20
+    assert batch.to_page() == TxPage(items=recs, next_cursor="c")
+    assert batch[5].amount_raw == 10 ** 20
+    assert batch.amount_raw[5] == BIG_AMOUNT
+    assert batch.ts[0] == NULL and batch[0].ts is None
+    assert batch.categories("asset") == ["USDT", "ETH"]
+    assert batch[-1].tx_id == "0x13"
+
+
+def test_compact_record_is_slotted_and_frozen():
+    rec = CompactTxRecord.from_record(_records(1)[0])
+    assert not hasattr(rec, "__dict__")
+    with pytest.raises(AttributeError):
+        rec.status = "failed"
+    assert rec.to_record() == _records(1)[0]
+    assert sys.getsizeof(rec) < sys.getsizeof(_records(1)[0].__dict__)
+
+
+def test_buffers_are_zero_copy():
+    batch = TxBatch(_records(4))
+    view = batch.buffers()["block_height"]
+    assert view.format == "q" and view.tolist() == [100, 101, 102, 103]
+    batch.block_height[0] = 7
+    assert view[0] == 7
+    view.release()
+
+
+def test_to_numpy():
+    np = pytest.importorskip("numpy")
+    batch = TxBatch(_records(10))
+    cols = batch.to_numpy()
+    assert cols["block_height"].dtype == np.int64
+    assert np.shares_memory(cols["block_height"], np.frombuffer(batch.block_height, dtype="q"))
+    assert int(cols["amount_raw"][:5].sum()) == 10
+
+
+def test_to_arrow():
+    pa = pytest.importorskip("pyarrow")
+    table = TxBatch(_records(10)).to_arrow()
+    assert table.num_rows == 10
+    assert table.column("ts").null_count == 2
+    assert table.column("asset").to_pylist()[:2] == ["USDT", "ETH"]
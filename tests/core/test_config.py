@@ -0,0 +1,24 @@
+from paychain.core import config as config_module
+
+
+def test_config_reads_environment_lazily(monkeypatch):
+    calls = []
+    monkeypatch.setattr(config_module, "load_env", lambda: calls.append(1))
+    cfg = config_module.PaychainConfig()
+    assert calls == []
+    monkeypatch.setenv("CHAINABUSE_API_KEY", " key ")
+    assert cfg.chainabuse_api_key == "key"
+    assert cfg.enable_chainabuse
+    assert calls == [1]
+    assert not cfg.is_blocked_address("T1")
+
+
+def test_values_set_before_first_read_are_kept(monkeypatch):
+    monkeypatch.setattr(config_module, "load_env", lambda: None)
+    monkeypatch.setenv("CHAINABUSE_API_KEY", "key")
+    monkeypatch.setenv("SEED_MNEMONIC", "seed words")
+    cfg = config_module.PaychainConfig()
+    cfg.enable_chainabuse = False
+    assert cfg.mnemonic == "seed words"
+    assert cfg.enable_chainabuse is False
+    assert cfg.chainabuse_api_key == "key"
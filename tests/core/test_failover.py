@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from paychain.core import failover
+from paychain.core.failover import FailoverTransport
+from paychain.core.transport import Request, Response, Transport, host_of
+
+PRIMARY = "https://primary.test/api"
+SECONDARY = "https://secondary.test/api"
+
+
+class Hosts(Transport):
+    """Per-host behaviour: "ok", "down", "500" or a delay in seconds."""
+
+    def __init__(self, **behaviour):
+        self.behaviour = behaviour
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _reply(self, req):
+        host = host_of(req.url).split(".")[0]
+        with self._lock:
+            self.calls.append(host)
+        mode = self.behaviour.get(host, "ok")
+        if mode == "down":
+            raise requests.ConnectionError(host)
+        if mode == "500":
+            return 0, Response(500, {}, b"", req.url)
+        delay = mode if isinstance(mode, float) else 0.0
+        return delay, Response(200, {}, json.dumps({"host": host}).encode(), req.url)
+
+    def send(self, req):
+        delay, resp = self._reply(req)
+        time.sleep(delay)
+        return resp
+
+    async def asend(self, req):
+        delay, resp = self._reply(req)
+        await asyncio.sleep(delay)
+        return resp
+
+
+def _get(t, path="/x"):
+    return t.send(Request("GET", PRIMARY + path)).json()["host"]
+
+
+def test_primary_used_and_path_preserved():
+    hosts = Hosts()
+    t = FailoverTransport(hosts, [[PRIMARY, SECONDARY]])
+    assert _get(t) == "primary"
+    resp = t.send(Request("GET", SECONDARY + "/address/a/txs"))
+    assert resp.url.endswith("/api/address/a/txs")
+    # Unrelated URLs pass straight through.
+    assert t.send(Request("GET", "https://other.test/y")).json()["host"] == "other"
+
+
+def test_primary_stays_first_after_success():
+    hosts = Hosts()
+    t = FailoverTransport(hosts, [[PRIMARY, SECONDARY]])
+    assert [_get(t) for _ in range(5)] == ["primary"] * 5
+    assert hosts.calls == ["primary"] * 5
+
+
+def test_scores_rank_once_every_endpoint_is_measured():
+    t = FailoverTransport(Hosts(), [[PRIMARY, SECONDARY]])
+    primary, secondary = t.groups[0]
+    for _ in range(failover.MIN_SAMPLES):
+        primary.record(True, 0.2, t.failure_threshold, t.cooldown)
+        secondary.record(True, 0.05, t.failure_threshold, t.cooldown)
+    assert _get(t) == "secondary"
+
+
+def test_fails_over_and_opens_circuit():
+    hosts = Hosts(primary="down")
+    t = FailoverTransport(hosts, [[PRIMARY, SECONDARY]], failure_threshold=2, cooldown=60)
+    assert [_get(t) for _ in range(4)] == ["secondary"] * 4
+    # Two failures opened the primary's circuit; later calls skip it.
+    assert hosts.calls.count("primary") == 2
+
+
+def test_half_open_trial_closes_circuit():
+    hosts = Hosts(primary="500")
+    t = FailoverTransport(hosts, [[PRIMARY, SECONDARY]], failure_threshold=1, cooldown=0.05)
+    assert _get(t) == "secondary"
+    primary = t.groups[0][0]
+    assert primary.is_open
+    hosts.behaviour["primary"] = "ok"
+    time.sleep(0.06)
+    _get(t)
+    assert not primary.is_open and primary.failures == 0
+
+
+def test_all_down_raises_last_error():
+    t = FailoverTransport(Hosts(primary="down", secondary="down"), [[PRIMARY, SECONDARY]])
+    with pytest.raises(requests.ConnectionError):
+        _get(t)
+
+
+def test_hedge_takes_faster_secondary():
+    hosts = Hosts(primary=0.5)
+    t = FailoverTransport(hosts, [[PRIMARY, SECONDARY]], hedge=True, hedge_delay=0.02)
+    start = time.monotonic()
+    assert _get(t) == "secondary"
+    assert time.monotonic() - start < 0.3
+    t.close()
+
+
+def test_hedge_not_sent_when_primary_fast():
+    hosts = Hosts()
+    t = FailoverTransport(hosts, [[PRIMARY, SECONDARY]], hedge=True, hedge_delay=0.5)
+    assert _get(t) == "primary"
+    assert hosts.calls == ["primary"]
+    t.close()
+
+
+def test_async_hedge_and_failover():
+    async def run():
+        hosts = Hosts(primary=0.5)
+        t = FailoverTransport(hosts, [[PRIMARY, SECONDARY]], hedge=True, hedge_delay=0.02)
+        hedged = (await t.asend(Request("GET", PRIMARY + "/x"))).json()["host"]
+        down = FailoverTransport(Hosts(primary="down"), [[PRIMARY, SECONDARY]])
+        failed_over = (await down.asend(Request("GET", PRIMARY + "/x"))).json()["host"]
+        return hedged, failed_over
+
+    assert asyncio.run(run()) == ("secondary", "secondary")
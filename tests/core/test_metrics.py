@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+import requests
+
+from paychain.core import metrics, transport
+from paychain.core.metrics import InstrumentedTransport, Metrics, PrometheusMetrics, endpoint_of
+from paychain.core.transport import Request, Response, Transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import alist_transactions, iter_transactions
+from paychain.testing.synthetic import SyntheticProviders
+
+
+@pytest.fixture
+def prom():
+    m = PrometheusMetrics()
+    prev = metrics.set_metrics(m)
+    yield m
+    metrics.set_metrics(prev)
+
+
+@pytest.fixture
+def synthetic():
+    prev = transport.set_transport(InstrumentedTransport(SyntheticProviders(history=50)))
+    yield
+    transport.set_transport(prev)
+
+
+def test_endpoint_labels_are_low_cardinality():
+    btc = Request("GET", "https://blockstream.info/api/address/bc1qsomeaddress/txs/chain/" + "ab" * 32)
+    assert endpoint_of(btc) == "/api/address/{id}/txs/chain/{id}"
+    eth = Request("GET", "https://api.etherscan.io/api", params={"module": "account", "action": "tokentx"})
+    assert endpoint_of(eth) == "/api:account.tokentx"
+    rpc = Request("POST", "https://rpc.test", json=[{"method": "getTransaction"}])
+    assert endpoint_of(rpc) == "rpc-batch:getTransaction"
+
+
+def test_noop_default_passes_responses_through():
+    resp = Response(200, {}, b"{}", "u")
+
+    class Fixed(Transport):
+        def send(self, req):
+            return resp
+
+    assert isinstance(metrics.get_metrics(), Metrics) and not metrics.get_metrics().enabled
+    assert InstrumentedTransport(Fixed()).send(Request("GET", "http://x.test/")) is resp
+
+
+def test_requests_records_and_decode_are_counted(prom, synthetic):
+    q = TxQuery(address="Tabc", limit=20, rpc_url="http://tron.test")
+    assert len(list(iter_transactions("TRX", q))) == 50
+    assert prom.value("paychain_records_total", "TRON") == 50
+    assert prom.value("paychain_adapter_call_seconds", "TRON", "list") == 3
+    assert prom.value("paychain_http_requests_total", "tron.test", "/v1/contracts/{id}/events", "200") == 3
+    assert prom.value("paychain_json_decode_seconds", "tron.test") == 3
+
+    text = prom.render()
+    assert "# TYPE paychain_http_request_seconds histogram" in text
+    assert 'paychain_records_total{chain="TRON"} 50' in text
+    assert 'paychain_http_request_seconds_bucket{provider="tron.test",endpoint="/v1/contracts/{id}/events",le="+Inf"} 3' in text
+
+
+def test_async_calls_are_counted(prom, synthetic):
+    q = TxQuery(address="0:abc", limit=10, rpc_url="http://ton.test/v2")
+    page = asyncio.run(alist_transactions("TON", q))
+    assert prom.value("paychain_records_total", "TON") == len(page.items) == 10
+    assert prom.value("paychain_adapter_call_seconds", "TON", "alist") == 1
+
+
+def test_errors_and_throttles(prom):
+    class Flaky(Transport):
+        def __init__(self):
+            self.calls = 0
+
+        def send(self, req):
+            self.calls += 1
+            if self.calls == 1:
+                raise requests.ConnectionError("down")
+            if self.calls == 2:
+                return Response(429, {"Retry-After": "1"}, b"", req.url)
+            return Response(503, {}, b"", req.url)
+
+    t = InstrumentedTransport(Flaky())
+    req = Request("GET", "http://p.test/x")
+    with pytest.raises(requests.ConnectionError):
+        t.send(req)
+    t.send(req)
+    t.send(req)
+    assert prom.value("paychain_http_errors_total", "p.test", "/x", "ConnectionError") == 1
+    assert prom.value("paychain_http_throttles_total", "p.test", "/x") == 1
+    assert prom.value("paychain_http_errors_total", "p.test", "/x", "http_503") == 1
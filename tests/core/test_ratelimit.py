@@ -0,0 +1,81 @@
+import asyncio
+import json
+import threading
+import time
+
+from paychain.core.ratelimit import RateLimiter, RateLimitTransport, TokenBucket, throttle_pause
+from paychain.core.transport import Request, Response, Transport
+
+
+def test_bucket_spaces_reservations():
+    bucket = TokenBucket(rate=10.0, burst=2.0)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[0] == 0 and waits[1] == 0
+    assert 0.05 < waits[2] <= 0.1
+    assert 0.25 < waits[4] <= 0.3
+
+
+def test_pause_blocks_bucket():
+    bucket = TokenBucket(rate=100.0, burst=100.0)
+    bucket.pause(0.5)
+    assert bucket.reserve() >= 0.49
+
+
+def test_etherscan_throttle_detected():
+    body = json.dumps({"status": "0", "message": "NOTOK", "result": "Max rate limit reached"}).encode()
+    assert throttle_pause("api.etherscan.io", Response(200, {}, body, "u")) == 1.0
+    ok = json.dumps({"status": "1", "result": []}).encode()
+    assert throttle_pause("api.etherscan.io", Response(200, {}, ok, "u")) is None
+    assert throttle_pause("x", Response(429, {"Retry-After": "3"}, b"", "u")) == 3.0
+
+
+def test_limiter_keys_buckets_by_host_and_key():
+    limiter = RateLimiter()
+    a = limiter.bucket("api.etherscan.io", "k1")
+    assert limiter.bucket("api.etherscan.io", "k1") is a
+    assert limiter.bucket("api.etherscan.io", "k2") is not a
+    assert limiter.bucket("api.etherscan.io", None).rate < a.rate
+    assert limiter.bucket("unknown.host") is None
+
+
+class Counting(Transport):
+    def __init__(self, throttle_first=0):
+        self.stamps = []
+        self.throttle_first = throttle_first
+        self.lock = threading.Lock()
+
+    def send(self, req):
+        with self.lock:
+            self.stamps.append(time.monotonic())
+            if self.throttle_first:
+                self.throttle_first -= 1
+                return Response(429, {"Retry-After": "0.1"}, b"", req.url)
+        return Response(200, {}, b"{}", req.url)
+
+
+def test_budget_shared_across_threads_and_tasks():
+    inner = Counting()
+    t = RateLimitTransport(inner, RateLimiter(limits={"p.test": (50.0, 1.0)}, keyless_limits={}))
+    req = Request("GET", "http://p.test/x")
+    threads = [threading.Thread(target=t.send, args=(req,)) for _ in range(5)]
+
+    async def tasks():
+        await asyncio.gather(*(t.asend(req) for _ in range(5)))
+
+    start = time.monotonic()
+    for th in threads:
+        th.start()
+    asyncio.run(tasks())
+    for th in threads:
+        th.join()
+    # 10 requests at 50/s with burst 1 take at least ~0.18s in total.
+    assert len(inner.stamps) == 10
+    assert time.monotonic() - start >= 0.17
+
+
+def test_retry_after_pauses_and_retries():
+    inner = Counting(throttle_first=1)
+    t = RateLimitTransport(inner, RateLimiter(limits={"p.test": (100.0, 5.0)}, keyless_limits={}))
+    resp = t.send(Request("GET", "http://p.test/x"))
+    assert resp.status_code == 200
+    assert inner.stamps[1] - inner.stamps[0] >= 0.09
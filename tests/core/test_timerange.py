@@ -0,0 +1,67 @@
+import random
+from bisect import bisect_left
+
+import pytest
+
+from paychain.core.timerange import BlockIndex, newer, older
+from paychain.core.types import TxQuery
+
+
+def _drive(search, times):
+    probes = 0
+    try:
+        height = next(search)
+        while True:
+            probes += 1
+            height = search.send(times[height])
+    except StopIteration as stop:
+        return stop.value, probes
+
+
+def _chain(n=300_000, seed=7):
+    # ~12 s blocks with jitter and a few long gaps.
+    rnd = random.Random(seed)
+    times, t = [], 1_500_000_000
+    for i in range(n):
+        t += rnd.randint(12, 14) if i % 50_000 else 3600
+        times.append(t)
+    return times
+
+
+TIMES = _chain()
+
+
+@pytest.mark.parametrize("offset", [-10, 0, 1, 5, 123_456, 299_999, 1_000_000])
+def test_first_at_matches_bisect(offset):
+    times = TIMES
+    target = times[0] + offset * 12
+    expected = bisect_left(times, target)
+    found, probes = _drive(BlockIndex().first_at(target, 0, len(times) - 1), times)
+    assert found == expected
+    assert probes <= 25
+
+
+def test_samples_make_repeat_lookups_free():
+    times = TIMES
+    index = BlockIndex()
+    target = times[200_000] + 5
+    first, probes = _drive(index.first_at(target, 0, len(times) - 1), times)
+    again, repeat_probes = _drive(index.first_at(target, 0, len(times) - 1), times)
+    assert first == again and repeat_probes == 0 < probes
+    # A nearby timestamp starts from the tight bracket already known.
+    _, near = _drive(index.first_at(target + 600, 0, len(times) - 1), times)
+    assert near < probes
+
+
+def test_sample_limit():
+    index = BlockIndex(max_samples=8)
+    for h in range(100):
+        index.add(h, h * 10)
+    assert len(index) <= 8
+
+
+def test_window_predicates():
+    q = TxQuery(address="x", since_ts=100, until_ts=200)
+    assert older(q, 99) and not older(q, 100) and not older(q, None)
+    assert newer(q, 201) and not newer(q, 200)
+    assert not older(TxQuery(address="x"), 1)
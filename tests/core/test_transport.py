@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+import requests
+
+from paychain.core import transport
+from paychain.core.transport import Request, Response, RetryTransport, Transport
+
+
+class ScriptedTransport(Transport):
+    """Replays a fixed list of statuses (or exceptions)."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    def send(self, req):
+        self.calls += 1
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return Response(item, {}, b'{"ok": true}', req.url)
+
+
+def test_retry_on_5xx_and_connection_error():
+    inner = ScriptedTransport([503, requests.ConnectionError("reset"), 200])
+    t = RetryTransport(inner, retries=3, backoff=0)
+    resp = t.send(Request("GET", "https://example.test/x"))
+    assert resp.status_code == 200
+    assert inner.calls == 3
+
+
+def test_retry_gives_up_and_returns_last_response():
+    inner = ScriptedTransport([429, 429])
+    t = RetryTransport(inner, retries=1, backoff=0)
+    resp = t.send(Request("GET", "https://example.test/x"))
+    assert resp.status_code == 429
+    with pytest.raises(requests.HTTPError):
+        resp.raise_for_status()
+
+
+def test_async_retry():
+    inner = ScriptedTransport([500, 200])
+    t = RetryTransport(inner, retries=2, backoff=0)
+    resp = asyncio.run(t.asend(Request("GET", "https://example.test/x")))
+    assert resp.status_code == 200
+
+
+def test_retry_after_header():
+    assert transport.retry_after(Response(429, {"Retry-After": "2"}, b"", "u")) == 2.0
+    assert transport.retry_after(Response(429, {}, b"", "u")) is None
+
+
+def test_set_transport_routes_helpers():
+    fake = ScriptedTransport([200])
+    prev = transport.set_transport(fake)
+    try:
+        assert transport.get_json("https://example.test/x") == {"ok": True}
+    finally:
+        transport.set_transport(prev)
+    assert fake.calls == 1
+
+
+def test_session_per_host_is_reused():
+    http = transport.HttpTransport()
+    a = http.session_for("https://api.etherscan.io/api")
+    b = http.session_for("https://api.etherscan.io/api?x=1")
+    c = http.session_for("https://api.trongrid.io/v1")
+    assert a is b
+    assert a is not c
+    http.close()
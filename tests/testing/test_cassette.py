@@ -0,0 +1,89 @@
+import pytest
+
+from benchmarks import bench_adapters
+from paychain.core import transport
+from paychain.core.transport import HttpTransport, Request
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import iter_transactions, list_transactions
+from paychain.testing.cassette import Cassette, RecordingTransport, ReplayTransport
+from paychain.testing.stub_server import StubServer
+from paychain.testing.synthetic import SyntheticProviders, default_queries
+
+CHAINS = ("BTC", "ETH", "SOL", "TON", "TRON")
+
+
+@pytest.fixture
+def use_transport():
+    holder = {}
+
+    def install(t):
+        prev = transport.set_transport(t)
+        holder.setdefault("prev", prev)
+        return t
+
+    yield install
+    if "prev" in holder:
+        transport.set_transport(holder["prev"])
+
+
+def _query(chain, base):
+    return TxQuery(limit=40, rpc_url=base + bench_adapters.PATHS[chain], **default_queries()[chain])
+
+
+@pytest.mark.parametrize("chain", CHAINS)
+def test_record_save_load_replay(chain, tmp_path, use_transport):
+    q = _query(chain, "http://synthetic.test")
+    recorder = use_transport(RecordingTransport(SyntheticProviders(history=120)))
+    recorded = [r.tx_id for r in iter_transactions(chain, q)]
+    assert len(recorded) == 120
+    assert len(set(recorded)) == 120
+
+    path = tmp_path / "cassette.json"
+    recorder.cassette.save(str(path))
+    use_transport(ReplayTransport(Cassette.load(str(path))))
+    assert [r.tx_id for r in iter_transactions(chain, q)] == recorded
+
+
+def test_cassette_scrubs_api_keys(tmp_path):
+    cassette = Cassette()
+    rec = RecordingTransport(SyntheticProviders(history=4), cassette)
+    req = Request("GET", "http://synthetic.test/api?apikey=secret", params={
+        "module": "account", "action": "txlist", "address": "0xabc", "apikey": "secret"})
+    rec.send(req)
+    path = tmp_path / "c.json"
+    cassette.save(str(path))
+    assert "secret" not in path.read_text()
+    # Replay matches regardless of the key used.
+    other = Request("GET", "http://synthetic.test/api", params={
+        "module": "account", "action": "txlist", "address": "0xabc", "apikey": "other"})
+    assert ReplayTransport(Cassette.load(str(path))).send(other).json()["status"] == "1"
+
+
+def test_replay_unknown_request_raises():
+    import requests
+
+    with pytest.raises(requests.ConnectionError):
+        ReplayTransport(Cassette()).send(Request("GET", "http://nowhere.test/x"))
+
+
+def test_stub_server_replays_over_http(use_transport):
+    q = _query("ETH", "https://api.etherscan.example")
+    recorder = use_transport(RecordingTransport(SyntheticProviders(history=30)))
+    expected = list_transactions("ETH", q).items
+
+    http = use_transport(HttpTransport())
+    with StubServer(ReplayTransport(recorder.cassette, ignore_host=True)) as stub:
+        page = list_transactions("ETH", _query("ETH", stub.url))
+    http.close()
+    assert page.items == expected
+
+
+def test_benchmark_smoke_and_compare():
+    results = bench_adapters.run(("TRON",), records=60, repeat=1, latency_calls=3)
+    r = results["TRON"]
+    assert r["records"] == 60
+    assert r["records_per_s"] > 0
+    assert r["latency_p95_ms"] >= r["latency_p50_ms"] > 0
+    assert bench_adapters.compare(results, results, 0.1) == []
+    slower = {"TRON": dict(r, records_per_s=r["records_per_s"] * 2)}
+    assert bench_adapters.compare(results, slower, 0.1)
@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+import pytest
+
+from paychain.core import aio, transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import alist_transactions
+
+ADDR = "0x00000000000000000000000000000000000000aa"
+API = "https://etherscan.test/api"
+
+
+def _etherscan(request: httpx.Request) -> httpx.Response:
+    assert request.url.params["action"] == "txlist"
+    return httpx.Response(200, json={"status": "1", "result": [
+        {"hash": "0x1", "timeStamp": "1700000000", "blockNumber": "10",
+         "from": "0xbb", "to": ADDR, "value": "5", "isError": "0"},
+    ]})
+
+
+@pytest.fixture
+def mock_pool():
+    prev = aio.get_pool()
+    pool = aio.AsyncClientPool(transport=httpx.MockTransport(_etherscan))
+    aio.set_pool(pool)
+    yield pool
+    aio.set_pool(prev)
+
+
+def test_alist_transactions_eth(mock_pool):
+    async def run():
+        pages = await asyncio.gather(*[
+            alist_transactions("ETH", TxQuery(address=ADDR, limit=5, rpc_url=API)) for _ in range(10)
+        ])
+        # All queries went through one pooled client for the host.
+        clients = mock_pool._clients[asyncio.get_running_loop()]
+        await transport.aclose()
+        return pages, clients
+
+    pages, clients = asyncio.run(run())
+    assert len(clients) == 1
+    for page in pages:
+        assert [tx.tx_id for tx in page.items] == ["0x1"]
+        assert page.items[0].amount_raw == 5
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from paychain.adapters import eth_rpc
+from paychain.core import transport
+from paychain.core.transport import HttpTransport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import alist_transactions, iter_pages, iter_transactions
+from paychain.testing.eth_node import TOKENS, StubEthNode
+from paychain.testing.stub_server import StubServer
+
+ADDR = "0x00000000000000000000000000000000000000aa"
+NODE = "http://node.test"
+
+
+@pytest.fixture
+def node():
+    holder = {}
+
+    def install(**kwargs):
+        fake = StubEthNode(ADDR, **kwargs)
+        holder.setdefault("prev", transport.set_transport(fake))
+        transport.set_transport(fake)
+        return fake
+
+    eth_rpc._spans.clear()
+    eth_rpc._no_batch.clear()
+    eth_rpc._time_cache.clear()
+    eth_rpc._token_cache.clear()
+    yield install
+    if "prev" in holder:
+        transport.set_transport(holder["prev"])
+
+
+def _query(**kwargs):
+    extra = {"backend": "rpc", **kwargs.pop("extra", {})}
+    return TxQuery(address=ADDR, rpc_url=kwargs.pop("rpc_url", NODE), extra=extra, **kwargs)
+
+
+def _ids(logs):
+    return [(log["transactionHash"], int(log["logIndex"], 16)) for log in logs]
+
+
+def _rec_ids(recs):
+    return [(r.tx_id, r.meta["log_index"]) for r in recs]
+
+
+@pytest.mark.parametrize("direction", ["all", "incoming", "outgoing"])
+def test_full_history_with_splitting(node, direction):
+    fake = node(max_results=20)
+    txs = list(iter_transactions("ETH", _query(limit=30, direction=direction)))
+    assert _rec_ids(txs) == _ids(fake.expected(direction))
+    usdt = next(tx for tx in txs if tx.meta["contract"] in TOKENS and TOKENS[tx.meta["contract"]][0] == "USDT")
+    assert (usdt.asset, usdt.amount_decimals) == ("USDT", 6)
+    assert all(tx.ts == 1_600_000_000 + tx.block_height * 12 for tx in txs)
+
+
+def test_range_hint_and_caches(node):
+    fake = node(max_results=10, range_hint=True)
+    pages = list(iter_pages("ETH", _query(limit=25)))
+    assert [tx for p in pages for tx in p.items] and pages[-1].next_cursor is None
+    # Two token contracts: decimals + symbol looked up once each.
+    assert fake.calls["eth_call"] == 4
+    blocks = {tx.block_height for p in pages for tx in p.items}
+    assert fake.calls["eth_getBlockByNumber"] == len(blocks)
+    # A second walk hits the block/token caches.
+    fake.calls.clear()
+    list(iter_transactions("ETH", _query(limit=25)))
+    assert fake.calls["eth_call"] == 0 and fake.calls["eth_getBlockByNumber"] == 0
+
+
+def test_token_filter_and_time_window(node):
+    fake = node()
+    token = "0x00000000000000000000000000000000000000c2"
+    expected = fake.expected(token=token)
+    since = 1_600_000_000 + int(expected[40]["blockNumber"], 16) * 12
+    until = 1_600_000_000 + int(expected[10]["blockNumber"], 16) * 12
+    txs = list(iter_transactions("ETH", _query(limit=7, token=token, since_ts=since, until_ts=until)))
+    assert _rec_ids(txs) == _ids(expected[10:41])
+
+
+def test_cursor_resumes_inside_block(node):
+    fake = node(every=1, transfers=60)
+    first = next(iter_pages("ETH", _query(limit=5)))
+    rest = list(iter_transactions("ETH", _query(limit=5, extra={"cursor": first.next_cursor})))
+    assert _rec_ids(first.items + rest) == _ids(fake.expected())
+
+
+def test_without_batch_support(node):
+    fake = node(batch=False, transfers=40)
+    txs = list(iter_transactions("ETH", _query(limit=50)))
+    assert _rec_ids(txs) == _ids(fake.expected())
+    assert NODE in eth_rpc._no_batch
+
+
+def test_async_over_stub_server(node):
+    fake = StubEthNode(ADDR, transfers=40, max_results=15)
+    node()  # restore the transport afterwards
+    transport.set_transport(HttpTransport())
+    with StubServer(fake) as server:
+        page = asyncio.run(alist_transactions("ETH", _query(limit=100, rpc_url=server.url)))
+    assert _rec_ids(page.items) == _ids(fake.expected())
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import aiter_transactions, iter_pages, iter_transactions
+
+ADDR = "0x00000000000000000000000000000000000000aa"
+
+
+def _row(i, block, **extra):
+    return {"hash": f"0x{i:04x}", "blockNumber": str(block), "timeStamp": str(1_700_000_000 + block),
+            "from": "0xbb", "to": ADDR, "value": "5", "isError": "0", **extra}
+
+
+# Streams with interleaved blocks; several rows share a block.
+STREAMS = {
+    "txlist": [_row(i, 1000 - i) for i in range(0, 30, 2)],
+    "txlistinternal": [_row(1000 + i, 1000 - i, traceId=f"0_{i}") for i in range(1, 30, 3)],
+    "tokentx": [_row(2000 + i, 1000 - i // 2, logIndex=str(i), tokenSymbol="USDT", tokenDecimal="6")
+                for i in range(0, 40, 3)],
+}
+# Same hash/logIndex twice in a row (Etherscan repeats some multi-log transfers).
+STREAMS["tokentx"].insert(3, dict(STREAMS["tokentx"][2]))
+
+
+class Etherscan(Transport):
+    def __init__(self):
+        self.actions = []
+
+    def send(self, req):
+        p = req.params
+        self.actions.append(p["action"])
+        rows = [r for r in STREAMS[p["action"]] if "endblock" not in p or int(r["blockNumber"]) <= p["endblock"]]
+        return Response(200, {}, json.dumps({"status": "1", "result": rows[:p["offset"]]}).encode(), req.url)
+
+
+@pytest.fixture
+def etherscan():
+    fake = Etherscan()
+    prev = transport.set_transport(fake)
+    yield fake
+    transport.set_transport(prev)
+
+
+def _expected():
+    kinds = {"txlist": "native", "txlistinternal": "internal", "tokentx": "erc20"}
+    rows = []
+    for action, stream in STREAMS.items():
+        seen = set()
+        for r in stream:
+            key = (r["hash"], r.get("logIndex"))
+            if key not in seen:
+                seen.add(key)
+                rows.append((-int(r["blockNumber"]), list(kinds).index(action), r["hash"]))
+    return [h for _, _, h in sorted(rows)]
+
+
+@pytest.mark.parametrize("limit", [3, 4, 7, 100])
+def test_timeline_merges_all_streams_in_order(etherscan, limit):
+    q = TxQuery(address=ADDR, limit=limit, extra={"timeline": True})
+    txs = list(iter_transactions("ETH", q))
+    assert [tx.tx_id for tx in txs] == _expected()
+    blocks = [tx.block_height for tx in txs]
+    assert blocks == sorted(blocks, reverse=True)
+    assert {tx.meta["kind"] for tx in txs} == {"native", "internal", "erc20"}
+
+
+def test_streams_page_independently(etherscan):
+    q = TxQuery(address=ADDR, limit=5, extra={"timeline": True})
+    pages = list(iter_pages("ETH", q))
+    assert all(len(p.items) <= 5 for p in pages)
+    assert pages[-1].next_cursor is None
+    cursor = pages[2].next_cursor
+    positions = dict(part.split("=") for part in cursor.split(";"))
+    assert set(positions) == {"native", "internal", "erc20"}
+    assert len(set(positions.values())) > 1
+    resumed = list(iter_transactions("ETH", TxQuery(address=ADDR, limit=5, extra={"timeline": True, "cursor": cursor})))
+    assert [tx.tx_id for tx in resumed] == _expected()[sum(len(p.items) for p in pages[:3]):]
+
+
+def test_exhausted_stream_not_requested_again(etherscan):
+    q = TxQuery(address=ADDR, limit=5, extra={"timeline": True, "cursor": "native=990:1;internal=-;erc20=-"})
+    list(iter_transactions("ETH", q))
+    assert set(etherscan.actions) == {"txlist"}
+
+
+def test_token_and_nft_stream_selection(etherscan):
+    STREAMS["tokennfttx"] = [_row(3000, 999, tokenID="7", logIndex="1", tokenSymbol="NFT")]
+    try:
+        q = TxQuery(address=ADDR, limit=50, extra={"timeline": ["erc20", "erc721"]})
+        txs = list(iter_transactions("ETH", q))
+    finally:
+        del STREAMS["tokennfttx"]
+    nft = [tx for tx in txs if tx.meta["kind"] == "erc721"]
+    assert len(nft) == 1 and nft[0].amount_raw == 1 and nft[0].meta["token_id"] == "7"
+    assert set(etherscan.actions) == {"tokentx", "tokennfttx"}
+
+
+def test_unknown_stream_rejected(etherscan):
+    with pytest.raises(ValueError):
+        list(iter_transactions("ETH", TxQuery(address=ADDR, extra={"timeline": ["bogus"]})))
+
+
+def test_async_timeline_matches_sync(etherscan):
+    async def collect():
+        q = TxQuery(address=ADDR, limit=6, extra={"timeline": True})
+        return [tx.tx_id async for tx in aiter_transactions("ETH", q)]
+
+    assert asyncio.run(collect()) == _expected()
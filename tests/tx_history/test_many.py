@@ -0,0 +1,70 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history import api
+from paychain.features.tx_history.api import alist_transactions_many, list_transactions_many
+
+
+class SlowTronGrid(Transport):
+    """Answers after a short delay; addresses starting with "X" get a 500."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def send(self, req):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        addr = req.params["to"]
+        if addr.startswith("X"):
+            return Response(500, {}, b"{}", req.url)
+        body = {"data": [{"transaction_id": f"tx-{addr}", "block_timestamp": 1700000000000,
+                          "result": {"from": "TA", "to": addr, "value": "1"}}], "meta": {}}
+        return Response(200, {}, json.dumps(body).encode(), req.url)
+
+
+@pytest.fixture
+def trongrid(monkeypatch):
+    fake = SlowTronGrid()
+    prev = transport.set_transport(fake)
+    monkeypatch.setitem(api.PROVIDER_CONCURRENCY, "tron.test", 3)
+    yield fake
+    transport.set_transport(prev)
+
+
+def _queries(n):
+    return [TxQuery(address=("X" if i % 5 == 0 else "T") + str(i), rpc_url="http://tron.test") for i in range(n)]
+
+
+def test_many_ordered_with_partial_failures(trongrid):
+    queries = _queries(20)
+    results = list(list_transactions_many("TRON", queries, concurrency=10))
+    assert [r.query for r in results] == queries
+    failed = [r for r in results if not r.ok]
+    assert len(failed) == 4
+    assert all(r.page.items[0].tx_id == f"tx-{r.query.address}" for r in results if r.ok)
+    assert trongrid.peak <= 3
+
+
+def test_many_async_as_completed(trongrid):
+    queries = _queries(20)
+
+    async def run():
+        return [r async for r in alist_transactions_many("TRON", queries, ordered=False)]
+
+    results = asyncio.run(run())
+    assert {r.query.address for r in results} == {q.address for q in queries}
+    assert sum(not r.ok for r in results) == 4
+    assert trongrid.peak <= 3
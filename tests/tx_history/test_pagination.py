@@ -0,0 +1,114 @@
+import asyncio
+import itertools
+import json
+
+import pytest
+
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import aiter_transactions, iter_pages, iter_transactions
+
+ETH_ADDR = "0x00000000000000000000000000000000000000aa"
+BTC_ADDR = "bc1qtestaddress"
+
+
+class FakeProvider(Transport):
+    """Serves one of the synthetic histories below and counts requests."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def send(self, req):
+        self.requests.append(req)
+        return Response(200, {}, json.dumps(self.handler(req)).encode(), req.url)
+
+
+@pytest.fixture
+def provider():
+    holder = {}
+
+    def install(handler):
+        fake = FakeProvider(handler)
+        holder["prev"] = transport.set_transport(fake)
+        return fake
+
+    yield install
+    if "prev" in holder:
+        transport.set_transport(holder["prev"])
+
+
+# 23 txs, 3 per block, newest first.
+ETH_TXS = [
+    {"hash": f"0x{i:02x}", "blockNumber": str(1000 - i // 3), "timeStamp": str(1700000000 - i),
+     "from": "0xbb", "to": ETH_ADDR, "value": "1", "isError": "0"}
+    for i in range(23)
+]
+
+
+def _etherscan(req):
+    p = req.params
+    rows = [tx for tx in ETH_TXS if "endblock" not in p or int(tx["blockNumber"]) <= p["endblock"]]
+    return {"status": "1", "result": rows[:p["offset"]]}
+
+
+def test_eth_block_cursor_walks_full_history(provider):
+    provider(_etherscan)
+    txs = list(iter_transactions("ETH", TxQuery(address=ETH_ADDR, limit=5)))
+    assert [tx.tx_id for tx in txs] == [tx["hash"] for tx in ETH_TXS]
+
+
+def test_iteration_is_lazy(provider):
+    fake = provider(_etherscan)
+    first = list(itertools.islice(iter_transactions("ETH", TxQuery(address=ETH_ADDR, limit=5)), 7))
+    assert len(first) == 7
+    assert len(fake.requests) == 2
+
+
+def test_cursor_resumes(provider):
+    provider(_etherscan)
+    pages = iter_pages("ETH", TxQuery(address=ETH_ADDR, limit=5))
+    cursor = next(pages).next_cursor
+    resumed = list(iter_transactions("ETH", TxQuery(address=ETH_ADDR, limit=5, extra={"cursor": cursor})))
+    assert [tx.tx_id for tx in resumed] == [tx["hash"] for tx in ETH_TXS[5:]]
+
+
+BTC_TXS = [
+    {"txid": f"{i:064x}", "status": {"confirmed": True, "block_time": 1700000000 - i, "block_height": 900 - i},
+     "vin": [], "vout": [{"scriptpubkey_address": BTC_ADDR, "value": 1000}]}
+    for i in range(60)
+]
+
+
+def _blockstream(req):
+    if "/chain/" in req.url:
+        after = req.url.rsplit("/", 1)[1]
+        start = next(i for i, tx in enumerate(BTC_TXS) if tx["txid"] == after) + 1
+    else:
+        start = 0
+    return BTC_TXS[start:start + 25]
+
+
+def test_btc_cursor_stops_mid_page(provider):
+    provider(_blockstream)
+    pages = list(iter_pages("BTC", TxQuery(address=BTC_ADDR, limit=10)))
+    ids = [tx.tx_id for page in pages for tx in page.items]
+    assert ids == [tx["txid"] for tx in BTC_TXS]
+    assert pages[-1].next_cursor is None
+
+
+def test_tron_fingerprint_async(provider):
+    def trongrid(req):
+        page = int(req.params.get("fingerprint") or 0)
+        data = [{"transaction_id": f"t{page}{i}", "block_timestamp": 1700000000000,
+                 "result": {"from": "TA", "to": "TB", "value": "1"}} for i in range(2)]
+        meta = {"fingerprint": str(page + 1)} if page < 2 else {}
+        return {"data": data, "meta": meta}
+
+    provider(trongrid)
+
+    async def run():
+        return [tx.tx_id async for tx in aiter_transactions("TRON", TxQuery(address="TB", limit=2))]
+
+    assert asyncio.run(run()) == ["t00", "t01", "t10", "t11", "t20", "t21"]
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+from importlib import metadata
+
+import pytest
+
+from paychain.adapters import registry
+from paychain.core.types import TxPage, TxQuery
+from paychain.features.tx_history.api import list_transactions
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class FakeAdapter:
+    API_URL = "https://fake.test"
+
+    @staticmethod
+    def list_transactions(q):
+        return TxPage(items=[], next_cursor="fake")
+
+    @staticmethod
+    async def alist_transactions(q):
+        return TxPage(items=[])
+
+
+@pytest.fixture
+def clean_registry(monkeypatch):
+    monkeypatch.setattr(registry, "_targets", dict(registry.BUILTIN))
+    monkeypatch.setattr(registry, "_loaded", {})
+    monkeypatch.setattr(registry, "_entry_points_scanned", False)
+
+
+def test_import_does_not_load_adapters():
+    code = (
+        "import sys, paychain.features.tx_history.api as api\n"
+        "assert not [m for m in sys.modules if m.startswith('paychain.adapters.') and m != 'paychain.adapters.registry']\n"
+        "assert 'asyncio' not in sys.modules\n"
+        "api._adapter('trx')\n"
+        "assert 'paychain.adapters.tron' in sys.modules and 'paychain.adapters.eth' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=ROOT)
+
+
+def test_aliases_and_unknown_chain(clean_registry):
+    assert registry.get_adapter("trx") is registry.get_adapter("TRON")
+    with pytest.raises(ValueError, match="Unsupported chain: NOPE"):
+        registry.get_adapter("nope")
+
+
+def test_register_custom_adapter(clean_registry):
+    registry.register("polygon", FakeAdapter)
+    page = list_transactions("POLYGON", TxQuery(address="0x1"))
+    assert page.next_cursor == "fake"
+
+
+def test_entry_point_plugins(clean_registry, monkeypatch):
+    ep = metadata.EntryPoint(name="fakechain", value=f"{__name__}:FakeAdapter", group=registry.ENTRY_POINT_GROUP)
+    calls = []
+
+    def entry_points(group):
+        calls.append(group)
+        return [ep] if group == registry.ENTRY_POINT_GROUP else []
+
+    monkeypatch.setattr(metadata, "entry_points", entry_points)
+    # Built-ins resolve without scanning installed packages.
+    registry.get_adapter("BTC")
+    assert calls == []
+    assert registry.get_adapter("FAKECHAIN") is FakeAdapter
+    assert "FAKECHAIN" in registry.available()
+    assert calls == [registry.ENTRY_POINT_GROUP]
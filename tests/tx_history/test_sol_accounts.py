@@ -0,0 +1,158 @@
+import asyncio
+import json
+from collections import Counter
+
+import pytest
+
+from paychain.adapters import sol, sol_accounts
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import aiter_transactions, iter_pages, iter_transactions
+
+OWNER = "Owner1111111111111111111111111111111111111"
+MINT = "Mint11111111111111111111111111111111111111"
+ACC1 = "Ata111111111111111111111111111111111111111"
+ACC2 = "Aux111111111111111111111111111111111111111"
+
+
+def _sig(i):
+    # Every 4th signature only touches the owner (SOL, other mints); every
+    # 7th moves tokens between both accounts; the rest alternate accounts.
+    if i % 4 == 0:
+        accounts = ()
+    elif i % 7 == 0:
+        accounts = (ACC1, ACC2)
+    else:
+        accounts = (ACC1,) if i % 3 else (ACC2,)
+    return {"signature": f"sig{i:03d}", "slot": 10_000 - i * 3, "blockTime": 1_700_000_000 - i * 2, "accounts": accounts}
+
+
+SIGS = [_sig(i) for i in range(60)]
+
+
+def _tx(s):
+    i = int(s["signature"][3:])
+    both = len(s["accounts"]) == 2
+    delta = 0 if both else (i + 1) * (1 if i % 2 else -1)
+    pre = [{"owner": OWNER, "mint": MINT, "uiTokenAmount": {"amount": "1000", "decimals": 6}}]
+    post = [{"owner": OWNER, "mint": MINT, "uiTokenAmount": {"amount": str(1000 + delta), "decimals": 6}}]
+    if not s["accounts"]:
+        pre = post = []
+    return {"slot": s["slot"], "blockTime": s["blockTime"],
+            "meta": {"err": None, "preTokenBalances": pre, "postTokenBalances": post}}
+
+
+class FakeRpc(Transport):
+    def __init__(self, listed=(ACC1, ACC2)):
+        self.listed = list(listed)
+        self.calls = Counter()
+        self.scanned = Counter()
+
+    def _one(self, call):
+        method, params = call["method"], call["params"]
+        self.calls[method] += 1
+        if method == "getTokenAccountsByOwner":
+            assert params[1] == {"mint": MINT}
+            result = {"context": {"slot": 10_000}, "value": [{"pubkey": a, "account": {}} for a in self.listed]}
+        elif method == "getSignaturesForAddress":
+            address, opts = params
+            self.scanned[address] += 1
+            rows = [s for s in SIGS if address == OWNER or address in s["accounts"]]
+            if opts.get("before"):
+                rows = rows[[s["signature"] for s in rows].index(opts["before"]) + 1:]
+            result = [{k: v for k, v in s.items() if k != "accounts"} for s in rows[:opts["limit"]]]
+        else:
+            result = _tx(next(s for s in SIGS if s["signature"] == params[0]))
+        return {"jsonrpc": "2.0", "id": call["id"], "result": result}
+
+    def send(self, req):
+        body = [self._one(c) for c in req.json] if isinstance(req.json, list) else self._one(req.json)
+        return Response(200, {}, json.dumps(body).encode(), req.url)
+
+    async def asend(self, req):
+        return self.send(req)
+
+
+@pytest.fixture
+def rpc():
+    fake = FakeRpc()
+    prev = transport.set_transport(fake)
+    prev_index = sol_accounts.set_index(sol_accounts.TokenAccountIndex(":memory:"))
+    sol._no_batch.clear()
+    yield fake
+    transport.set_transport(prev)
+    sol_accounts.set_index(prev_index)
+
+
+def _query(**kw):
+    return TxQuery(address=OWNER, token=MINT, rpc_url="http://rpc.test", **kw)
+
+
+def _expected(direction="all"):
+    out = []
+    for s in SIGS:
+        i = int(s["signature"][3:])
+        if len(s["accounts"]) != 1:
+            continue
+        incoming = i % 2 == 1
+        if direction == "all" or (direction == "incoming") == incoming:
+            out.append(s["signature"])
+    return out
+
+
+@pytest.mark.parametrize("limit", [1, 4, 9, 100])
+def test_token_history_scans_token_accounts(rpc, limit):
+    txs = list(iter_transactions("SOL", _query(limit=limit)))
+    assert [tx.tx_id for tx in txs] == _expected()
+    assert [tx.amount_raw for tx in txs] == [int(t[3:]) + 1 for t in _expected()]
+    # Owner-only signatures are never fetched; shared ones only once.
+    assert rpc.calls["getTransaction"] == sum(1 for s in SIGS if s["accounts"])
+    assert rpc.scanned[OWNER] == 0
+
+
+def test_account_cursor_resumes(rpc):
+    pages = list(iter_pages("SOL", _query(limit=5)))
+    assert pages[-1].next_cursor is None
+    cursor = pages[3].next_cursor
+    assert set(dict(p.split("=", 1) for p in cursor.split(";"))) == {ACC1, ACC2}
+    done = sum(len(p.items) for p in pages[:4])
+    resumed = list(iter_transactions("SOL", _query(limit=5, extra={"cursor": cursor})))
+    assert [tx.tx_id for tx in resumed] == _expected()[done:]
+
+
+def test_discovery_is_cached_and_keeps_closed_accounts(rpc):
+    list(iter_transactions("SOL", _query(limit=50)))
+    list(iter_transactions("SOL", _query(limit=50)))
+    assert rpc.calls["getTokenAccountsByOwner"] == 1
+    # ACC2 closed: re-discovery no longer lists it, its history stays.
+    sol_accounts.get_index().ttl = 0
+    rpc.listed = [ACC1]
+    txs = list(iter_transactions("SOL", _query(limit=50)))
+    assert rpc.calls["getTokenAccountsByOwner"] == 2
+    assert [tx.tx_id for tx in txs] == _expected()
+
+
+def test_index_persists_across_processes(tmp_path):
+    path = str(tmp_path / "accounts.sqlite")
+    index = sol_accounts.TokenAccountIndex(path)
+    assert index.get(OWNER, MINT) is None
+    index.put(OWNER, MINT, [ACC2, ACC1])
+    index.close()
+    assert sol_accounts.TokenAccountIndex(path).get(OWNER, MINT) == [ACC1, ACC2]
+
+
+def test_owner_scan_when_disabled_or_no_accounts(rpc):
+    list(iter_transactions("SOL", _query(limit=50, extra={"token_accounts": False})))
+    assert rpc.calls["getTokenAccountsByOwner"] == 0 and rpc.scanned[OWNER] > 0
+    rpc.listed = []
+    txs = list(iter_transactions("SOL", _query(limit=50)))
+    assert rpc.calls["getTokenAccountsByOwner"] == 1
+    assert [tx.tx_id for tx in txs] == _expected()
+
+
+def test_async_matches_sync(rpc):
+    async def collect():
+        return [tx.tx_id async for tx in aiter_transactions("SOL", _query(limit=6, direction="incoming"))]
+
+    assert asyncio.run(collect()) == _expected("incoming")
@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+
+from paychain.adapters import sol
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxQuery
+
+ADDR = "Owner1111111111111111111111111111111111111"
+MINT = "Mint11111111111111111111111111111111111111"
+
+
+def _tx(sig: str, amount: int) -> dict:
+    return {
+        "slot": 100,
+        "blockTime": 1700000000,
+        "meta": {
+            "err": None,
+            "preTokenBalances": [],
+            "postTokenBalances": [{"owner": ADDR, "mint": MINT,
+                                   "uiTokenAmount": {"amount": str(amount), "decimals": 6}}],
+        },
+    }
+
+
+class FakeRpc(Transport):
+    def __init__(self, accept_batch: bool = True):
+        self.accept_batch = accept_batch
+        self.posts = []
+
+    def _one(self, call):
+        if call["method"] == "getTokenAccountsByOwner":
+            # No token accounts: token queries fall back to the owner scan.
+            result = {"context": {"slot": 100}, "value": []}
+        elif call["method"] == "getSignaturesForAddress":
+            result = [{"signature": f"sig{i}", "blockTime": 1700000000} for i in range(7)]
+        else:
+            sig = call["params"][0]
+            result = _tx(sig, int(sig[3:]) + 1)
+        return {"jsonrpc": "2.0", "id": call["id"], "result": result}
+
+    def send(self, req):
+        self.posts.append(req.json)
+        if isinstance(req.json, list):
+            if not self.accept_batch:
+                return Response(403, {}, b'{"error": "batch disabled"}', req.url)
+            # Reply out of order to exercise id correlation.
+            body = [self._one(c) for c in reversed(req.json)]
+        else:
+            body = self._one(req.json)
+        return Response(200, {}, json.dumps(body).encode(), req.url)
+
+
+@pytest.fixture
+def rpc(request):
+    fake = FakeRpc(accept_batch=request.param)
+    prev = transport.set_transport(fake)
+    sol._no_batch.clear()
+    yield fake
+    transport.set_transport(prev)
+    sol._no_batch.clear()
+
+
+@pytest.mark.parametrize("rpc", [True], indirect=True)
+def test_batched_get_transaction(rpc):
+    q = TxQuery(address=ADDR, token=MINT, limit=7, rpc_url="http://rpc.test", extra={"batch_size": 3})
+    page = sol.list_transactions(q)
+    assert [tx.tx_id for tx in page.items] == [f"sig{i}" for i in range(7)]
+    assert [tx.amount_raw for tx in page.items] == [i + 1 for i in range(7)]
+    # 1 account discovery + 1 signatures call + ceil(7 / 3) batches.
+    assert len(rpc.posts) == 5
+
+
+@pytest.mark.parametrize("rpc", [False], indirect=True)
+def test_fallback_when_batches_rejected(rpc):
+    q = TxQuery(address=ADDR, token=MINT, limit=7, rpc_url="http://rpc.test")
+    page = sol.list_transactions(q)
+    assert [tx.tx_id for tx in page.items] == [f"sig{i}" for i in range(7)]
+    page = asyncio.run(sol.alist_transactions(q))
+    assert [tx.amount_raw for tx in page.items] == [i + 1 for i in range(7)]
+    # Only the first attempt used a batch payload.
+    assert sum(isinstance(p, list) for p in rpc.posts) == 1
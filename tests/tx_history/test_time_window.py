@@ -0,0 +1,158 @@
+import json
+
+import pytest
+
+from paychain.adapters import eth, eth_rpc, sol
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import iter_transactions
+from paychain.testing.eth_node import BLOCK_TIME, TS_GENESIS, StubEthNode
+
+TIP = 1_700_000_000
+
+
+class Fake(Transport):
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def send(self, req):
+        self.requests.append(req)
+        return Response(200, {}, json.dumps(self.handler(req)).encode(), req.url)
+
+    async def asend(self, req):
+        return self.send(req)
+
+
+@pytest.fixture
+def use():
+    holder = {}
+
+    def install(handler):
+        fake = Fake(handler)
+        holder.setdefault("prev", transport.set_transport(fake))
+        transport.set_transport(fake)
+        return fake
+
+    yield install
+    if "prev" in holder:
+        transport.set_transport(holder["prev"])
+
+
+def test_btc_stops_paging_past_since(use):
+    addr = "bc1qwindow"
+    txs = [{"txid": f"{i:064x}", "status": {"confirmed": True, "block_height": 900_000 - i, "block_time": TIP - i * 600},
+            "vin": [], "vout": [{"scriptpubkey_address": addr, "value": 1000 + i}]} for i in range(500)]
+
+    def blockstream(req):
+        tail = req.url.split(f"/address/{addr}/txs", 1)[1]
+        start = 0 if not tail else int(tail.rsplit("/", 1)[1], 16) + 1
+        return txs[start:start + 25]
+
+    fake = use(blockstream)
+    q = TxQuery(address=addr, since_ts=TIP - 40 * 600, until_ts=TIP - 10 * 600, limit=100)
+    got = list(iter_transactions("BTC", q))
+    assert [tx.tx_id for tx in got] == [tx["txid"] for tx in txs[10:41]]
+    # 41 in-window txs plus two hours of slack fit in two pages, not twenty.
+    assert len(fake.requests) == 3
+
+
+def test_etherscan_pushes_block_bounds(use):
+    def etherscan(req):
+        p = req.params
+        if p["module"] == "block":
+            return {"status": "1", "result": str(p["timestamp"] // 12)}
+        rows = [{"hash": f"0x{b:x}", "blockNumber": str(b), "timeStamp": str(b * 12), "from": "0xbb", "to": "0xaa",
+                 "value": "1", "isError": "0"} for b in range(p.get("endblock", 10**9), p.get("startblock", 0) - 1, -1)]
+        return {"status": "1", "result": rows[:p["offset"]]}
+
+    eth._blocks_by_time.clear()
+    fake = use(etherscan)
+    q = TxQuery(address="0xaa", since_ts=12_000 * 12, until_ts=12_049 * 12, limit=20)
+    got = list(iter_transactions("ETH", q))
+    assert [tx.block_height for tx in got] == list(range(12_049, 11_999, -1))
+    lists = [r.params for r in fake.requests if r.params["module"] == "account"]
+    # The upper bound is widened to the next BOUND_BUCKET and trimmed locally.
+    assert all(p["startblock"] == 12_000 and p["endblock"] <= 12_100 for p in lists)
+    # Each bound is resolved once and reused by every page.
+    assert sum(r.params["module"] == "block" for r in fake.requests) == 2
+
+
+def test_etherscan_rolling_window_reuses_bound(use, monkeypatch):
+    def etherscan(req):
+        p = req.params
+        if p["module"] == "block":
+            return {"status": "1", "result": str(p["timestamp"] // 12)}
+        return {"status": "1", "result": []}
+
+    eth._blocks_by_time.clear()
+    fake = use(etherscan)
+    monkeypatch.setattr(eth.time, "time", lambda: TIP)
+    # "Last day" windows a few seconds apart; the open end is never looked up.
+    for now in range(TIP - 199, TIP, 7):
+        list(iter_transactions("ETH", TxQuery(address="0xaa", since_ts=now - 86_400, until_ts=now, limit=5)))
+    lookups = [r.params for r in fake.requests if r.params["module"] == "block"]
+    assert [(p["timestamp"], p["closest"]) for p in lookups] == [((TIP - 86_400) // 600 * 600, "after")]
+
+
+def test_etherscan_without_block_lookup_filters_locally(use):
+    def etherscan(req):
+        if req.params["module"] == "block":
+            return {"status": "0", "message": "NOTOK", "result": "Error! Invalid action"}
+        rows = [{"hash": f"0x{b:x}", "blockNumber": str(b), "timeStamp": str(b * 12), "from": "0xbb", "to": "0xaa",
+                 "value": "1", "isError": "0"} for b in range(req.params.get("endblock", 200), -1, -1)]
+        return {"status": "1", "result": rows[:req.params["offset"]]}
+
+    eth._blocks_by_time.clear()
+    fake = use(etherscan)
+    got = list(iter_transactions("ETH", TxQuery(address="0xaa", since_ts=150 * 12, limit=10)))
+    assert [tx.block_height for tx in got] == list(range(200, 149, -1))
+    assert "startblock" not in fake.requests[-1].params
+    # Paging ended at the first row before the window.
+    assert sum(r.params["module"] == "account" for r in fake.requests) == 6
+
+
+def test_eth_rpc_scans_only_the_window():
+    node = StubEthNode("0x00000000000000000000000000000000000000aa", transfers=600, every=37, max_results=1000)
+    prev = transport.set_transport(node)
+    eth_rpc._spans.clear()
+    eth_rpc._time_cache.clear()
+    try:
+        lo_block, hi_block = 20_000, 24_000
+        q = TxQuery(address="0x00000000000000000000000000000000000000aa", rpc_url="http://window.test", limit=500,
+                    since_ts=TS_GENESIS + lo_block * BLOCK_TIME, until_ts=TS_GENESIS + hi_block * BLOCK_TIME,
+                    extra={"backend": "rpc", "block_range": 1000})
+        got = list(iter_transactions("ETH", q))
+    finally:
+        transport.set_transport(prev)
+    expected = [log for log in node.expected() if lo_block <= int(log["blockNumber"], 16) <= hi_block]
+    assert [(tx.tx_id, tx.meta["log_index"]) for tx in got] == [
+        (log["transactionHash"], int(log["logIndex"], 16)) for log in expected
+    ]
+    # Four 1000-block ranges (each as an outgoing/incoming pair), not the 50k-block history.
+    assert node.calls["eth_getLogs"] <= 10
+    assert node.calls["eth_getBlockByNumber"] < 60
+
+
+def test_sol_stops_paging_past_since(use):
+    owner = "Owner1111111111111111111111111111111111111"
+
+    def rpc(req):
+        if isinstance(req.json, list):
+            return [{"jsonrpc": "2.0", "id": c["id"], "result": None} for c in req.json]
+        call = req.json
+        if call["method"] == "getSignaturesForAddress":
+            before = call["params"][1].get("before")
+            start = int(before[3:]) + 1 if before else 0
+            rows = [{"signature": f"sig{i}", "slot": 1000 - i, "blockTime": TIP - i * 10}
+                    for i in range(start, start + call["params"][1]["limit"])]
+            return {"jsonrpc": "2.0", "id": call["id"], "result": rows}
+        return {"jsonrpc": "2.0", "id": call["id"], "result": None}
+
+    sol._no_batch.clear()
+    fake = use(rpc)
+    q = TxQuery(address=owner, since_ts=TIP - 45 * 10, limit=10, rpc_url="http://sol.test")
+    list(iter_transactions("SOL", q))
+    sig_calls = [r for r in fake.requests if isinstance(r.json, dict) and r.json["method"] == "getSignaturesForAddress"]
+    assert len(sig_calls) == 5
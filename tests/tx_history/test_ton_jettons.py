@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from paychain.adapters import ton
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import aiter_transactions, iter_pages, iter_transactions
+
+RAW = "0:" + "ab" * 32
+# User-friendly (bounceable) form of RAW; the checksum is not verified.
+FRIENDLY = base64.urlsafe_b64encode(b"\x11\x00" + bytes.fromhex("ab" * 32) + b"\x00\x00").decode()
+OTHER = "0:" + "cd" * 32
+USDT = "0:" + "11" * 32
+NOT = "0:" + "22" * 32
+TIP_LT = 50_000_000
+
+
+def _ton(i, incoming=True):
+    src, dst = (OTHER, RAW) if incoming else (RAW, OTHER)
+    return {"type": "TonTransfer", "status": "ok",
+            "TonTransfer": {"sender": {"address": src}, "recipient": {"address": dst}, "amount": 10 + i}}
+
+
+def _jetton(i, master, incoming=True, decimals=True):
+    src, dst = (OTHER, RAW) if incoming else (RAW, OTHER)
+    jetton = {"address": master, "symbol": "USD₮" if master == USDT else "NOT"}
+    if decimals:
+        jetton["decimals"] = 6 if master == USDT else 9
+    return {"type": "JettonTransfer", "status": "ok",
+            "JettonTransfer": {"sender": {"address": src}, "recipient": {"address": dst},
+                               "amount": str(1_000_000 * i), "jetton": jetton}}
+
+
+def _event(i):
+    if i % 5 == 0:
+        # Multi-action event: a TON and two jetton transfers, one outgoing.
+        actions = [_ton(i), _jetton(i, USDT), _jetton(i, NOT, incoming=False, decimals=False)]
+    elif i % 3 == 0:
+        actions = [{"type": "ContractDeploy", "status": "ok", "ContractDeploy": {}}, _jetton(i, USDT, decimals=False)]
+    else:
+        actions = [_ton(i, incoming=i % 2 == 0)]
+    return {"event_id": f"ev{i:03d}", "timestamp": 1_700_000_000 - i * 10, "lt": TIP_LT - i * 1000, "actions": actions}
+
+
+EVENTS = [_event(i) for i in range(40)]
+
+
+class TonApi(Transport):
+    def __init__(self):
+        self.urls = []
+
+    def send(self, req):
+        self.urls.append(req.url)
+        if "/jettons/" in req.url:
+            master = req.url.rsplit("/", 1)[1]
+            body = {"metadata": {"symbol": "NOT" if master == NOT else "USD₮", "decimals": "9" if master == NOT else "6"}}
+            return Response(200, {}, json.dumps(body).encode(), req.url)
+        p = req.params
+        rows = [e for e in EVENTS if "before_lt" not in p or e["lt"] < int(p["before_lt"])]
+        rows = [e for e in rows if e["timestamp"] >= p.get("start_date", 0)]
+        page = rows[:p["limit"]]
+        next_from = page[-1]["lt"] if len(rows) > len(page) else 0
+        return Response(200, {}, json.dumps({"events": page, "next_from": next_from}).encode(), req.url)
+
+    async def asend(self, req):
+        return self.send(req)
+
+
+@pytest.fixture
+def tonapi():
+    fake = TonApi()
+    prev = transport.set_transport(fake)
+    ton._jettons.clear()
+    yield fake
+    transport.set_transport(prev)
+
+
+def _expected(direction="all"):
+    out = []
+    for ev in EVENTS:
+        for index, act in enumerate(ev["actions"]):
+            info = act.get(act["type"]) or {}
+            if "amount" not in info:
+                continue
+            incoming = info["recipient"]["address"] == RAW
+            if direction == "incoming" and not incoming or direction == "outgoing" and incoming:
+                continue
+            out.append(ev["event_id"] if index == 0 else f"{ev['event_id']}:{index}")
+    return out
+
+
+@pytest.mark.parametrize("limit", [1, 2, 7, 100])
+def test_every_transfer_action_is_emitted_across_pages(tonapi, limit):
+    txs = list(iter_transactions("TON", TxQuery(address=RAW, limit=limit)))
+    assert [tx.tx_id for tx in txs] == _expected()
+
+
+def test_jetton_amounts_and_decimals_cache(tonapi):
+    txs = list(iter_transactions("TON", TxQuery(address=RAW, limit=10)))
+    usdt = [tx for tx in txs if tx.meta.get("jetton") == USDT]
+    notcoin = [tx for tx in txs if tx.meta.get("jetton") == NOT]
+    assert usdt and all(tx.asset == "USD₮" and tx.amount_decimals == 6 for tx in usdt)
+    assert notcoin and all(tx.asset == "NOT" and tx.amount_decimals == 9 for tx in notcoin)
+    assert {tx.meta["kind"] for tx in txs} == {"ton", "jetton"}
+    # NOT previews never carry decimals: exactly one metadata lookup.
+    assert sum("/jettons/" in u for u in tonapi.urls) == 1
+
+
+@pytest.mark.parametrize("direction", ["incoming", "outgoing"])
+def test_direction_matches_friendly_address(tonapi, direction):
+    txs = list(iter_transactions("TON", TxQuery(address=FRIENDLY, limit=9, direction=direction)))
+    assert [tx.tx_id for tx in txs] == _expected(direction)
+
+
+def test_cursor_inside_multi_action_event(tonapi):
+    page = list(iter_pages("TON", TxQuery(address=RAW, limit=2)))[0]
+    assert [tx.tx_id for tx in page.items] == ["ev000", "ev000:1"]
+    assert page.next_cursor == f"{TIP_LT + 1}:2"
+
+
+def test_after_lt_fetches_only_new_events(tonapi):
+    mark = EVENTS[12]["lt"]
+    txs = list(iter_transactions("TON", TxQuery(address=RAW, limit=5, extra={"after_lt": mark})))
+    assert all(tx.block_height > mark for tx in txs)
+    assert [tx.tx_id for tx in txs] == [t for t in _expected() if int(t[2:5]) < 12]
+    assert len(tonapi.urls) <= 5
+
+
+def test_async_matches_sync(tonapi):
+    async def collect():
+        return [tx.tx_id async for tx in aiter_transactions("TON", TxQuery(address=RAW, limit=3))]
+
+    assert asyncio.run(collect()) == _expected()
@@ -0,0 +1,168 @@
+import asyncio
+import dataclasses
+import json
+
+import pytest
+
+from paychain.adapters import tron
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxQuery
+from paychain.features.tx_history.api import aiter_transactions, iter_pages, iter_transactions
+
+ADDR = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+ADDR_HEX = "41a614f803b6fd780986a42c78ec9c7f77e6ded13c"
+OTHER_HEX = "41" + "11" * 20
+TS = 1_700_000_000_000
+
+
+def _trx(i, ts, outgoing=False, kind="TransferContract", ret="SUCCESS"):
+    owner, to = (ADDR_HEX, OTHER_HEX) if outgoing else (OTHER_HEX, ADDR_HEX)
+    value = {"owner_address": owner, "to_address": to, "amount": 1_000_000 + i}
+    return {"txID": f"trx{i:03d}", "blockNumber": 100 + i, "block_timestamp": ts,
+            "ret": [{"contractRet": ret}], "raw_data": {"contract": [{"type": kind, "parameter": {"value": value}}]}}
+
+
+def _trc20(i, ts, outgoing=False, symbol="USDT", contract="TXLAQ63Xg1NAzckPwKHvzw7CSEmLMEqcdj"):
+    src, dst = (ADDR, "TOther") if outgoing else ("TOther", ADDR)
+    return {"transaction_id": f"t20{i:03d}", "block_timestamp": ts, "from": src, "to": dst, "value": str(10 + i),
+            "type": "Transfer", "token_info": {"symbol": symbol, "decimals": 6, "address": contract}}
+
+
+# Newest first like TronGrid; timestamps interleave and collide across streams.
+ROWS = {
+    "/transactions": [_trx(i, TS - i * 7000, outgoing=i % 3 == 0) for i in range(23)]
+    + [_trx(99, TS - 200_000, kind="TriggerSmartContract")],
+    "/transactions/trc20": [_trc20(i, TS - i * 5000, outgoing=i % 4 == 0,
+                                   symbol="USDT" if i % 2 else "USDD", contract="TUSDT" if i % 2 else "TUSDD")
+                            for i in range(31)],
+}
+
+
+class TronGrid(Transport):
+    def __init__(self):
+        self.requests = []
+
+    def send(self, req):
+        self.requests.append(req)
+        path = req.url.split(f"/v1/accounts/{ADDR}", 1)[1]
+        p = req.params
+        rows = ROWS[path]
+        if p.get("contract_address"):
+            rows = [r for r in rows if r["token_info"]["address"] == p["contract_address"]]
+        if p.get("only_to"):
+            rows = [r for r in rows if tron._visible(r.get("to") or r["raw_data"]["contract"][0]["parameter"]["value"]["to_address"]) == ADDR]
+        if p.get("only_from"):
+            rows = [r for r in rows if tron._visible(r.get("from") or r["raw_data"]["contract"][0]["parameter"]["value"]["owner_address"]) == ADDR]
+        if "min_timestamp" in p:
+            rows = [r for r in rows if r["block_timestamp"] >= p["min_timestamp"]]
+        if "max_timestamp" in p:
+            rows = [r for r in rows if r["block_timestamp"] <= p["max_timestamp"]]
+        start = int(p.get("fingerprint", "0"))
+        page = rows[start:start + p["limit"]]
+        meta = {"fingerprint": str(start + p["limit"])} if start + p["limit"] < len(rows) else {}
+        return Response(200, {}, json.dumps({"data": page, "meta": meta}).encode(), req.url)
+
+    async def asend(self, req):
+        return self.send(req)
+
+
+@pytest.fixture
+def grid():
+    fake = TronGrid()
+    prev = transport.set_transport(fake)
+    yield fake
+    transport.set_transport(prev)
+
+
+def _expected(direction="all", token=None):
+    rows = []
+    for path, stream in ROWS.items():
+        if token and path == "/transactions":
+            continue
+        for r in stream:
+            if path == "/transactions":
+                if r["raw_data"]["contract"][0]["type"] != "TransferContract":
+                    continue
+                value = r["raw_data"]["contract"][0]["parameter"]["value"]
+                src, dst, tx_id = value["owner_address"], value["to_address"], r["txID"]
+                src, dst = tron._visible(src), tron._visible(dst)
+            else:
+                if token and r["token_info"]["address"] != token:
+                    continue
+                src, dst, tx_id = r["from"], r["to"], r["transaction_id"]
+            if (direction == "incoming" and dst != ADDR) or (direction == "outgoing" and src != ADDR):
+                continue
+            rows.append((-r["block_timestamp"], path != "/transactions", tx_id))
+    return [tx_id for _, _, tx_id in sorted(rows)]
+
+
+def test_base58_of_hex_address():
+    assert tron._base58(ADDR_HEX) == ADDR
+
+
+@pytest.mark.parametrize("limit", [1, 4, 9, 200])
+def test_account_mode_merges_trx_and_trc20(grid, limit):
+    q = TxQuery(address=ADDR, limit=limit, extra={"mode": "account"})
+    txs = list(iter_transactions("TRON", q))
+    assert [tx.tx_id for tx in txs] == _expected()
+    ts = [tx.ts for tx in txs]
+    assert ts == sorted(ts, reverse=True)
+    assert {tx.asset for tx in txs} == {"TRX", "USDT", "USDD"}
+    trx = next(tx for tx in txs if tx.asset == "TRX")
+    assert trx.amount_decimals == 6 and trx.from_addr.startswith("T") and trx.to_addr.startswith("T")
+
+
+@pytest.mark.parametrize("direction", ["incoming", "outgoing"])
+def test_account_mode_direction(grid, direction):
+    q = TxQuery(address=ADDR, limit=8, direction=direction, extra={"mode": "account"})
+    assert [tx.tx_id for tx in iter_transactions("TRON", q)] == _expected(direction)
+    flag = "only_to" if direction == "incoming" else "only_from"
+    assert all(req.params.get(flag) == "true" for req in grid.requests)
+
+
+def test_token_restricts_to_trc20_stream(grid):
+    q = TxQuery(address=ADDR, limit=5, token="TUSDT", extra={"mode": "account"})
+    txs = list(iter_transactions("TRON", q))
+    assert [tx.tx_id for tx in txs] == _expected(token="TUSDT")
+    assert all(req.url.endswith("/transactions/trc20") for req in grid.requests)
+
+
+def test_cursor_resumes_each_stream_by_fingerprint(grid):
+    q = TxQuery(address=ADDR, limit=6, extra={"mode": "account"})
+    pages = list(iter_pages("TRON", q))
+    assert pages[-1].next_cursor is None
+    cursor = pages[2].next_cursor
+    assert set(dict(p.split("=", 1) for p in cursor.split(";"))) == {"trx", "trc20"}
+    done = sum(len(p.items) for p in pages[:3])
+    resumed = list(iter_transactions("TRON", TxQuery(address=ADDR, limit=6, extra={"mode": "account", "cursor": cursor})))
+    assert [tx.tx_id for tx in resumed] == _expected()[done:]
+
+
+def test_cursor_ignores_rows_arriving_after_first_page(grid, monkeypatch):
+    q = TxQuery(address=ADDR, limit=3, extra={"mode": "account"})
+    first = tron.list_transactions(q)
+    # The first page has no fingerprint: it is re-read with a pinned max_timestamp.
+    assert all(part.split("=", 1)[1] == "-" or ":" in part for part in first.next_cursor.split(";"))
+    arrivals = {"/transactions": [_trx(200 + i, TS + (i + 1) * 1000) for i in range(4)],
+                "/transactions/trc20": [_trc20(200 + i, TS + (i + 1) * 1500) for i in range(3)]}
+    expected = _expected()
+    for path, rows in arrivals.items():
+        monkeypatch.setitem(ROWS, path, rows[::-1] + ROWS[path])
+    resumed = list(iter_transactions("TRON", dataclasses.replace(q, extra={"mode": "account", "cursor": first.next_cursor})))
+    assert [tx.tx_id for tx in first.items + resumed] == expected
+
+
+def test_exhausted_stream_not_requested_again(grid):
+    q = TxQuery(address=ADDR, limit=50, extra={"mode": "account", "cursor": "trx=-;trc20="})
+    txs = list(iter_transactions("TRON", q))
+    assert {tx.meta["kind"] for tx in txs} == {"trc20"}
+    assert all(req.url.endswith("/transactions/trc20") for req in grid.requests)
+
+
+def test_async_account_mode_matches_sync(grid):
+    async def collect():
+        q = TxQuery(address=ADDR, limit=7, extra={"mode": "account"})
+        return [tx.tx_id async for tx in aiter_transactions("TRON", q)]
+
+    assert asyncio.run(collect()) == _expected()
@@ -0,0 +1,193 @@
+import dataclasses
+import json
+
+import pytest
+
+from paychain.core import transport
+from paychain.core.transport import Response, Transport
+from paychain.core.types import TxRecord
+from paychain.features.tx_sync.api import sync
+from paychain.features.tx_sync.store import TxStore
+
+ADDR = "0x00000000000000000000000000000000000000aa"
+
+
+class FakeEtherscan(Transport):
+    def __init__(self):
+        self.txs = []
+        self.calls = 0
+
+    def add(self, n: int, block: int):
+        for _ in range(n):
+            i = len(self.txs)
+            self.txs.insert(0, {"hash": f"0x{i:04x}", "blockNumber": str(block), "timeStamp": str(1700000000 + i),
+                                "from": "0xbb", "to": ADDR, "value": "1", "isError": "0"})
+
+    def send(self, req):
+        self.calls += 1
+        p = req.params
+        rows = [tx for tx in self.txs if "endblock" not in p or int(tx["blockNumber"]) <= p["endblock"]]
+        body = {"status": "1", "result": rows[:p["offset"]]}
+        return Response(200, {}, json.dumps(body).encode(), req.url)
+
+
+@pytest.fixture
+def etherscan():
+    fake = FakeEtherscan()
+    prev = transport.set_transport(fake)
+    yield fake
+    transport.set_transport(prev)
+
+
+def test_sync_returns_only_delta(etherscan, tmp_path):
+    store = TxStore(str(tmp_path / "tx.sqlite"))
+    for block in range(100, 120):
+        etherscan.add(2, block)
+    first = sync("ETH", ADDR, store=store, limit=10)
+    assert len(first) == 40
+    assert store.get_mark("ETH", ADDR) == 119
+
+    etherscan.calls = 0
+    assert sync("ETH", ADDR, store=store, limit=10) == []
+    assert etherscan.calls == 1
+
+    etherscan.add(1, 119)
+    etherscan.add(3, 120)
+    delta = sync("ETH", ADDR, store=store, limit=10)
+    assert sorted(tx.tx_id for tx in delta) == ["0x0028", "0x0029", "0x002a", "0x002b"]
+    assert store.get_mark("ETH", ADDR) == 120
+    assert len(store.get_records("ETH", ADDR)) == 44
+    store.close()
+
+
+class FakeTronGrid(Transport):
+    """TRC-20-only account: rows have timestamps but no block number."""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+
+    def add(self, n: int):
+        for _ in range(n):
+            i = len(self.rows)
+            self.rows.insert(0, {"transaction_id": f"t{i:04d}", "block_timestamp": (1_700_000_000 + i * 3) * 1000,
+                                 "from": "TOther", "to": "TAddr", "value": "1", "type": "Transfer",
+                                 "token_info": {"symbol": "USDT", "decimals": 6, "address": "TUSDT"}})
+
+    def send(self, req):
+        self.calls += 1
+        rows = self.rows if req.url.endswith("/trc20") else []
+        start = int(req.params.get("fingerprint") or 0)
+        end = start + req.params["limit"]
+        body = {"data": rows[start:end], "meta": {"fingerprint": str(end)} if end < len(rows) else {}}
+        return Response(200, {}, json.dumps(body).encode(), req.url)
+
+
+def test_sync_falls_back_to_timestamps(tmp_path):
+    fake = FakeTronGrid()
+    prev = transport.set_transport(fake)
+    store = TxStore(str(tmp_path / "tx.sqlite"))
+    try:
+        fake.add(50)
+        account = {"extra": {"mode": "account"}, "limit": 10}
+        assert len(sync("TRON", "TAddr", store=store, **account)) == 50
+        assert store.get_marks("TRON", "TAddr", "|mode=account") == (None, 1_700_000_000 + 49 * 3)
+
+        fake.calls = 0
+        fake.add(2)
+        delta = sync("TRON", "TAddr", store=store, **account)
+        assert sorted(tx.tx_id for tx in delta) == ["t0050", "t0051"]
+        # Stops at the mark instead of walking the whole history.
+        assert fake.calls == 2
+        # Contract mode keeps its own mark.
+        assert store.get_marks("TRON", "TAddr") == (None, None)
+    finally:
+        transport.set_transport(prev)
+        store.close()
+
+
+def test_old_marks_table_is_migrated(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE marks (chain TEXT NOT NULL, address TEXT NOT NULL, stream TEXT NOT NULL, "
+                 "height INTEGER NOT NULL, updated_at INTEGER NOT NULL, PRIMARY KEY (chain, address, stream))")
+    conn.execute("INSERT INTO marks VALUES ('ETH', 'a', '', 7, 0)")
+    conn.commit()
+    conn.close()
+    store = TxStore(path)
+    assert store.get_marks("ETH", "a") == (7, None)
+    store.close()
+
+
+class FakeTimeline(Transport):
+    """Etherscan per-action listings; one transaction with three legs."""
+
+    def __init__(self):
+        leg = {"hash": "0xabc", "blockNumber": "10", "timeStamp": "1700000000", "from": "0xbb", "to": ADDR,
+               "isError": "0"}
+        token = {**leg, "tokenSymbol": "USDT", "tokenDecimal": "6", "contractAddress": "0xdac1"}
+        self.rows = {
+            "txlist": [{**leg, "value": "1"}],
+            "txlistinternal": [],
+            "tokentx": [{**token, "value": "5", "logIndex": "2"}, {**token, "value": "5", "logIndex": "1"}],
+        }
+
+    def send(self, req):
+        body = {"status": "1", "result": self.rows[req.params["action"]][:req.params["offset"]]}
+        return Response(200, {}, json.dumps(body).encode(), req.url)
+
+
+def test_sync_keeps_every_leg_of_a_transaction(tmp_path):
+    prev = transport.set_transport(FakeTimeline())
+    store = TxStore(str(tmp_path / "tx.sqlite"))
+    try:
+        delta = sync("ETH", ADDR, store=store, extra={"timeline": True}, limit=10)
+        assert len(delta) == 3
+        legs = sorted((tx.asset, tx.amount_raw, (tx.meta or {}).get("log_index")) for tx in store.get_records("ETH", ADDR))
+        assert legs == [("ETH", 1, None), ("USDT", 5, 1), ("USDT", 5, 2)]
+        assert sync("ETH", ADDR, store=store, extra={"timeline": True}, limit=10) == []
+        # Classic native and token histories share the hash as well.
+        native, token = delta[0], next(tx for tx in delta if tx.asset == "USDT")
+        store.put("ETH", "0xcc", "", [dataclasses.replace(native, meta=None)])
+        store.put("ETH", "0xcc", "0xdac1", [dataclasses.replace(token, meta=None)])
+        assert sorted(tx.asset for tx in store.get_records("ETH", "0xcc")) == ["ETH", "USDT"]
+    finally:
+        transport.set_transport(prev)
+        store.close()
+
+
+def test_old_txs_table_is_rekeyed(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite")
+    record = {"chain": "TON", "tx_id": "ev:1", "ts": 5, "block_height": 9, "from_addr": "a", "to_addr": "b",
+              "amount_raw": 3, "amount_decimals": 9, "asset": "TON", "status": "confirmed",
+              "meta": {"kind": "ton", "action": 1}}
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE txs (chain TEXT NOT NULL, address TEXT NOT NULL, tx_id TEXT NOT NULL, ts INTEGER, "
+                 "block_height INTEGER, status TEXT NOT NULL, record TEXT NOT NULL, PRIMARY KEY (chain, address, tx_id))")
+    conn.execute("INSERT INTO txs VALUES ('TON', 'b', 'ev:1', 5, 9, 'confirmed', ?)", (json.dumps(record),))
+    conn.commit()
+    conn.close()
+    store = TxStore(path)
+    assert [tx.tx_id for tx in store.get_records("TON", "b")] == ["ev:1"]
+    # The migrated row is found again instead of being stored twice.
+    assert store.put("TON", "b", "", [TxRecord(**record)]) == []
+    store.close()
+
+
+def test_direction_filter_keeps_its_own_mark(etherscan, tmp_path):
+    store = TxStore(str(tmp_path / "tx.sqlite"))
+    for block in range(100, 110):
+        etherscan.add(1, block)
+    etherscan.txs[3]["from"], etherscan.txs[3]["to"] = ADDR, "0xbb"
+    incoming = sync("ETH", ADDR, store=store, direction="incoming", limit=5)
+    assert len(incoming) == 9
+    assert store.get_mark("ETH", ADDR) is None
+    # The full history is still synced below the incoming-only mark.
+    full = sync("ETH", ADDR, store=store, limit=5)
+    assert [tx.tx_id for tx in full] == ["0x0006"]
+    assert store.get_mark("ETH", ADDR) == 109
+    store.close()
@@ -3,43 +3,110 @@ Module: tron.aml_checker
 Description: Asynchronous TRON AML checker with modular heuristics.
 """
 
+import asyncio
+import atexit
 import time
-import httpx
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, Optional
+
 from loguru import logger
-from core.config import config
-from aml.aml_cache import MdbxAmlCache
-from aml.tron_config import aml_config
-from aml.external.chainabuse import check_address_chainabuse
+from paychain.core.config import config
+from aml.aml_cache import DEFAULT_TTL, MdbxAmlCache, TieredAmlCache
+from aml.aml_config import tron_config as aml_config
+from aml.external.chainabuse import fetch_chainabuse_reports
+from aml.http_client import USER_AGENT, get_client
 
 TRONSCAN_API = "https://apilist.tronscanapi.com/api"
 TRON_NETWORK = "tron"
-aml_cache = MdbxAmlCache()
+CACHE_TTL = DEFAULT_TTL
+# LRU в памяти, негативный кэш ошибок и пакетная запись в MDBX
+aml_cache = TieredAmlCache(MdbxAmlCache())
+atexit.register(aml_cache.close)
+
+# Предзагрузки в процессе: (network, address) -> Task
+_inflight: dict[tuple[str, str], asyncio.Task] = {}
+# Семафор upstream-запросов на каждый event loop
+_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+class BudgetExhausted(Exception):
+    """The upstream call budget of a check is spent."""
+
+
+class CallBudget:
+    """Upstream calls one top-level ``check_address`` may spend, senders included."""
+
+    def __init__(self, calls: int):
+        self.remaining = calls
+
+    def take(self, calls: int) -> None:
+        if calls > self.remaining:
+            raise BudgetExhausted(f"{calls} upstream calls requested, {self.remaining} left")
+        self.remaining -= calls
 
 
 # === Запросы ===
 
-async def fetch_account_info(address: str) -> dict:
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        r = await client.get(
-            f"{TRONSCAN_API}/account?address={address}",
-            headers={"User-Agent": "paychain-aml-checker"}
-        )
-        r.raise_for_status()
-        return r.json()
+async def fetch_account_info(address: str, client=None) -> dict:
+    client = client or get_client(TRONSCAN_API)
+    r = await client.get(
+        f"{TRONSCAN_API}/account",
+        params={"address": address},
+        headers={"User-Agent": USER_AGENT}
+    )
+    r.raise_for_status()
+    return r.json()
         
-async def fetch_trc20_transfers(address: str, limit=100) -> list:
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        r = await client.get(
-            f"{TRONSCAN_API}/token_trc20/transfers",
-            params={"toAddress": address, "limit": limit, "sort": "-timestamp"},
-            headers={"User-Agent": "paychain-aml-checker"}
-        )
-        r.raise_for_status()
-        return r.json().get("token_transfers", [])
+async def fetch_trc20_transfers(address: str, limit=100, client=None) -> list:
+    client = client or get_client(TRONSCAN_API)
+    r = await client.get(
+        f"{TRONSCAN_API}/token_trc20/transfers",
+        params={"toAddress": address, "limit": limit, "sort": "-timestamp"},
+        headers={"User-Agent": USER_AGENT}
+    )
+    r.raise_for_status()
+    return r.json().get("token_transfers", [])
+
+def _upstream_limit() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _limits.get(loop)
+    if sem is None:
+        sem = _limits[loop] = asyncio.Semaphore(aml_config["check_senders_aml"]["concurrency"])
+    return sem
+
+
+def _chainabuse_enabled() -> bool:
+    # fetch_chainabuse_reports makes no request without the global switch and a key.
+    return bool(aml_config["chainabuse"].get("enabled", False) and config.enable_chainabuse
+                and config.chainabuse_api_key)
+
+
+def _preload_calls() -> int:
+    return 3 if _chainabuse_enabled() else 2
+
+
+async def _fetch_context(network: str, address: str) -> tuple[dict, list, list]:
+    # Independent upstream calls run concurrently over the pooled clients,
+    # so preloading takes about as long as the slowest one.
+    async with _upstream_limit():
+        fetches = [fetch_account_info(address), fetch_trc20_transfers(address)]
+        if _chainabuse_enabled():
+            fetches.append(fetch_chainabuse_reports(address, network))
+        results = await asyncio.gather(*fetches)
+    return results[0], results[1], results[2] if len(results) > 2 else []
+
+
+def _forget(key: tuple[str, str], task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        # Mark the error as retrieved even if every waiter went away.
+        task.exception()
+
 
 # === Aml Контекст ===
 
-@dataclass
 class AmlContext:
     def __init__(self, network: str, address: str):
         self.network = network
@@ -48,10 +115,18 @@ class AmlContext:
         self.trc20_transfers: list = []
         self.chainabuse_reports: list = []
 
-    async def preload(self):
-        self.account_info = await fetch_account_info(self.address)
-        self.trc20_transfers = await fetch_trc20_transfers(self.address)
-        self.chainabuse_reports = await fetch_chainabuse_reports(self.address, "tron")
+    async def preload(self, budget: Optional[CallBudget] = None):
+        # Concurrent checks of the same address share one in-flight fetch;
+        # only the caller that starts it pays from its budget.
+        key = (self.network, self.address)
+        task = _inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            if budget is not None:
+                budget.take(_preload_calls())
+            task = _inflight[key] = asyncio.ensure_future(_fetch_context(self.network, self.address))
+            task.add_done_callback(lambda t: _forget(key, t))
+        # A cancelled waiter must not cancel the fetch other checks await.
+        self.account_info, self.trc20_transfers, self.chainabuse_reports = await asyncio.shield(task)
         
 # === Эвристики ===
 
@@ -103,13 +178,12 @@ async def check_address_chainabuse(ctx) -> tuple | None:
     max_age_days = cfg.get("max_age_days", 30)
     weight = cfg.get("weight", 0.25)
 
-    reports = await fetch_chainabuse_reports(ctx.address, ctx.network)
-    ctx.chainabuse_reports = reports  # сохраняем в контекст
-
+    # Уже загружены в preload
+    reports = ctx.chainabuse_reports
     if not reports:
         return None
 
-    now = datetime.utcnow()
+    now = datetime.now(timezone.utc)
     min_time = now - timedelta(days=max_age_days)
 
     for r in reports:
@@ -127,11 +201,24 @@ async def check_address_chainabuse(ctx) -> tuple | None:
 
     return None
     
+def _senders(ctx: AmlContext) -> list[str]:
+    """Senders to screen: first ``max_senders_checked`` unique ones, newest first."""
+    conf = aml_config["check_senders_aml"]
+    transfers = ctx.trc20_transfers[:conf["max_incoming"]]
+    senders = list(dict.fromkeys(t["from_address"] for t in transfers if "from_address" in t))
+    return senders[:conf["max_senders_checked"]]
+
+
+def _is_risky(result: dict) -> bool:
+    return result["status"] in ("blocked", "warning")
+
+
 async def check_senders_aml(
     ctx: AmlContext, 
     shared_sender_cache: 
     dict[str, dict], 
-    current_depth: int = 0
+    current_depth: int = 0,
+    budget: Optional[CallBudget] = None,
 ) -> tuple[str, float] | None:
     conf = aml_config["check_senders_aml"]
     if not conf["enabled"]:
@@ -140,32 +227,40 @@ async def check_senders_aml(
     if current_depth >= conf["max_depth"]:
         return None
 
-    transfers = ctx.trc20_transfers[:conf["max_incoming"]]
-    senders = list({t["from_address"] for t in transfers if "from_address" in t})
-    
-    suspicious = 0
-    checked = 0
-
-    for addr in senders:
-        if addr in shared_sender_cache:
-            result = shared_sender_cache[addr]
-        else:
-            if current_depth >= conf["max_depth"]:
-                continue
+    senders = _senders(ctx)
+    suspicious = sum(
+        1 for addr in senders
+        if addr in shared_sender_cache and _is_risky(shared_sender_cache[addr])
+    )
+
+    async def screen(addr: str) -> Optional[dict]:
+        try:
             result = await check_address(
                 addr, 
                 force_refresh=False, 
                 context=shared_sender_cache, 
-                current_depth=current_depth + 1
+                current_depth=current_depth + 1,
+                budget=budget,
             )
-            shared_sender_cache[addr] = result
-
-        if result["status"] in ("blocked", "warning"):
-            suspicious += 1
+        except BudgetExhausted:
+            return None
+        shared_sender_cache[addr] = result
+        return result
 
-        checked += 1
-        if checked >= conf["max_senders_checked"]:
-            break
+    # Отправители проверяются параллельно; как только порог достигнут,
+    # оставшиеся проверки отменяются
+    pending = [asyncio.ensure_future(screen(addr)) for addr in senders if addr not in shared_sender_cache]
+    try:
+        if pending and suspicious < conf["min_suspicious_senders"]:
+            for done in asyncio.as_completed(pending):
+                result = await done
+                if result and _is_risky(result):
+                    suspicious += 1
+                if suspicious >= conf["min_suspicious_senders"]:
+                    break
+    finally:
+        for task in pending:
+            task.cancel()
 
     if suspicious >= conf["min_suspicious_senders"]:
         return "senders_with_risk", conf["weight"]
@@ -174,84 +269,279 @@ async def check_senders_aml(
 
 # === Основная проверка ===
 
-async def check_address(address: str, force_refresh=False, context: Optional[dict] = None, current_depth: int = 0) -> dict:
+BASE_CHECKS = [
+    check_high_tx_volume,
+    check_large_balance,
+    check_new_account,
+    check_tx_burst_activity,
+    check_dust_activity,
+    check_many_senders,
+    check_address_chainabuse,
+]
+
+
+async def _base_score(ctx: AmlContext) -> tuple[list[str], float]:
+    """Flags and score of every heuristic except the sender check."""
+    flags = []
+    score = 0.0
+    for check in BASE_CHECKS:
+        result = await check(ctx)
+        if result:
+            flag, weight = result
+            flags.append(flag)
+            score += weight
+    return flags, score
+
+
+def _make_result(flags: list[str], score: float) -> dict:
+    score = round(min(score, 1.0), 3)
+
+    if "blocked_locally" in flags:
+        status = "blocked"
+    elif score >= 0.7:
+        status = "blocked"
+    elif score >= 0.3:
+        status = "warning"
+    else:
+        status = "safe"
+
+    return {
+        "status": status,
+        "score": score,
+        "flags": flags,
+        "source": "auto",
+        "checked_at": int(time.time())
+    }
+
+
+def _error_result(e: Exception) -> dict:
+    return {
+        "status": "error",
+        "score": 1.0,
+        "flags": ["aml_check_error", str(e)],
+        "source": "error",
+        "checked_at": int(time.time())
+    }
+
+
+def _blocked_result() -> dict:
+    return {"status": "blocked", "score": 1.0, "flags": ["blocked_locally"]}
+
+
+def _known_result(address: str, force_refresh: bool) -> Optional[dict]:
+    """Blocklist or fresh cached result, if any."""
+    # Проверка блоклиста
+    if config.is_blocked_address(address):
+        return _blocked_result()
+
+    # Кэш: одно чтение вместо is_expired + get
+    if not force_refresh:
+        return aml_cache.get_fresh(TRON_NETWORK, address, CACHE_TTL)
+    return None
+
+
+def _known_results(addresses: list[str], force_refresh: bool) -> dict[str, dict]:
+    """:func:`_known_result` for many addresses in one cache transaction."""
+    known = {a: _blocked_result() for a in addresses if config.is_blocked_address(a)}
+    if not force_refresh:
+        rest = [a for a in addresses if a not in known]
+        known.update(aml_cache.get_many(TRON_NETWORK, rest, CACHE_TTL))
+    return known
+
+async def check_address(
+    address: str,
+    force_refresh=False,
+    context: Optional[dict] = None,
+    current_depth: int = 0,
+    budget: Optional[CallBudget] = None,
+) -> dict:
     """
     Asynchronously check a TRON address using AML heuristics and weighted scoring.
 
     :param address: TRON base58 address
     :param force_refresh: Ignore cached results
+    :param budget: Upstream calls left for this check and its senders
+        (a new ``max_upstream_calls`` budget at the top level)
     :return: AML result
+    :raises BudgetExhausted: If a sender check (``current_depth > 0``) cannot
+        afford its upstream calls
     """
-    context = context or {}
+    if context is None:
+        context = {}
+    if budget is None:
+        budget = CallBudget(aml_config["check_senders_aml"]["max_upstream_calls"])
     
     if address in context:
         return context[address]
 
-    # Проверка блоклиста
-    if config.is_blocked_address(address):
-        return {"status": "blocked", "score": 1.0, "flags": ["blocked_locally"]}
-
-    # Кэш
-    if not force_refresh and not aml_cache.is_expired(TRON_NETWORK, address):
-        cached = aml_cache.get(TRON_NETWORK, address)
-        if cached:
-            return cached
+    known = _known_result(address, force_refresh)
+    if known:
+        return known
 
     try:
         ctx = AmlContext(TRON_NETWORK, address)
-        await ctx.preload()
-
-        flags = []
-        score = 0.0
-        sender_cache = context
-
-        checks = [
-            check_high_tx_volume,
-            check_large_balance,
-            check_new_account,
-            check_tx_burst_activity,
-            check_dust_activity,
-            check_many_senders,
-            check_address_chainabuse,
-            lambda ctx: check_senders_aml(ctx, sender_cache, current_depth),
-        ]
-
-        for check in checks:
-            result = await check(ctx)
-            if result:
-                flag, weight = result
-                flags.append(flag)
-                score += weight
-
-        score = round(min(score, 1.0), 3)
-
-        if "blocked_locally" in flags:
-            status = "blocked"
-        elif score >= 0.7:
-            status = "blocked"
-        elif score >= 0.3:
-            status = "warning"
-        else:
-            status = "safe"
-
-        result = {
-            "status": status,
-            "score": score,
-            "flags": flags,
-            "source": "auto",
-            "checked_at": int(time.time())
-        }
+        await ctx.preload(budget)
+
+        flags, score = await _base_score(ctx)
+        senders = await check_senders_aml(ctx, context, current_depth, budget)
+        if senders:
+            flags.append(senders[0])
+            score += senders[1]
+
+        result = _make_result(flags, score)
 
         aml_cache.set(TRON_NETWORK, address, result)
         context[address] = result
         return result
 
     except Exception as e:
+        if isinstance(e, BudgetExhausted) and current_depth > 0:
+            # Sender is skipped by check_senders_aml
+            raise
         logger.exception("AML check failed:")
-        return {
-            "status": "error",
-            "score": 1.0,
-            "flags": ["aml_check_error", str(e)],
-            "source": "error",
-            "checked_at": int(time.time())
-        }
\ No newline at end of file
+        result = _error_result(e)
+        # Ошибка кэшируется ненадолго и только в памяти
+        aml_cache.set(TRON_NETWORK, address, result)
+        return result
+
+
+# === Пакетная проверка ===
+
+class _Node:
+    """An address of the batch sender graph awaiting its final result."""
+
+    __slots__ = ("address", "depth", "flags", "score", "waiting", "suspicious", "parents")
+
+    def __init__(self, address: str, depth: int):
+        self.address = address
+        self.depth = depth
+        self.flags: list[str] = []
+        self.score = 0.0
+        # Senders one level deeper that are not final yet
+        self.waiting = 0
+        self.suspicious = 0
+        self.parents: list["_Node"] = []
+
+
+async def check_addresses(addresses: Iterable[str], force_refresh=False) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Screen many TRON addresses over their combined sender graph.
+
+    The graph is explored breadth-first, one deduplicated frontier per depth
+    level: the frontier is looked up in the cache once, preloaded
+    concurrently and its results written back together. Every address is
+    fetched and scored once however many inputs share it, and
+    ``(address, result)`` pairs are yielded as soon as an input address and
+    its senders are final.
+
+    Unlike :func:`check_address`, a sender first met at the same or a
+    shallower level counts with its own heuristics only, which breaks cycles
+    between overlapping neighbourhoods.
+
+    :param addresses: TRON base58 addresses
+    :param force_refresh: Ignore cached results of the input addresses
+    """
+    conf = aml_config["check_senders_aml"]
+    roots = list(dict.fromkeys(addresses))
+    wanted = set(roots)
+    max_depth = conf["max_depth"] if conf["enabled"] else 0
+    budget = CallBudget(conf["max_upstream_calls"] * max(len(roots), 1))
+
+    final: dict[str, Optional[dict]] = {}
+    # Статусы по собственным эвристикам для ещё не завершённых адресов
+    base: dict[str, dict] = {}
+    nodes: dict[str, _Node] = {}
+    ready: list[tuple[str, dict]] = []
+    writes: list[tuple[str, dict]] = []
+
+    def finish(address: str, result: Optional[dict], cache: bool = False) -> None:
+        # result is None for senders skipped by the budget
+        final[address] = result
+        node = nodes.pop(address, None)
+        if result is not None:
+            if cache:
+                writes.append((address, result))
+            if address in wanted:
+                ready.append((address, result))
+        for parent in node.parents if node else ():
+            if result is not None and _is_risky(result):
+                parent.suspicious += 1
+            parent.waiting -= 1
+            if parent.waiting == 0:
+                complete(parent)
+
+    def complete(node: _Node) -> None:
+        flags, score = node.flags, node.score
+        if node.suspicious >= conf["min_suspicious_senders"]:
+            flags = flags + ["senders_with_risk"]
+            score += conf["weight"]
+        finish(node.address, _make_result(flags, score), cache=True)
+
+    async def load(address: str) -> AmlContext:
+        ctx = AmlContext(TRON_NETWORK, address)
+        await ctx.preload(budget)
+        return ctx
+
+    frontier = roots
+    depth = 0
+    while frontier:
+        # Одно обращение к кэшу на уровень
+        known = _known_results(frontier, force_refresh and depth == 0)
+        todo = []
+        for address in frontier:
+            if address in known:
+                finish(address, known[address])
+            else:
+                todo.append(address)
+
+        contexts = await asyncio.gather(*(load(a) for a in todo), return_exceptions=True)
+        level = []
+        for address, ctx in zip(todo, contexts):
+            if isinstance(ctx, BudgetExhausted) and depth > 0:
+                finish(address, None)
+            elif isinstance(ctx, Exception):
+                logger.opt(exception=ctx).error("AML check failed:")
+                finish(address, _error_result(ctx), cache=True)
+            else:
+                # Узел мог быть создан родителем на прошлом уровне
+                node = nodes.get(address) or _Node(address, depth)
+                nodes[address] = node
+                node.flags, node.score = await _base_score(ctx)
+                base[address] = _make_result(node.flags, node.score)
+                level.append((node, _senders(ctx) if depth < max_depth else []))
+
+        # Список сохраняет порядок, множество — для проверки за O(1)
+        next_frontier: list[str] = []
+        queued: set[str] = set()
+        for node, senders in level:
+            for sender in senders:
+                if sender in final:
+                    result = final[sender]
+                elif sender in nodes and nodes[sender].depth <= depth:
+                    result = base[sender]
+                else:
+                    if sender not in nodes and sender not in queued:
+                        queued.add(sender)
+                        next_frontier.append(sender)
+                    # Зависимость от адреса следующего уровня
+                    node.waiting += 1
+                    pending = nodes.get(sender)
+                    if pending is None:
+                        pending = nodes[sender] = _Node(sender, depth + 1)
+                    pending.parents.append(node)
+                    continue
+                if result is not None and _is_risky(result):
+                    node.suspicious += 1
+        for node, _ in level:
+            if node.waiting == 0 and node.address in nodes:
+                complete(node)
+
+        if writes:
+            aml_cache.set_many(TRON_NETWORK, writes)
+            writes.clear()
+        for item in ready:
+            yield item
+        ready.clear()
+
+        frontier = next_frontier
+        depth += 1